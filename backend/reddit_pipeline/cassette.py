@@ -0,0 +1,249 @@
+"""Record/replay transport for offline, reproducible pipeline runs.
+
+With `CASSETTE_MODE=record`, every HTTP exchange made by the source clients
+(httpx and PRAW/requests) and the OpenAI SDK is saved to a gzip-compressed
+JSONL cassette at `CASSETTE_PATH`. With `CASSETTE_MODE=replay`, the same
+requests are served from the cassette without touching the network,
+optionally after `CASSETTE_LATENCY_MS` of injected latency, so
+`python -m reddit_pipeline.run` can be profiled end to end on an offline box
+with deterministic inputs. Supabase writes are not recorded; disable them
+with `SUPABASE_ENABLE_WRITES=false` when replaying. The recording is written
+once, by `run.main`, after the run has finished.
+
+The local pipeline state (`PIPELINE_STATE_PATH`) is not part of the cassette:
+record and replay with incremental fetch and skip-processed disabled (or a
+throwaway state file), otherwise a replay filters out every recorded post.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import settings
+from .utils import get_json_logger
+
+log = get_json_logger("reddit_pipeline.cassette")
+
+MODES = ("off", "record", "replay")
+# Response headers that no longer apply once the body is stored decoded
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+
+class CassetteMiss(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def request_key(method: str, url: str, body: bytes | None) -> str:
+    """Stable key for a request: method, URL with sorted query and body hash."""
+
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    normalised = urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, ""))
+    digest = hashlib.sha256(body or b"").hexdigest()[:16]
+    return f"{method.upper()} {normalised} {digest}"
+
+
+class Cassette:
+    """In-memory set of recorded exchanges backed by a `.jsonl.gz` file.
+
+    Repeated identical requests are replayed in recording order; once
+    exhausted, the last response for that key keeps being served.
+    """
+
+    def __init__(self, path: str | Path, mode: str, latency_ms: float = 0.0) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unsupported cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_seconds = max(0.0, latency_ms) / 1000.0
+        self._recorded: list[dict[str, Any]] = []
+        self._replay: dict[str, deque[dict[str, Any]]] = {}
+        self._last: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            raise FileNotFoundError(f"cassette not found: {self.path}")
+        with gzip.open(self.path, "rb") as fh:
+            for line in fh:
+                if line.strip():
+                    entry = orjson.loads(line)
+                    self._replay.setdefault(entry["key"], deque()).append(entry)
+
+    def record(self, key: str, status: int, headers: list[tuple[str, str]], content: bytes) -> None:
+        entry = {
+            "key": key,
+            "status": status,
+            "headers": [[k, v] for k, v in headers if k.lower() not in _DROP_HEADERS],
+            "body": base64.b64encode(content).decode("ascii"),
+        }
+        with self._lock:
+            self._recorded.append(entry)
+
+    def lookup(self, key: str) -> tuple[int, list[tuple[str, str]], bytes]:
+        with self._lock:
+            queue = self._replay.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._last[key] = entry
+            elif key in self._last:
+                entry = self._last[key]
+            else:
+                raise CassetteMiss(f"no recorded response for {key}")
+        headers = [(str(k), str(v)) for k, v in entry["headers"]]
+        return int(entry["status"]), headers, base64.b64decode(entry["body"])
+
+    def save(self) -> None:
+        """Write recorded exchanges to disk (no-op in replay mode)."""
+
+        if self.mode != "record":
+            return
+        with self._lock:
+            entries = list(self._recorded)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "wb") as fh:
+            for entry in entries:
+                fh.write(orjson.dumps(entry) + b"\n")
+        log.info("Saved cassette", extra={"path": str(self.path), "count": len(entries)})
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that records through, or replays from, a cassette."""
+
+    def __init__(self, cassette: Cassette, inner: httpx.BaseTransport | None = None) -> None:
+        self.cassette = cassette
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request.method, str(request.url), request.read())
+        if self.cassette.mode == "replay":
+            if self.cassette.latency_seconds:
+                time.sleep(self.cassette.latency_seconds)
+            status, headers, content = self.cassette.lookup(key)
+            return httpx.Response(status, headers=headers, content=content, request=request)
+        response = self.inner.handle_request(request)
+        content = response.read()
+        self.cassette.record(key, response.status_code, list(response.headers.items()), content)
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS]
+        return httpx.Response(
+            response.status_code, headers=headers, content=content, request=request
+        )
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of `CassetteTransport`."""
+
+    def __init__(self, cassette: Cassette, inner: httpx.AsyncBaseTransport | None = None) -> None:
+        self.cassette = cassette
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request.method, str(request.url), await request.aread())
+        if self.cassette.mode == "replay":
+            if self.cassette.latency_seconds:
+                await asyncio.sleep(self.cassette.latency_seconds)
+            status, headers, content = self.cassette.lookup(key)
+            return httpx.Response(status, headers=headers, content=content, request=request)
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        self.cassette.record(key, response.status_code, list(response.headers.items()), content)
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS]
+        return httpx.Response(
+            response.status_code, headers=headers, content=content, request=request
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class CassetteAdapter(HTTPAdapter):
+    """requests adapter (used by PRAW) that records through, or replays from, a cassette."""
+
+    def __init__(self, cassette: Cassette) -> None:
+        super().__init__()
+        self.cassette = cassette
+
+    def send(  # type: ignore[override]
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        key = request_key(request.method or "GET", request.url or "", body)
+        if self.cassette.mode == "replay":
+            if self.cassette.latency_seconds:
+                time.sleep(self.cassette.latency_seconds)
+            status, headers, content = self.cassette.lookup(key)
+            response = requests.Response()
+            response.status_code = status
+            response.headers.update(dict(headers))
+            response._content = content
+            response.url = request.url or ""
+            response.request = request
+            response.encoding = "utf-8"
+            return response
+        response = super().send(request, **kwargs)
+        self.cassette.record(
+            key, response.status_code, list(response.headers.items()), response.content
+        )
+        return response
+
+
+_active: Cassette | None = None
+_active_lock = threading.Lock()
+
+
+def active_cassette() -> Cassette | None:
+    """Return the process-wide cassette configured by settings, if any."""
+
+    global _active
+    mode = settings.cassette_mode.lower()
+    if mode == "off":
+        return None
+    if mode not in MODES:
+        raise ValueError(f"CASSETTE_MODE must be one of {MODES}, got {mode!r}")
+    with _active_lock:
+        if _active is None:
+            _active = Cassette(settings.cassette_path, mode, settings.cassette_latency_ms)
+            log.info("Cassette active", extra={"mode": mode, "path": settings.cassette_path})
+        return _active
+
+
+def httpx_transport() -> httpx.BaseTransport | None:
+    cassette = active_cassette()
+    return CassetteTransport(cassette) if cassette else None
+
+
+def async_httpx_transport() -> httpx.AsyncBaseTransport | None:
+    cassette = active_cassette()
+    return AsyncCassetteTransport(cassette) if cassette else None
+
+
+def praw_kwargs() -> dict[str, Any]:
+    """Extra `praw.Reddit` kwargs routing PRAW's HTTP through the cassette."""
+
+    cassette = active_cassette()
+    if cassette is None:
+        return {}
+    session = requests.Session()
+    adapter = CassetteAdapter(cassette)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return {"requestor_kwargs": {"session": session}, "check_for_updates": False}
@@ -1,49 +1,224 @@
-"""Hacker News client placeholder using official Firebase API."""
+"""Hacker News clients backed by the Algolia HN Search API.
+
+`HackerNewsClient` reads the current front page. `AsyncHackerNewsClient` keeps
+one pooled connection open and backfills a time window with concurrent page
+requests, yielding posts as each page arrives.
+"""
 
 from __future__ import annotations
 
-from datetime import UTC, datetime
+import asyncio
+import importlib.util
+from collections.abc import AsyncIterator, Iterator
+from datetime import UTC, datetime, timedelta
+from typing import Any
 
 import httpx
 
+from ..cassette import async_httpx_transport, httpx_transport
 from ..models import Post
+from ..ratelimit import limiter
 from ..utils import get_json_logger, retry_with_backoff
 
 log = get_json_logger("reddit_pipeline.clients.hackernews")
 
+HN_HOST = "hn.algolia.com"
+# Algolia serves at most this many hits per query, however it is paginated
+HN_MAX_HITS_PER_QUERY = 1000
+
+
+def _hit_to_post(hit: dict[str, Any]) -> Post:
+    created = datetime.fromtimestamp(int(hit.get("created_at_i", 0)), tz=UTC)
+    return Post(
+        id=str(hit.get("objectID", "")),
+        source="hackernews",
+        title=str(hit.get("title") or hit.get("story_title") or ""),
+        url=str(hit.get("url") or hit.get("story_url") or "https://example.com"),
+        author=str(hit.get("author", "")),
+        score=int(hit.get("points", 0)),
+        num_comments=int(hit.get("num_comments", 0)),
+        created_utc=created,
+        subreddit="hn",
+        text=str(hit.get("story_text") or "") or None,
+    )
+
 
 class HackerNewsClient:
-    @retry_with_backoff()
-    def fetch_top(self, limit: int = 50) -> list[Post]:
-        log.info("Fetching HN top stories", extra={"limit": limit})
-        try:
-            with httpx.Client(timeout=10) as client:
+    def iter_top(
+        self,
+        limit: int = 50,
+        *,
+        since: datetime | None = None,
+        min_comments: int | None = None,
+        page_size: int = 50,
+    ) -> Iterator[Post]:
+        """Yield front-page stories page by page, filtering while streaming.
+
+        Reuses one connection across pages and stops as soon as `limit`
+        stories have been read. Errors propagate to the caller.
+        """
+
+        page_size = max(1, min(page_size, limit))
+        read = 0
+        with httpx.Client(timeout=10, transport=httpx_transport()) as client:
+            page = 0
+            while read < limit:
+                limiter.acquire(HN_HOST)
                 resp = client.get(
-                    "https://hn.algolia.com/api/v1/search?tags=front_page",
-                    params={"hitsPerPage": limit},
+                    f"https://{HN_HOST}/api/v1/search?tags=front_page",
+                    params={"hitsPerPage": page_size, "page": page},
                 )
+                limiter.observe(HN_HOST, resp.headers)
                 resp.raise_for_status()
                 data = resp.json()
-                posts: list[Post] = []
-                for hit in data.get("hits", [])[:limit]:
-                    created = datetime.fromtimestamp(int(hit.get("created_at_i", 0)), tz=UTC)
-                    posts.append(
-                        Post(
-                            id=str(hit.get("objectID", "")),
-                            source="hackernews",
-                            title=str(hit.get("title") or hit.get("story_title") or ""),
-                            url=str(
-                                hit.get("url") or hit.get("story_url") or "https://example.com"
-                            ),
-                            author=str(hit.get("author", "")),
-                            score=int(hit.get("points", 0)),
-                            num_comments=int(hit.get("num_comments", 0)),
-                            created_utc=created,
-                            subreddit="hn",
-                            text=str(hit.get("story_text") or "") or None,
-                        )
-                    )
-                return posts
+                hits = data.get("hits", [])[: limit - read]
+                for hit in hits:
+                    post = _hit_to_post(hit)
+                    if post.in_window(since, min_comments):
+                        yield post
+                read += len(hits)
+                page += 1
+                if not hits or page >= int(data.get("nbPages", 1)):
+                    break
+
+    @retry_with_backoff()
+    def fetch_top(self, limit: int = 50) -> list[Post]:
+        log.info("Fetching HN top stories", extra={"limit": limit})
+        try:
+            return list(self.iter_top(limit))
         except Exception as exc:  # pragma: no cover
             log.error("HN fetch failed", extra={"error": str(exc)})
             return []
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class AsyncHackerNewsClient:
+    """Async HN client with one pooled (HTTP/2 when available) connection.
+
+    Use as an async context manager so the pool is closed afterwards.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = 10.0,
+        max_connections: int = 8,
+        max_attempts: int = 3,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self._client = httpx.AsyncClient(
+            base_url=f"https://{HN_HOST}",
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+            http2=transport is None and _http2_available(),
+            transport=transport or async_httpx_transport(),
+        )
+
+    async def __aenter__(self) -> AsyncHackerNewsClient:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _search(self, params: dict[str, Any]) -> dict[str, Any]:
+        attempt = 0
+        while True:
+            await limiter.acquire_async(HN_HOST)
+            try:
+                resp = await self._client.get("/api/v1/search_by_date", params=params)
+                limiter.observe(HN_HOST, resp.headers)
+                resp.raise_for_status()
+                data: dict[str, Any] = resp.json()
+                return data
+            except (httpx.TransportError, httpx.HTTPStatusError):
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+    async def _page(
+        self, lo: int, hi: int, page: int, hits_per_page: int, tags: str
+    ) -> tuple[int, int, int, dict[str, Any]]:
+        data = await self._search(
+            {
+                "tags": tags,
+                "numericFilters": f"created_at_i>={lo},created_at_i<{hi}",
+                "hitsPerPage": hits_per_page,
+                "page": page,
+            }
+        )
+        return lo, hi, page, data
+
+    async def iter_window(
+        self,
+        since: datetime,
+        until: datetime | None = None,
+        *,
+        slice_hours: int = 24,
+        hits_per_page: int = 100,
+        tags: str = "story",
+    ) -> AsyncIterator[Post]:
+        """Yield every story created in `[since, until)` as pages arrive.
+
+        The window is cut into slices that are fetched concurrently; each
+        slice's first page reports how many pages follow, and those are then
+        requested concurrently too. Slices holding more hits than Algolia will
+        paginate are split in half and re-queried. A failed page is logged and
+        skipped.
+        """
+
+        until = until or datetime.now(UTC)
+        start, end = int(since.timestamp()), int(until.timestamp())
+        step = max(1, int(timedelta(hours=slice_hours).total_seconds()))
+        log.info(
+            "Fetching HN window",
+            extra={"since": since.isoformat(), "until": until.isoformat()},
+        )
+
+        pending: set[asyncio.Task[tuple[int, int, int, dict[str, Any]]]] = set()
+
+        def schedule(lo: int, hi: int, page: int) -> None:
+            pending.add(asyncio.create_task(self._page(lo, hi, page, hits_per_page, tags)))
+
+        for lo in range(start, end, step):
+            schedule(lo, min(end, lo + step), 0)
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        lo, hi, page, data = task.result()
+                    except Exception as exc:
+                        log.error("HN page fetch failed", extra={"error": str(exc)})
+                        continue
+                    if page == 0:
+                        nb_hits = int(data.get("nbHits", 0))
+                        if nb_hits > HN_MAX_HITS_PER_QUERY and hi - lo > 1:
+                            mid = (lo + hi) // 2
+                            schedule(lo, mid, 0)
+                            schedule(mid, hi, 0)
+                            continue
+                        for next_page in range(1, int(data.get("nbPages", 1))):
+                            schedule(lo, hi, next_page)
+                    for hit in data.get("hits", []):
+                        yield _hit_to_post(hit)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_window(
+        self, since: datetime, until: datetime | None = None, **kwargs: Any
+    ) -> list[Post]:
+        """Collect `iter_window` into a list."""
+
+        return [post async for post in self.iter_window(since, until, **kwargs)]
@@ -2,46 +2,69 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 from datetime import UTC, datetime
+from typing import Any
 
 import httpx
 
+from ..cassette import httpx_transport
 from ..models import Post
+from ..ratelimit import limiter
 from ..utils import get_json_logger, retry_with_backoff
 
 log = get_json_logger("reddit_pipeline.clients.producthunt")
 
+PH_HOST = "api.producthunt.com"
+
+
+def _item_to_post(item: dict[str, Any]) -> Post:
+    created_raw = str(item.get("created_at", "1970-01-01T00:00:00Z")).replace("Z", "+00:00")
+    created = datetime.fromisoformat(created_raw)
+    return Post(
+        id=str(item.get("id", "")),
+        source="producthunt",
+        title=str(item.get("name", "")),
+        url=str(item.get("redirect_url", "https://example.com")),
+        author=str((item.get("user") or {}).get("name", "")),
+        score=int(item.get("votes_count", 0)),
+        num_comments=int(item.get("comments_count", 0)),
+        created_utc=created.astimezone(UTC),
+        subreddit="producthunt",
+        text=str(item.get("tagline") or "") or None,
+    )
+
 
 class ProductHuntClient:
+    def iter_today(
+        self,
+        limit: int = 50,
+        *,
+        since: datetime | None = None,
+        min_comments: int | None = None,
+    ) -> Iterator[Post]:
+        """Yield today's launches, filtering while streaming.
+
+        The v1 endpoint returns a single page, so this mainly avoids building
+        intermediate lists. Errors propagate to the caller.
+        """
+
+        with httpx.Client(timeout=10, transport=httpx_transport()) as client:
+            limiter.acquire(PH_HOST)
+            resp = client.get(f"https://{PH_HOST}/v1/posts")
+            limiter.observe(PH_HOST, resp.headers)
+            resp.raise_for_status()
+            data = resp.json()
+            for item in data.get("posts", [])[:limit]:
+                post = _item_to_post(item)
+                if post.in_window(since, min_comments):
+                    yield post
+
     @retry_with_backoff()
     def fetch_today(self, limit: int = 50) -> list[Post]:
         log.info("Fetching Product Hunt posts", extra={"limit": limit})
         try:
-            with httpx.Client(timeout=10) as client:
-                resp = client.get("https://api.producthunt.com/v1/posts")
-                resp.raise_for_status()
-                data = resp.json()
-                posts: list[Post] = []
-                for item in data.get("posts", [])[:limit]:
-                    created_raw = str(item.get("created_at", "1970-01-01T00:00:00Z")).replace(
-                        "Z", "+00:00"
-                    )
-                    created = datetime.fromisoformat(created_raw)
-                    posts.append(
-                        Post(
-                            id=str(item.get("id", "")),
-                            source="producthunt",
-                            title=str(item.get("name", "")),
-                            url=str(item.get("redirect_url", "https://example.com")),
-                            author=str((item.get("user") or {}).get("name", "")),
-                            score=int(item.get("votes_count", 0)),
-                            num_comments=int(item.get("comments_count", 0)),
-                            created_utc=created.astimezone(UTC),
-                            subreddit="producthunt",
-                            text=str(item.get("tagline") or "") or None,
-                        )
-                    )
-                return posts
+            return list(self.iter_today(limit))
         except Exception as exc:  # pragma: no cover
             log.error("PH fetch failed", extra={"error": str(exc)})
             return []
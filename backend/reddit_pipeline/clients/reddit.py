@@ -7,21 +7,120 @@ backoff and log structured JSON.
 
 from __future__ import annotations
 
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
+from typing import Any, cast
 
 import praw  # type: ignore
+from praw.models import MoreComments  # type: ignore
 
+from ..cassette import praw_kwargs
 from ..models import Post
+from ..ratelimit import limiter
 from ..utils import get_json_logger, retry_with_backoff
 
 log = get_json_logger("reddit_pipeline.clients.reddit")
 
+REDDIT_HOST = "oauth.reddit.com"
+
+# Pause new requests when Reddit reports fewer than this many left in the window
+RATE_LIMIT_MIN_REMAINING = 5
+# Fallback pause when the window reset time is not exposed by PRAW
+RATE_LIMIT_FALLBACK_PAUSE_SECONDS = 2.0
+
+
+def _submission_to_post(submission: Any, sub: str) -> Post:
+    created_raw = getattr(submission, "created_utc", 0)
+    created_dt = datetime.fromtimestamp(created_raw, tz=UTC)
+    return Post(
+        id=str(getattr(submission, "id", "")),
+        source="reddit",
+        title=str(getattr(submission, "title", "")),
+        url=str(getattr(submission, "url", "https://example.com")),
+        author=str(getattr(getattr(submission, "author", None), "name", "")),
+        score=int(getattr(submission, "score", 0)),
+        num_comments=int(getattr(submission, "num_comments", 0)),
+        created_utc=created_dt,
+        subreddit=str(
+            getattr(
+                getattr(submission, "subreddit", None),
+                "display_name",
+                sub,
+            )
+        ),
+        text=str(getattr(submission, "selftext", "")) or None,
+    )
+
 
 class RedditClient:
     def __init__(self, client_id: str, client_secret: str, user_agent: str) -> None:
         self.client_id = client_id
         self.client_secret = client_secret
         self.user_agent = user_agent
+        self._reddit: Any = None
+        self._lock = threading.Lock()
+
+    def _session(self) -> Any:
+        """Return one authenticated PRAW instance, shared across calls."""
+
+        with self._lock:
+            if self._reddit is None:
+                self._reddit = praw.Reddit(
+                    client_id=self.client_id,
+                    client_secret=self.client_secret,
+                    user_agent=self.user_agent,
+                    **praw_kwargs(),
+                )
+            return self._reddit
+
+    def _respect_rate_limit(self, reddit: Any) -> None:
+        """Pause the shared Reddit bucket while the remaining request budget is low.
+
+        The pause is a deadline on the bucket, so workers that notice the low
+        budget together wait for the same reset instead of one after another;
+        the caller's next `limiter.acquire(REDDIT_HOST)` does the waiting.
+        """
+
+        try:
+            limits = reddit.auth.limits
+            remaining = limits.get("remaining")
+            reset_at = limits.get("reset_timestamp")
+        except Exception:  # pragma: no cover - limits unavailable before first request
+            return
+        if not isinstance(remaining, int | float) or remaining >= RATE_LIMIT_MIN_REMAINING:
+            return
+        if isinstance(reset_at, int | float):
+            delay = max(0.0, float(reset_at) - time.time())
+        else:
+            delay = RATE_LIMIT_FALLBACK_PAUSE_SECONDS
+        log.info("Reddit rate limit low; pausing", extra={"remaining": remaining, "delay": delay})
+        limiter.bucket(REDDIT_HOST).pause(delay)
+
+    def iter_top_submissions(
+        self,
+        subs: list[str],
+        limit_per_sub: int,
+        *,
+        since: datetime | None = None,
+        min_comments: int | None = None,
+    ) -> Iterator[Post]:
+        """Yield hot submissions per subreddit as PRAW pages through them.
+
+        Posts outside the window (see `Post.in_window`) are dropped while
+        streaming, so nothing is buffered. Errors propagate to the caller.
+        """
+
+        reddit = self._session()
+        for sub in subs:
+            limiter.acquire(REDDIT_HOST)
+            subreddit = reddit.subreddit(sub)
+            for submission in subreddit.hot(limit=limit_per_sub):
+                post = _submission_to_post(submission, sub)
+                if post.in_window(since, min_comments):
+                    yield post
 
     @retry_with_backoff()
     def fetch_top_submissions(
@@ -39,39 +138,7 @@ class RedditClient:
         )
 
         try:
-            reddit = praw.Reddit(
-                client_id=self.client_id,
-                client_secret=self.client_secret,
-                user_agent=self.user_agent,
-            )
-
-            posts: list[Post] = []
-            for sub in subs:
-                subreddit = reddit.subreddit(sub)
-                for submission in subreddit.hot(limit=limit_per_sub):
-                    created_raw = getattr(submission, "created_utc", 0)
-                    created_dt = datetime.fromtimestamp(created_raw, tz=UTC)
-                    posts.append(
-                        Post(
-                            id=str(getattr(submission, "id", "")),
-                            source="reddit",
-                            title=str(getattr(submission, "title", "")),
-                            url=str(getattr(submission, "url", "https://example.com")),
-                            author=str(getattr(getattr(submission, "author", None), "name", "")),
-                            score=int(getattr(submission, "score", 0)),
-                            num_comments=int(getattr(submission, "num_comments", 0)),
-                            created_utc=created_dt,
-                            subreddit=str(
-                                getattr(
-                                    getattr(submission, "subreddit", None),
-                                    "display_name",
-                                    sub,
-                                )
-                            ),
-                            text=str(getattr(submission, "selftext", "")) or None,
-                        )
-                    )
-            return posts
+            return list(self.iter_top_submissions(subs, limit_per_sub))
         except Exception as exc:  # pragma: no cover - path validated via tests
             log.error("Failed to fetch submissions", extra={"error": str(exc)})
             return []
@@ -86,11 +153,8 @@ class RedditClient:
 
         log.info("Fetching comments", extra={"post_id": post_id, "limit": limit})
         try:
-            reddit = praw.Reddit(
-                client_id=self.client_id,
-                client_secret=self.client_secret,
-                user_agent=self.user_agent,
-            )
+            reddit = self._session()
+            limiter.acquire(REDDIT_HOST)
             submission = reddit.submission(id=post_id)
             raw_comments = submission.comments.list()
             results: list[dict[str, object]] = []
@@ -107,3 +171,67 @@ class RedditClient:
         except Exception as exc:  # pragma: no cover - path validated via tests
             log.error("Failed to fetch comments", extra={"post_id": post_id, "error": str(exc)})
             return []
+
+    def _fetch_top_level_comments(
+        self, reddit: Any, post_id: str, limit: int
+    ) -> list[dict[str, object]]:
+        self._respect_rate_limit(reddit)
+        limiter.acquire(REDDIT_HOST)
+        submission = reddit.submission(id=post_id)
+        # Ask Reddit for the best comments only; never expand MoreComments stubs
+        submission.comment_sort = "top"
+        submission.comment_limit = limit
+        results: list[dict[str, object]] = []
+        for c in submission.comments:
+            if isinstance(c, MoreComments):
+                continue
+            results.append(
+                {
+                    "id": str(getattr(c, "id", "")),
+                    "body": str(getattr(c, "body", "")),
+                    "score": int(getattr(c, "score", 0)),
+                    "author": str(getattr(getattr(c, "author", None), "name", "")),
+                }
+            )
+        results.sort(key=lambda c: cast(int, c["score"]), reverse=True)
+        return results[:limit]
+
+    def fetch_comments_bulk(
+        self, post_ids: list[str], limit: int, max_workers: int = 4
+    ) -> dict[str, list[dict[str, object]]]:
+        """Fetch the top-K top-level comments for many posts concurrently.
+
+        Reuses one authenticated session, caps in-flight requests at
+        `max_workers` and pauses when Reddit's rate-limit budget runs low. A
+        failure for one post yields an empty list for that post only.
+        """
+
+        log.info(
+            "Fetching comments in bulk",
+            extra={"count": len(post_ids), "limit": limit, "max_workers": max_workers},
+        )
+        results: dict[str, list[dict[str, object]]] = {pid: [] for pid in post_ids}
+        if not post_ids or limit <= 0:
+            return results
+        try:
+            reddit = self._session()
+        except Exception as exc:  # pragma: no cover - path validated via tests
+            log.error("Failed to create Reddit session", extra={"error": str(exc)})
+            return results
+
+        @retry_with_backoff(max_attempts=3)
+        def _one(post_id: str) -> list[dict[str, object]]:
+            return self._fetch_top_level_comments(reddit, post_id, limit)
+
+        def _safe(post_id: str) -> list[dict[str, object]]:
+            try:
+                return _one(post_id)
+            except Exception as exc:
+                log.error("Failed to fetch comments", extra={"post_id": post_id, "error": str(exc)})
+                return []
+
+        workers = max(1, min(max_workers, len(post_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="comments") as pool:
+            for post_id, comments in zip(post_ids, pool.map(_safe, post_ids)):
+                results[post_id] = comments
+        return results
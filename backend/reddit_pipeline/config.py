@@ -31,6 +31,18 @@ class Settings(BaseSettings):
     hackernews_enabled: bool = Field(default=False, validation_alias="HACKERNEWS_ENABLED")
     producthunt_enabled: bool = Field(default=False, validation_alias="PRODUCTHUNT_ENABLED")
 
+    # Fetch stage: sources run concurrently, each bounded by its own timeout
+    fetch_max_workers: int = Field(default=4, validation_alias="FETCH_MAX_WORKERS")
+    reddit_fetch_timeout_seconds: float = Field(
+        default=120.0, validation_alias="REDDIT_FETCH_TIMEOUT_SECONDS"
+    )
+    hackernews_fetch_timeout_seconds: float = Field(
+        default=30.0, validation_alias="HACKERNEWS_FETCH_TIMEOUT_SECONDS"
+    )
+    producthunt_fetch_timeout_seconds: float = Field(
+        default=30.0, validation_alias="PRODUCTHUNT_FETCH_TIMEOUT_SECONDS"
+    )
+
     # LLM / embeddings
     openai_api_key: str | None = Field(default=None, validation_alias="OPENAI_API_KEY")
     llm_model_summariser: str = Field(
@@ -40,20 +52,102 @@ class Settings(BaseSettings):
     embeddings_model: str = Field(
         default="text-embedding-3-large", validation_alias="EMBEDDINGS_MODEL"
     )
-    embeddings_dim: int = Field(default=3072, validation_alias="EMBEDDINGS_DIM")
+    # Requested natively from text-embedding-3-* models; must match vector(N) in schema.sql
+    embeddings_dim: int = Field(default=1024, validation_alias="EMBEDDINGS_DIM")
+    # Embedding requests are split by input count and estimated tokens, sent in parallel
+    embeddings_batch_max_items: int = Field(
+        default=512, validation_alias="EMBEDDINGS_BATCH_MAX_ITEMS"
+    )
+    embeddings_batch_max_tokens: int = Field(
+        default=100000, validation_alias="EMBEDDINGS_BATCH_MAX_TOKENS"
+    )
+
+    # Per-model cap on in-flight chat requests, plus JSON overrides, e.g. {"gpt-4o": 2}
+    llm_max_concurrency: int = Field(default=4, validation_alias="LLM_MAX_CONCURRENCY")
+    llm_concurrency_overrides: dict[str, int] = Field(
+        default_factory=dict, validation_alias="LLM_CONCURRENCY_OVERRIDES"
+    )
+
+    # Pack several short posts into one summariser/insight request (structured array output)
+    llm_pack_enabled: bool = Field(default=False, validation_alias="LLM_PACK_ENABLED")
+    llm_pack_max_posts: int = Field(default=5, validation_alias="LLM_PACK_MAX_POSTS")
+    llm_pack_max_tokens: int = Field(default=4000, validation_alias="LLM_PACK_MAX_TOKENS")
+
+    # Batch-job mode for the LLM stages: JSONL files submitted to the OpenAI Batch API
+    llm_batch_mode: bool = Field(default=False, validation_alias="LLM_BATCH_MODE")
+    llm_batch_dir: str = Field(default="batches", validation_alias="LLM_BATCH_DIR")
+    llm_batch_poll_seconds: float = Field(default=30.0, validation_alias="LLM_BATCH_POLL_SECONDS")
+    llm_batch_timeout_hours: float = Field(default=24.0, validation_alias="LLM_BATCH_TIMEOUT_HOURS")
+
+    # On-disk cache of summariser/insight responses keyed by request content
+    llm_cache_enabled: bool = Field(default=True, validation_alias="LLM_CACHE_ENABLED")
+    llm_cache_path: str = Field(default=".llm_cache.sqlite3", validation_alias="LLM_CACHE_PATH")
+    llm_cache_ttl_hours: float = Field(default=168.0, validation_alias="LLM_CACHE_TTL_HOURS")
+    llm_cache_max_entries: int = Field(default=5000, validation_alias="LLM_CACHE_MAX_ENTRIES")
+    # Embedding vectors cached in the same file, keyed by model, dim and text hash
+    embedding_cache_enabled: bool = Field(default=True, validation_alias="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_max_entries: int = Field(
+        default=50000, validation_alias="EMBEDDING_CACHE_MAX_ENTRIES"
+    )
+
+    # Cross-source merge of posts linking to the same canonical URL
+    url_dedupe_enabled: bool = Field(default=True, validation_alias="URL_DEDUPE_ENABLED")
+
+    # Near-duplicate detection (MinHash/LSH over title + text)
+    near_dedupe_enabled: bool = Field(default=True, validation_alias="NEAR_DEDUPE_ENABLED")
+    near_dedupe_threshold: float = Field(default=0.8, validation_alias="NEAR_DEDUPE_THRESHOLD")
+
+    # Optional semantic dedupe over title embeddings (runs before the LLM stages)
+    semantic_dedupe_enabled: bool = Field(default=False, validation_alias="SEMANTIC_DEDUPE_ENABLED")
+    semantic_dedupe_threshold: float = Field(
+        default=0.92, validation_alias="SEMANTIC_DEDUPE_THRESHOLD"
+    )
 
     # Orchestration limits
     top_n_posts: int = Field(default=20, validation_alias="TOP_N_POSTS")
     top_k_comments: int = Field(default=5, validation_alias="TOP_K_COMMENTS")
+    comments_max_workers: int = Field(default=4, validation_alias="COMMENTS_MAX_WORKERS")
     summariser_max_input_tokens: int = Field(
         default=4000, validation_alias="SUMMARISER_MAX_INPUT_TOKENS"
     )
     http_timeout_seconds: int = Field(default=60, validation_alias="HTTP_TIMEOUT_SECONDS")
 
+    # Client-side rate limiting: fraction of each provider quota to use, plus
+    # per-host requests/second overrides as JSON, e.g. {"api.openai.com": 20}
+    rate_limit_headroom: float = Field(default=0.9, validation_alias="RATE_LIMIT_HEADROOM")
+    rate_limit_overrides: dict[str, float] = Field(
+        default_factory=dict, validation_alias="RATE_LIMIT_OVERRIDES"
+    )
+
     # Reddit fetch controls
     reddit_lookback_days: int = Field(default=30, validation_alias="REDDIT_LOOKBACK_DAYS")
     reddit_min_comments: int = Field(default=5, validation_alias="REDDIT_MIN_COMMENTS")
 
+    # Incremental ingestion: per-source watermarks kept in a local state file
+    incremental_fetch_enabled: bool = Field(
+        default=True, validation_alias="INCREMENTAL_FETCH_ENABLED"
+    )
+    pipeline_state_path: str = Field(
+        default=".pipeline_state.json", validation_alias="PIPELINE_STATE_PATH"
+    )
+    incremental_comment_growth: float = Field(
+        default=1.5, validation_alias="INCREMENTAL_COMMENT_GROWTH"
+    )
+    # Skip the LLM stages for posts already summarised (tracked in the same state file)
+    skip_processed_enabled: bool = Field(default=True, validation_alias="SKIP_PROCESSED_ENABLED")
+
+    # Record/replay of HTTP traffic for offline benchmarking: off | record | replay
+    cassette_mode: str = Field(default="off", validation_alias="CASSETTE_MODE")
+    cassette_path: str = Field(
+        default="cassettes/pipeline.jsonl.gz", validation_alias="CASSETTE_PATH"
+    )
+    cassette_latency_ms: float = Field(default=0.0, validation_alias="CASSETTE_LATENCY_MS")
+
+    # Local on-disk IVF index of the embeddings written by each run (for offline search)
+    vector_index_enabled: bool = Field(default=False, validation_alias="VECTOR_INDEX_ENABLED")
+    vector_index_path: str = Field(default="vector_index", validation_alias="VECTOR_INDEX_PATH")
+    vector_index_nprobe: int = Field(default=8, validation_alias="VECTOR_INDEX_NPROBE")
+
     # Supabase
     supabase_url: str = Field(default="https://example.com", validation_alias="SUPABASE_URL")
     supabase_anon_key: str = Field(default="test-anon", validation_alias="SUPABASE_ANON_KEY")
@@ -1,8 +1,83 @@
-"""Dedupe utilities for posts (placeholder)."""
+"""Dedupe utilities for posts.
+
+- `dedupe_posts`: exact duplicates by `id`.
+- `merge_by_canonical_url`: the same link arriving from different sources
+  (a Reddit link post, the HN story, the Product Hunt launch), matched on a
+  canonical URL with tracking parameters stripped, hosts normalised and known
+  redirectors unwrapped. Merged into one item with combined engagement.
+- `flag_near_duplicates`: reposts and cross-posts of the same story, found
+  with shingled MinHash signatures bucketed by locality-sensitive hashing, so
+  candidate pairs are found in roughly linear time instead of comparing every
+  pair. Each cluster keeps one representative; the rest are flagged
+  `is_duplicate` (stored in `posts.is_duplicate`) and skipped by LLM stages.
+- `flag_semantic_duplicates`: the same story phrased differently, found by
+  cosine similarity of title embeddings. Candidates come from random-projection
+  LSH (sign bits against random hyperplanes), so only vectors sharing a bucket
+  are compared; the lower-ranked member of each cluster is flagged.
+"""
 
 from __future__ import annotations
 
-from .models import Post
+import re
+import zlib
+from collections import defaultdict
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+import numpy.typing as npt
+
+from .models import Post, PostBatch
+from .ranking import composite_rank_batch
+
+NUM_PERM = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard become candidates
+SHINGLE_SIZE = 5
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240101)  # fixed seed: signatures are stable across runs
+_PERM_A = _rng.integers(1, int(_MERSENNE_PRIME), size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, int(_MERSENNE_PRIME), size=NUM_PERM, dtype=np.uint64)
+_NON_WORD = re.compile(r"[\W_]+")
+# 16 tables x 12 hyperplanes: pairs above ~0.9 cosine collide in some table with
+# probability > 0.95, unrelated titles (~0.2 cosine) in about 1.5% of tables
+SEMANTIC_TABLES = 16
+SEMANTIC_PLANES = 12
+_SEMANTIC_SEED = 20240102
+
+# Query parameters that only track the click, never select content
+_TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "ref",
+    "ref_src",
+    "ref_url",
+    "referrer",
+    "si",
+    "spm",
+    "_hsenc",
+    "_hsmi",
+    "yclid",
+}
+_TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+# Second-level labels used under country-code TLDs (`co.uk`, `com.au`, ...)
+_COMPOUND_SLDS = {"ac", "co", "com", "edu", "gov", "net", "org"}
+# Redirectors that carry the destination in a query parameter
+_REDIRECT_PARAMS = {
+    "google.com": ("/url", "q"),
+    "l.facebook.com": ("/l.php", "u"),
+    "lm.facebook.com": ("/l.php", "u"),
+    "out.reddit.com": ("", "url"),
+    "href.li": ("", ""),
+}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# Placeholder used by the clients when a source has no URL
+_PLACEHOLDER_URL = "https://example.com"
 
 
 def dedupe_posts(posts: list[Post]) -> list[Post]:
@@ -13,3 +88,276 @@ def dedupe_posts(posts: list[Post]) -> list[Post]:
         if post.id not in seen:
             seen[post.id] = post
     return list(seen.values())
+
+
+def _is_registrable(host: str) -> bool:
+    """True if `host` still names a site rather than a bare public suffix.
+
+    A heuristic without a public-suffix list: at least two labels, and three
+    when the last two look like a country-code compound suffix such as `co.uk`.
+    """
+
+    labels = host.split(".")
+    if len(labels) < 2 or not all(labels):
+        return False
+    compound = len(labels[-1]) == 2 and labels[-2] in _COMPOUND_SLDS
+    return len(labels) >= 3 or not compound
+
+
+def _strip_host_prefixes(host: str) -> str:
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix) and _is_registrable(host[len(prefix) :]):
+            host = host[len(prefix) :]
+    return host
+
+
+def canonicalize_url(url: str | None) -> str | None:
+    """Canonical form of a link for cross-source matching, or None if unusable.
+
+    Lower-cases scheme and host, drops `www.`/`m.` style prefixes (only when
+    a registrable domain remains, so `amp.dev` stays as is), default ports,
+    fragments, trailing slashes and tracking parameters, sorts the remaining
+    query, and unwraps query-string redirectors and `youtu.be`.
+    """
+
+    if not url or url.rstrip("/") == _PLACEHOLDER_URL:
+        return None
+    for _ in range(3):  # redirectors may be nested
+        parts = urlsplit(url.strip())
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return None
+        host = _strip_host_prefixes(parts.hostname.lower())
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        redirect = _REDIRECT_PARAMS.get(host)
+        if redirect is not None:
+            path_prefix, param = redirect
+            if param and parts.path.startswith(path_prefix):
+                target = dict(query).get(param)
+                if target:
+                    url = target
+                    continue
+            elif not param and parts.query:
+                url = parts.query
+                continue
+        break
+    path = parts.path.rstrip("/")
+    if host == "youtu.be" and path:
+        host, query, path = "youtube.com", [("v", path.lstrip("/"))], "/watch"
+    kept = sorted(
+        (k, v)
+        for k, v in query
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith(_TRACKING_PREFIXES)
+    )
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    if port is not None and port != _DEFAULT_PORTS.get(parts.scheme):
+        host = f"{host}:{port}"
+    return urlunsplit(("https", host, path, urlencode(kept), ""))
+
+
+def merge_by_canonical_url(posts: list[Post]) -> list[Post]:
+    """Merge posts linking to the same canonical URL into one logical item.
+
+    The most engaged post in each group becomes the representative and takes
+    the group's combined score and comment count; the others are flagged
+    `is_duplicate`. Order and length of `posts` are preserved.
+    """
+
+    groups: dict[str, list[int]] = defaultdict(list)
+    for i, post in enumerate(posts):
+        if post.is_duplicate:
+            continue
+        key = canonicalize_url(post.url)
+        if key is not None:
+            groups[key].append(i)
+
+    result = list(posts)
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        keep = max(members, key=lambda i: (posts[i].score + posts[i].num_comments, -i))
+        result[keep] = posts[keep].model_copy(
+            update={
+                "score": sum(posts[i].score for i in members),
+                "num_comments": sum(posts[i].num_comments for i in members),
+            }
+        )
+        for i in members:
+            if i != keep:
+                result[i] = posts[i].model_copy(update={"is_duplicate": True})
+    return result
+
+
+def _shingles(text: str, size: int = SHINGLE_SIZE) -> npt.NDArray[np.uint64]:
+    """Hashed character shingles of normalised text (lower-case, punctuation removed)."""
+
+    norm = _NON_WORD.sub(" ", text.lower()).strip()
+    if not norm:
+        return np.empty(0, dtype=np.uint64)
+    if len(norm) <= size:
+        grams = {norm}
+    else:
+        grams = {norm[i : i + size] for i in range(len(norm) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)
+    )
+
+
+def minhash_signatures(texts: list[str]) -> npt.NDArray[np.uint64]:
+    """MinHash signature matrix of shape `(len(texts), NUM_PERM)`.
+
+    Rows for texts without any shingles are filled with the maximum value so
+    they never collide with anything.
+    """
+
+    sigs = np.full((len(texts), NUM_PERM), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, text in enumerate(texts):
+        hashes = _shingles(text)
+        if hashes.size:
+            # (a*x + b) mod p over every permutation and shingle; values fit in uint64
+            permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+            sigs[i] = permuted.min(axis=1)
+    return sigs
+
+
+def _post_text(post: Post) -> str:
+    return f"{post.title} {post.text or ''}"
+
+
+def find_near_duplicate_clusters(posts: list[Post], threshold: float = 0.8) -> list[list[int]]:
+    """Group posts whose estimated Jaccard similarity is at least `threshold`.
+
+    Returns clusters of indices (size >= 2), each in input order.
+    """
+
+    if len(posts) < 2:
+        return []
+    sigs = minhash_signatures([_post_text(p) for p in posts])
+    valid = sigs[:, 0] != np.iinfo(np.uint64).max
+    rows = NUM_PERM // LSH_BANDS
+
+    parent = list(range(len(posts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked: set[tuple[int, int]] = set()
+    for band in range(LSH_BANDS):
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        band_sigs = sigs[:, band * rows : (band + 1) * rows]
+        for i in np.flatnonzero(valid).tolist():
+            buckets[band_sigs[i].tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            for other in members[1:]:
+                pair = (first, other)
+                if pair in checked or find(first) == find(other):
+                    continue
+                checked.add(pair)
+                if float(np.mean(sigs[first] == sigs[other])) >= threshold:
+                    parent[find(other)] = find(first)
+
+    clusters: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(posts)):
+        clusters[find(i)].append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def flag_near_duplicates(posts: list[Post], threshold: float = 0.8) -> list[Post]:
+    """Flag near-duplicates with `is_duplicate=True`, keeping one per cluster.
+
+    The representative is the most engaged post (score + comments; earliest on
+    ties). Posts already flagged are left out of clustering. Order and length
+    of `posts` are preserved.
+    """
+
+    result = list(posts)
+    active = [i for i, p in enumerate(posts) if not p.is_duplicate]
+    for local in find_near_duplicate_clusters([posts[i] for i in active], threshold):
+        members = [active[i] for i in local]
+        keep = max(members, key=lambda i: (posts[i].score + posts[i].num_comments, -i))
+        for i in members:
+            if i != keep:
+                result[i] = posts[i].model_copy(update={"is_duplicate": True})
+    return result
+
+
+def find_semantic_duplicate_clusters(
+    vectors: npt.NDArray[np.floating[Any]], threshold: float = 0.92
+) -> list[list[int]]:
+    """Group rows of `vectors` whose cosine similarity is at least `threshold`.
+
+    Rows with zero norm (missing embeddings) never match. Returns clusters of
+    indices (size >= 2), each in input order.
+    """
+
+    if len(vectors) < 2:
+        return []
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = np.flatnonzero(norms > 0)
+    unit = np.zeros_like(matrix)
+    unit[valid] = matrix[valid] / norms[valid, None]
+
+    rng = np.random.default_rng(_SEMANTIC_SEED)
+    planes = rng.standard_normal(
+        (matrix.shape[1], SEMANTIC_TABLES * SEMANTIC_PLANES), dtype=np.float32
+    )
+    bits = (unit[valid] @ planes) > 0
+    # One bucket key per table: that table's sign bits packed into bytes
+    keys = np.packbits(bits.reshape(len(valid), SEMANTIC_TABLES, SEMANTIC_PLANES), axis=2)
+
+    parent = list(range(len(matrix)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for table in range(SEMANTIC_TABLES):
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        for row, i in enumerate(valid.tolist()):
+            buckets[keys[row, table].tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            sims = unit[members] @ unit[members].T
+            for a, b in zip(*np.nonzero(np.triu(sims >= threshold, k=1))):
+                parent[find(members[b])] = find(members[a])
+
+    clusters: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(matrix)):
+        clusters[find(i)].append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def flag_semantic_duplicates(
+    posts: list[Post], vectors: npt.NDArray[np.floating[Any]], threshold: float = 0.92
+) -> list[Post]:
+    """Flag posts whose title embeddings are near-identical, keeping the top-ranked.
+
+    `vectors` holds one row per post. The representative is the post with the
+    highest composite rank (earliest on ties). Posts already flagged are left
+    out of clustering. Order and length of `posts` are preserved.
+    """
+
+    result = list(posts)
+    active = [i for i, p in enumerate(posts) if not p.is_duplicate]
+    if len(active) < 2:
+        return result
+    ranks = composite_rank_batch(PostBatch.from_posts(posts))
+    for local in find_semantic_duplicate_clusters(np.asarray(vectors)[active], threshold):
+        members = [active[i] for i in local]
+        keep = max(members, key=lambda i: (ranks[i], -i))
+        for i in members:
+            if i != keep:
+                result[i] = posts[i].model_copy(update={"is_duplicate": True})
+    return result
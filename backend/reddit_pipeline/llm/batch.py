@@ -0,0 +1,305 @@
+"""Batch-job execution of the LLM stages.
+
+For weekly bulk runs where throughput and cost matter more than latency
+(`LLM_BATCH_MODE=true`), all summariser, insight or embedding requests of a
+stage are written to one JSONL file under `LLM_BATCH_DIR`, each line tagged
+with a stable custom ID. The file is submitted through a `BatchBackend`,
+polled until it finishes, and the results are mapped back by ID.
+
+Request bodies, response parsing and the on-disk caches are shared with the
+synchronous path, so results match what it would have produced and cached
+items never reach the batch. `OpenAIBatchBackend` uses the OpenAI Batch API.
+`LocalBatchBackend` answers requests in-process from a handler and is meant
+for tests and dry runs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Protocol
+
+import numpy as np
+import orjson
+from openai import OpenAI
+
+from ..config import settings
+from ..models import EmbeddingMatrix, Post
+from ..ratelimit import OPENAI_HOST, limiter
+from ..utils import get_json_logger
+from . import embeddings, insights, summariser
+from .cache import cache_key, embedding_cache, response_cache
+from .transport import sync_client
+
+log = get_json_logger("reddit_pipeline.llm.batch")
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+EMBEDDINGS_ENDPOINT = "/v1/embeddings"
+_TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchError(RuntimeError):
+    """Raised when a batch job does not complete or returns nothing usable."""
+
+
+@dataclass(frozen=True)
+class BatchRequest:
+    """One line of a batch input file."""
+
+    custom_id: str
+    body: dict[str, Any]
+
+    def to_line(self, endpoint: str) -> dict[str, Any]:
+        return {"custom_id": self.custom_id, "method": "POST", "url": endpoint, "body": self.body}
+
+
+class BatchBackend(Protocol):
+    """Where batch files are executed."""
+
+    def submit(self, input_path: Path, endpoint: str) -> str:
+        """Submit a JSONL input file and return the batch ID."""
+
+    def status(self, batch_id: str) -> str:
+        """Current status, e.g. `in_progress` or `completed`."""
+
+    def results(self, batch_id: str) -> list[dict[str, Any]]:
+        """Output lines (`custom_id`, `response`, `error`) of a finished batch."""
+
+
+class OpenAIBatchBackend:
+    """Runs batch files through the OpenAI Batch API."""
+
+    def __init__(self, client: OpenAI | None = None) -> None:
+        self._client = client or sync_client()
+
+    def submit(self, input_path: Path, endpoint: str) -> str:
+        limiter.acquire(OPENAI_HOST)
+        with input_path.open("rb") as fh:
+            uploaded = self._client.files.create(file=fh, purpose="batch")
+        limiter.acquire(OPENAI_HOST)
+        batch = self._client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=endpoint,  # type: ignore[arg-type]
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        limiter.acquire(OPENAI_HOST)
+        return self._client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> list[dict[str, Any]]:
+        limiter.acquire(OPENAI_HOST)
+        batch = self._client.batches.retrieve(batch_id)
+        lines: list[dict[str, Any]] = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                limiter.acquire(OPENAI_HOST)
+                text = self._client.files.content(file_id).text
+                lines.extend(orjson.loads(line) for line in text.splitlines() if line.strip())
+        return lines
+
+
+class LocalBatchBackend:
+    """File-based stand-in that answers every request with `handler(endpoint, body)`.
+
+    Input and output files are kept under `workdir` like a real batch job;
+    a handler exception becomes an error line for that request only.
+    """
+
+    def __init__(
+        self, handler: Callable[[str, dict[str, Any]], dict[str, Any]], workdir: str | Path
+    ) -> None:
+        self.handler = handler
+        self.workdir = Path(workdir)
+        self._ids = itertools.count(1)
+        self._jobs: dict[str, tuple[Path, str]] = {}
+
+    def submit(self, input_path: Path, endpoint: str) -> str:
+        batch_id = f"local-{next(self._ids)}"
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        copy = self.workdir / f"{batch_id}.input.jsonl"
+        copy.write_bytes(input_path.read_bytes())
+        self._jobs[batch_id] = (copy, endpoint)
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        output = self.workdir / f"{batch_id}.output.jsonl"
+        if not output.exists():
+            input_path, endpoint = self._jobs[batch_id]
+            lines = []
+            for raw in input_path.read_bytes().splitlines():
+                request = orjson.loads(raw)
+                try:
+                    body = self.handler(endpoint, request["body"])
+                    line = {"response": {"status_code": 200, "body": body}, "error": None}
+                except Exception as exc:
+                    line = {"response": None, "error": {"message": str(exc)}}
+                lines.append(orjson.dumps({"custom_id": request["custom_id"], **line}))
+            output.write_bytes(b"\n".join(lines) + b"\n")
+        return "completed"
+
+    def results(self, batch_id: str) -> list[dict[str, Any]]:
+        output = self.workdir / f"{batch_id}.output.jsonl"
+        return [orjson.loads(line) for line in output.read_bytes().splitlines() if line.strip()]
+
+
+def default_backend() -> BatchBackend:
+    return OpenAIBatchBackend()
+
+
+def write_batch_file(requests: list[BatchRequest], endpoint: str, stage: str) -> Path:
+    """Write `requests` as JSONL under `LLM_BATCH_DIR`; the name is content-addressed."""
+
+    data = b"".join(orjson.dumps(r.to_line(endpoint)) + b"\n" for r in requests)
+    directory = Path(settings.llm_batch_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{stage}-{hashlib.sha256(data).hexdigest()[:12]}.jsonl"
+    path.write_bytes(data)
+    return path
+
+
+def run_batch(
+    requests: list[BatchRequest], endpoint: str, backend: BatchBackend, stage: str
+) -> dict[str, dict[str, Any]]:
+    """Submit `requests`, wait for the batch and return response bodies by custom ID.
+
+    Requests that failed inside the batch are logged and left out.
+    """
+
+    if not requests:
+        return {}
+    path = write_batch_file(requests, endpoint, stage)
+    batch_id = backend.submit(path, endpoint)
+    log.info(
+        "Batch submitted",
+        extra={"stage": stage, "batch_id": batch_id, "count": len(requests), "path": str(path)},
+    )
+    deadline = time.monotonic() + settings.llm_batch_timeout_hours * 3600.0
+    status = backend.status(batch_id)
+    while status not in _TERMINAL:
+        if time.monotonic() > deadline:
+            raise BatchError(f"Batch {batch_id} still {status} after timeout")
+        time.sleep(settings.llm_batch_poll_seconds)
+        status = backend.status(batch_id)
+    if status != "completed":
+        raise BatchError(f"Batch {batch_id} ended with status {status}")
+
+    bodies: dict[str, dict[str, Any]] = {}
+    for line in backend.results(batch_id):
+        response = line.get("response") or {}
+        if response.get("status_code") == 200:
+            bodies[line["custom_id"]] = response["body"]
+        else:
+            log.error(
+                "Batch item failed",
+                extra={"stage": stage, "item": line.get("custom_id"), "error": line.get("error")},
+            )
+    return bodies
+
+
+def _chat_batch(
+    stage: str,
+    messages_by_key: dict[str, list[dict[str, str]]],
+    module: ModuleType,
+    backend: BatchBackend,
+) -> dict[str, dict[str, Any]]:
+    """Run one chat stage as a batch with the same caching and parsing as `_call_openai`."""
+
+    cache = response_cache()
+    bodies = {key: module.request_body(messages) for key, messages in messages_by_key.items()}
+    cache_keys = {key: cache_key(**body) for key, body in bodies.items()}
+    results: dict[str, dict[str, Any]] = {}
+    pending: list[BatchRequest] = []
+    for key, body in bodies.items():
+        cached = cache.get(cache_keys[key]) if cache is not None else None
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending.append(BatchRequest(f"{stage}:{key}", body))
+
+    responses = run_batch(pending, CHAT_ENDPOINT, backend, stage)
+    for request in pending:
+        key = request.custom_id.split(":", 1)[1]
+        response = responses.get(request.custom_id)
+        if response is None:
+            continue
+        content = response["choices"][0]["message"].get("content") or "{}"
+        payload = module.parse_content(content)
+        if payload is None:
+            payload = module.fallback_payload(content)
+        elif cache is not None:
+            cache.put(cache_keys[key], payload)
+        results[key] = payload
+
+    if messages_by_key and not results:
+        raise BatchError(f"Every {stage} request failed")
+    return {key: results[key] for key in messages_by_key if key in results}
+
+
+def summarise_posts_batch(
+    posts: list[Post],
+    comments_by_post: dict[str, list[dict[str, Any]]],
+    backend: BatchBackend,
+) -> dict[str, dict[str, Any]]:
+    """Batch counterpart of `summarise_posts_with_comments`."""
+
+    log.info("Summarising posts in batch mode", extra={"count": len(posts)})
+    messages = {
+        post.id: summariser.build_messages(post, comments_by_post.get(post.id) or [])
+        for post in posts
+    }
+    return _chat_batch("summarise", messages, summariser, backend)
+
+
+def generate_insights_batch(
+    summaries: dict[str, dict[str, Any]], backend: BatchBackend
+) -> dict[str, dict[str, Any]]:
+    """Batch counterpart of `generate_insights_from_summaries`."""
+
+    log.info("Generating insights in batch mode", extra={"count": len(summaries)})
+    messages = {post_id: insights.build_messages(payload) for post_id, payload in summaries.items()}
+    return _chat_batch("insights", messages, insights, backend)
+
+
+def embed_texts_batch(texts: list[str], backend: BatchBackend) -> EmbeddingMatrix:
+    """Batch counterpart of `embed_texts`: one request per distinct uncached text."""
+
+    log.info("Embedding texts in batch mode", extra={"count": len(texts)})
+    model = settings.embeddings_model
+    dim = settings.embeddings_dim
+    result = EmbeddingMatrix.zeros(len(texts), dim)
+    rows = np.array([i for i, t in enumerate(texts) if t and t.strip()], dtype=np.intp)
+    cache = embedding_cache()
+    if cache is not None and rows.size:
+        cached = cache.get_many(model, dim, [texts[i] for i in rows])
+        hit_rows = rows[cached.mask]
+        result.vectors[hit_rows] = cached.vectors[cached.mask]
+        result.mask[hit_rows] = True
+        rows = rows[~cached.mask]
+
+    ids: dict[str, str] = {}
+    for i in rows:
+        text = texts[i]
+        ids.setdefault(text, "embed:" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:24])
+    requests = [BatchRequest(cid, embeddings.request_body([text])) for text, cid in ids.items()]
+    responses = run_batch(requests, EMBEDDINGS_ENDPOINT, backend, "embed")
+
+    done = [text for text, cid in ids.items() if cid in responses]
+    fresh = embeddings.reduce_dims(
+        [responses[ids[text]]["data"][0]["embedding"] for text in done], dim
+    )
+    position = {text: j for j, text in enumerate(done)}
+    for i in rows:
+        j = position.get(texts[i])
+        if j is not None:
+            result.vectors[i] = fresh[j]
+            result.mask[i] = True
+    if cache is not None and done:
+        cache.put_many(model, dim, done, fresh)
+    return result
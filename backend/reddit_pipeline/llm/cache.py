@@ -0,0 +1,244 @@
+"""Content-addressed on-disk caches for LLM responses and embeddings.
+
+Responses are keyed by a hash of everything that determines them (model,
+response format, messages, temperature) and stored as JSON in a small SQLite
+file. Entries expire after `LLM_CACHE_TTL_HOURS`, and the least recently used
+entries are evicted once the cache holds more than `LLM_CACHE_MAX_ENTRIES`.
+Reruns, partial retries and debugging sessions then return instantly for
+unchanged inputs. Set `LLM_CACHE_ENABLED=false` to always call the API.
+
+Embeddings are keyed by `(model, dim, sha256(text))` and stored as float32
+blobs in a second table of the same file, so unchanged titles, summaries and
+insights are never embedded twice. They do not expire (the same model and
+text always give the same vector) but are LRU-capped at
+`EMBEDDING_CACHE_MAX_ENTRIES`. Set `EMBEDDING_CACHE_ENABLED=false` to disable.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import numpy.typing as npt
+import orjson
+
+from ..config import settings
+from ..models import EmbeddingMatrix
+from ..utils import get_json_logger
+
+log = get_json_logger("reddit_pipeline.llm.cache")
+
+# Stay well below SQLite's bound-parameter limit in IN (...) queries
+_SQL_CHUNK = 500
+
+
+def cache_key(
+    model: str,
+    response_format: dict[str, Any],
+    messages: list[dict[str, str]],
+    temperature: float,
+) -> str:
+    """Hex digest identifying one chat completion request."""
+
+    payload = orjson.dumps(
+        {
+            "model": model,
+            "response_format": response_format,
+            "messages": messages,
+            "temperature": temperature,
+        },
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+class _SqliteCache:
+    """Shared SQLite connection, lock and hit/miss counters for one cache table.
+
+    Safe to share between threads; each operation holds a lock around a
+    single connection.
+    """
+
+    _table = ""
+    _schema: tuple[str, ...] = ()
+
+    def __init__(self, path: str | Path, max_entries: int) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self._schema:
+                self._conn.execute(statement)
+
+    def _evict(self) -> None:
+        # Caller holds the lock: drop everything past the newest `max_entries`
+        self._conn.execute(
+            f"DELETE FROM {self._table} WHERE rowid IN ("
+            f"SELECT rowid FROM {self._table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0])
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters since this cache was opened."""
+
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache(_SqliteCache):
+    """SQLite-backed JSON response cache with TTL, LRU eviction and counters."""
+
+    _table = "responses"
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)",
+    )
+
+    def __init__(self, path: str | Path, ttl_seconds: float, max_entries: int) -> None:
+        super().__init__(path, max_entries)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached response for `key`, or None on a miss or expiry."""
+
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return cast(dict[str, Any], orjson.loads(row[0]))
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        """Store `value` under `key`, evicting least recently used entries if full."""
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, orjson.dumps(value), now, now),
+            )
+            self._evict()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(_SqliteCache):
+    """SQLite-backed float32 embedding store keyed by model, dimension and text hash."""
+
+    _table = "embeddings"
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS embeddings ("
+        "model TEXT NOT NULL, dim INTEGER NOT NULL, text_hash TEXT NOT NULL, "
+        "vector BLOB NOT NULL, accessed_at REAL NOT NULL, "
+        "PRIMARY KEY (model, dim, text_hash))",
+        "CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)",
+    )
+
+    def get_many(self, model: str, dim: int, texts: list[str]) -> EmbeddingMatrix:
+        """Cached vectors for `texts` in order; misses are masked out."""
+
+        hashes = [text_hash(t) for t in texts]
+        found: dict[str, bytes] = {}
+        now = time.time()
+        with self._lock, self._conn:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), _SQL_CHUNK):
+                chunk = unique[start : start + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                where = f"WHERE model = ? AND dim = ? AND text_hash IN ({marks})"
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings {where}", (model, dim, *chunk)
+                ).fetchall()
+                found.update(rows)
+                self._conn.execute(
+                    f"UPDATE embeddings SET accessed_at = ? {where}", (now, model, dim, *chunk)
+                )
+            hit_count = sum(1 for h in hashes if h in found)
+            self.hits += hit_count
+            self.misses += len(hashes) - hit_count
+        result = EmbeddingMatrix.zeros(len(texts), dim)
+        for i, h in enumerate(hashes):
+            blob = found.get(h)
+            if blob is not None and len(blob) == 4 * dim:
+                result.vectors[i] = np.frombuffer(blob, dtype=np.float32)
+                result.mask[i] = True
+        return result
+
+    def put_many(self, model: str, dim: int, texts: list[str], vectors: npt.ArrayLike) -> None:
+        """Store `vectors` (one row per text) for `texts`, evicting least recently used entries."""
+
+        now = time.time()
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        rows = [(model, dim, text_hash(t), matrix[i].tobytes(), now) for i, t in enumerate(texts)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dim, text_hash, vector, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+
+
+_active: ResponseCache | None = None
+_active_embeddings: EmbeddingCache | None = None
+_active_lock = threading.Lock()
+
+
+def response_cache() -> ResponseCache | None:
+    """Return the process-wide response cache configured by settings, if enabled."""
+
+    global _active
+    if not settings.llm_cache_enabled:
+        return None
+    with _active_lock:
+        if _active is None:
+            _active = ResponseCache(
+                settings.llm_cache_path,
+                settings.llm_cache_ttl_hours * 3600.0,
+                settings.llm_cache_max_entries,
+            )
+            log.info("LLM response cache active", extra={"path": settings.llm_cache_path})
+        return _active
+
+
+def embedding_cache() -> EmbeddingCache | None:
+    """Return the process-wide embedding cache configured by settings, if enabled."""
+
+    global _active_embeddings
+    if not settings.embedding_cache_enabled:
+        return None
+    with _active_lock:
+        if _active_embeddings is None:
+            _active_embeddings = EmbeddingCache(
+                settings.llm_cache_path, settings.embedding_cache_max_entries
+            )
+        return _active_embeddings
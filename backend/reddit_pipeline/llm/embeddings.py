@@ -1,47 +1,129 @@
 """Embeddings generation utilities (LLM-backed).
 
-Uses text-embedding-3-large by default. Returns list of vectors.
+Uses text-embedding-3-large by default at `EMBEDDINGS_DIM` dimensions. Returns
+L2-normalised float32 vectors in input order as an `EmbeddingMatrix`.
 """
 
 from __future__ import annotations
 
-from openai import OpenAI
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
 
 from ..config import settings
+from ..models import EmbeddingMatrix
 from ..utils import get_json_logger, retry_with_backoff
+from .cache import embedding_cache
+from .tokens import batch_by_tokens, count_tokens
+from .transport import create_embeddings, model_concurrency
 
 log = get_json_logger("reddit_pipeline.llm.embeddings")
 
 
+# Models trained Matryoshka-style that accept the `dimensions` request parameter
+NATIVE_DIMENSIONS_PREFIXES = ("text-embedding-3-",)
+
+
+def supports_dimensions(model: str) -> bool:
+    return model.startswith(NATIVE_DIMENSIONS_PREFIXES)
+
+
+def request_body(texts: list[str]) -> dict[str, Any]:
+    """Embeddings request parameters, shared by the sync and batch paths.
+
+    Models that support it return `EMBEDDINGS_DIM` dimensions directly.
+    """
+
+    body: dict[str, Any] = {"model": settings.embeddings_model, "input": texts}
+    if supports_dimensions(settings.embeddings_model):
+        body["dimensions"] = settings.embeddings_dim
+    return body
+
+
+def reduce_dims(vectors: Sequence[Sequence[float]], dim: int) -> npt.NDArray[np.float32]:
+    """`vectors` as an `(n, dim)` float32 matrix of L2-normalised rows.
+
+    Longer vectors keep their leading `dim` entries (Matryoshka-style
+    truncation, for models without native `dimensions`) before normalising;
+    shorter ones are zero-padded.
+    """
+
+    out = np.zeros((len(vectors), dim), dtype=np.float32)
+    for i, vec in enumerate(vectors):
+        head = vec[:dim]
+        out[i, : len(head)] = head
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
 @retry_with_backoff()
-def embed_texts(texts: list[str]) -> list[list[float]]:
+def _embed_batch(texts: list[str]) -> npt.NDArray[np.float32]:
+    resp = create_embeddings(request_body(texts))
+    return reduce_dims([d.embedding for d in resp.data], settings.embeddings_dim)
+
+
+def plan_batches(texts: list[str]) -> list[list[int]]:
+    """Indices of `texts` split into request batches by item count and estimated tokens."""
+
+    sizes = count_tokens(texts, settings.embeddings_model)
+    return batch_by_tokens(
+        range(len(texts)),
+        sizes,
+        settings.embeddings_batch_max_items,
+        settings.embeddings_batch_max_tokens,
+    )
+
+
+def embed_texts(texts: list[str]) -> EmbeddingMatrix:
     """Create embeddings for a batch of texts.
 
-    Trims empty strings and preserves order for non-empty inputs.
+    Returns an `(n, EMBEDDINGS_DIM)` float32 matrix in input order; empty
+    strings are not sent and stay masked out. Texts already in the embedding
+    cache are not sent to the API. The rest are split into requests by
+    `EMBEDDINGS_BATCH_MAX_ITEMS` and `EMBEDDINGS_BATCH_MAX_TOKENS`, sent
+    concurrently (bounded per model by the transport) and retried per batch;
+    if a batch still fails, the others are cached and the error raised.
     """
 
     log.info("Embedding texts", extra={"count": len(texts)})
-    if not texts:
-        return []
-    client = OpenAI(api_key=settings.openai_api_key)
-    # Filter empty strings to avoid API errors; keep indices to restore order
-    indexed = [(i, t) for i, t in enumerate(texts) if t and t.strip()]
-    if not indexed:
-        return [[] for _ in texts]
-    _, non_empty_texts = zip(*indexed)
-    resp = client.embeddings.create(model=settings.embeddings_model, input=list(non_empty_texts))
-    vectors = [d.embedding for d in resp.data]
+    model = settings.embeddings_model
     dim = settings.embeddings_dim
-    # Map back to original order, pad/truncate to configured dim for safety
-    result: list[list[float]] = [[] for _ in texts]
-    for (orig_idx, _), vec in zip(indexed, vectors):
-        if len(vec) > dim:
-            vec = vec[:dim]
-        elif len(vec) < dim:
-            vec = vec + [0.0] * (dim - len(vec))
-        result[orig_idx] = vec
-    # Ensure any empty inputs have empty vectors for clarity
-    for i, t in enumerate(texts):
-        if not t or not t.strip():
-            result[i] = []
+    result = EmbeddingMatrix.zeros(len(texts), dim)
+    # Filter empty strings to avoid API errors; keep row indices to restore order
+    rows = np.array([i for i, t in enumerate(texts) if t and t.strip()], dtype=np.intp)
+    cache = embedding_cache()
+    if cache is not None and rows.size:
+        cached = cache.get_many(model, dim, [texts[i] for i in rows])
+        hit_rows = rows[cached.mask]
+        result.vectors[hit_rows] = cached.vectors[cached.mask]
+        result.mask[hit_rows] = True
+        rows = rows[~cached.mask]
+    if not rows.size:
+        return result
+    pending = [texts[i] for i in rows]
+    batches = plan_batches(pending)
+    workers = min(len(batches), model_concurrency(model))
+    first_error: BaseException | None = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (batch, pool.submit(_embed_batch, [pending[j] for j in batch])) for batch in batches
+        ]
+        for batch, future in futures:
+            try:
+                fresh = future.result()
+            except Exception as exc:
+                log.error("Embedding batch failed", extra={"count": len(batch), "error": str(exc)})
+                first_error = first_error or exc
+                continue
+            target = rows[batch]
+            result.vectors[target] = fresh
+            result.mask[target] = True
+            if cache is not None:
+                cache.put_many(model, dim, [pending[j] for j in batch], fresh)
+    if first_error is not None:
+        raise first_error
     return result
@@ -1,22 +1,34 @@
 """Insights extraction utilities (LLM-backed).
 
 Consumes summariser JSON and returns portfolio-fit insights as strict JSON.
+With `LLM_PACK_ENABLED=true`, several posts' summaries share one request.
 """
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, cast
 
 import orjson
-from openai import OpenAI
 
 from ..config import settings
 from ..utils import get_json_logger, retry_with_backoff
+from .cache import cache_key, response_cache
+from .limits import collect_isolated
+from .packing import group_by_budget, pack_instructions, packed_response_format, split_packed
+from .tokens import count_tokens
+from .transport import chat_completion, model_concurrency
 
 log = get_json_logger("reddit_pipeline.llm.insights")
 
 
+TEMPERATURE = 0.2
 SYSTEM_PROMPT = "You are a senior B2B marketing strategist in the UK."
+INSTRUCTIONS = (
+    "Given the following summariser JSON, return strict JSON with keys: "
+    "freelancer_actions[], client_playbook[], measurement[], risk_watchouts[], "
+    "draft_titles[], plus a confidence 0.0–1.0 and short_rationale.\n\n"
+)
 
 
 def _response_format() -> dict[str, Any]:
@@ -51,51 +63,139 @@ def _response_format() -> dict[str, Any]:
     }
 
 
-@retry_with_backoff()
-def _call_openai(messages: list[dict[str, str]]) -> dict[str, Any]:
-    client = OpenAI(api_key=settings.openai_api_key)
-    chat = cast(Any, client.chat.completions)
-    resp = chat.create(
-        model=settings.llm_model_munger,
-        messages=messages,
-        response_format=_response_format(),
-        temperature=0.2,
-    )
-    content = resp.choices[0].message.content or "{}"
+def request_body(
+    messages: list[dict[str, str]], response_format: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """Chat completion parameters for `messages`, shared by the sync and batch paths."""
+
+    return {
+        "model": settings.llm_model_munger,
+        "messages": messages,
+        "response_format": response_format or _response_format(),
+        "temperature": TEMPERATURE,
+    }
+
+
+def parse_content(content: str) -> dict[str, Any] | None:
+    """Insight JSON from a completion's message content, or None if invalid."""
+
     try:
         return cast(dict[str, Any], orjson.loads(content))
     except Exception:
-        return {
-            "freelancer_actions": [],
-            "client_playbook": [],
-            "measurement": [],
-            "risk_watchouts": [],
-            "draft_titles": [],
-            "confidence": 0.0,
-            "short_rationale": content,
-        }
+        return None
+
+
+def fallback_payload(content: str) -> dict[str, Any]:
+    return {
+        "freelancer_actions": [],
+        "client_playbook": [],
+        "measurement": [],
+        "risk_watchouts": [],
+        "draft_titles": [],
+        "confidence": 0.0,
+        "short_rationale": content,
+    }
+
+
+@retry_with_backoff()
+def _call_openai(
+    messages: list[dict[str, str]], response_format: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    body = request_body(messages, response_format)
+    cache = response_cache()
+    key = cache_key(**body)
+    if cache is not None and (cached := cache.get(key)) is not None:
+        return cached
+    resp = chat_completion(body)
+    content = resp.choices[0].message.content or "{}"
+    payload = parse_content(content)
+    if payload is None:
+        return fallback_payload(content)
+    if cache is not None:
+        cache.put(key, payload)
+    return payload
+
+
+def build_messages(payload: dict[str, Any]) -> list[dict[str, str]]:
+    """Chat messages asking for insights from one post's summariser JSON."""
+
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": INSTRUCTIONS + orjson.dumps(payload).decode("utf-8")},
+    ]
+
+
+def build_packed_messages(summaries: dict[str, dict[str, Any]]) -> list[dict[str, str]]:
+    """Chat messages asking for insights on several posts in one request."""
+
+    sections = [
+        f"### post_id: {post_id}\n" + orjson.dumps(payload).decode("utf-8")
+        for post_id, payload in summaries.items()
+    ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": INSTRUCTIONS + pack_instructions(len(summaries)) + "\n\n".join(sections),
+        },
+    ]
+
+
+def generate_insight(payload: dict[str, Any]) -> dict[str, Any]:
+    """Generate insights for one post from its summariser JSON."""
+
+    return _call_openai(build_messages(payload))
+
+
+def plan_packs(summaries: dict[str, dict[str, Any]]) -> list[dict[str, dict[str, Any]]]:
+    """Summaries grouped for packed requests; one post per group when packing is off."""
+
+    if not settings.llm_pack_enabled:
+        return [{post_id: payload} for post_id, payload in summaries.items()]
+    texts = [orjson.dumps(payload).decode("utf-8") for payload in summaries.values()]
+    groups = group_by_budget(list(summaries), count_tokens(texts, settings.llm_model_munger))
+    return [{post_id: summaries[post_id] for post_id in group} for group in groups]
+
+
+def generate_insights_pack(summaries: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Generate insights for a group of posts in one request; post_id -> insight JSON.
+
+    A single post uses the regular per-post request. Posts the packed
+    response leaves out are requested on their own.
+    """
+
+    if len(summaries) == 1:
+        ((post_id, payload),) = summaries.items()
+        return {post_id: generate_insight(payload)}
+    packed = _call_openai(
+        build_packed_messages(summaries), packed_response_format(_response_format())
+    )
+    results = split_packed(packed, list(summaries))
+    for post_id, payload in summaries.items():
+        if post_id not in results:
+            log.warning("Post missing from packed insights; retrying alone", extra={"id": post_id})
+            results[post_id] = generate_insight(payload)
+    return {post_id: results[post_id] for post_id in summaries}
 
 
 def generate_insights_from_summaries(
     summaries: dict[str, dict[str, Any]]
 ) -> dict[str, dict[str, Any]]:
-    """Generate insights for each post_id given a summariser JSON mapping."""
+    """Generate insights for each post_id given a summariser JSON mapping.
+
+    Requests (one per post, or one per pack with packing on) run
+    concurrently, bounded per model by the transport; output keeps the input
+    order and a failed request is logged and left out unless all fail.
+    """
 
     log.info("Generating insights", extra={"count": len(summaries)})
-    outputs: dict[str, dict[str, Any]] = {}
-    for post_id, payload in summaries.items():
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": (
-                    "Given the following summariser JSON, return strict JSON with keys: "
-                    "freelancer_actions[], client_playbook[], measurement[], risk_watchouts[], "
-                    "draft_titles[], plus a confidence 0.0–1.0 and short_rationale.\n\n"
-                    + orjson.dumps(payload).decode("utf-8")
-                ),
-            },
-        ]
-        result = _call_openai(messages)
-        outputs[post_id] = result
-    return outputs
+    if not summaries:
+        return {}
+    packs = plan_packs(summaries)
+    workers = min(len(packs), model_concurrency(settings.llm_model_munger))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {",".join(pack): pool.submit(generate_insights_pack, pack) for pack in packs}
+    results = {
+        k: v for pack in collect_isolated(futures, "insights").values() for k, v in pack.items()
+    }
+    return {post_id: results[post_id] for post_id in summaries if post_id in results}
@@ -0,0 +1,36 @@
+"""Failure isolation for concurrent LLM calls.
+
+Summaries and insights are requested from thread pools; in-flight requests
+per model are bounded by the semaphores in `transport`.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future
+from typing import TypeVar
+
+from ..utils import get_json_logger
+
+log = get_json_logger("reddit_pipeline.llm.limits")
+
+T = TypeVar("T")
+
+
+def collect_isolated(futures: dict[str, Future[T]], stage: str) -> dict[str, T]:
+    """Results of `futures` in key order, skipping items that failed.
+
+    A failing item is logged and left out so it cannot sink the others; if
+    every item failed, the first error is raised.
+    """
+
+    results: dict[str, T] = {}
+    first_error: BaseException | None = None
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as exc:
+            log.error("LLM item failed", extra={"stage": stage, "item": key, "error": str(exc)})
+            first_error = first_error or exc
+    if first_error is not None and not results:
+        raise first_error
+    return results
@@ -0,0 +1,76 @@
+"""Packing several short posts into one structured-output LLM request.
+
+With `LLM_PACK_ENABLED=true`, posts whose prompts are small are grouped (up to
+`LLM_PACK_MAX_POSTS` per request and `LLM_PACK_MAX_TOKENS` of post content)
+so the system prompt and schema are sent once per group instead of once per
+post. The per-post schema is wrapped in an `items` array whose objects carry
+the `post_id` they answer, and the response is split back into the usual
+post ID -> payload mapping. Posts missing from a packed response are retried
+on their own by the callers.
+"""
+
+from __future__ import annotations
+
+import copy
+from collections.abc import Sequence
+from typing import Any, TypeVar
+
+from ..config import settings
+from .tokens import batch_by_tokens
+
+PACK_ID_FIELD = "post_id"
+
+T = TypeVar("T")
+
+
+def group_by_budget(items: Sequence[T], sizes: Sequence[int]) -> list[list[T]]:
+    """Group `items` in order within `LLM_PACK_MAX_POSTS` and `LLM_PACK_MAX_TOKENS`."""
+
+    return batch_by_tokens(items, sizes, settings.llm_pack_max_posts, settings.llm_pack_max_tokens)
+
+
+def packed_response_format(response_format: dict[str, Any]) -> dict[str, Any]:
+    """Strict schema for an `items` array of `response_format` objects plus `post_id`."""
+
+    json_schema = response_format["json_schema"]
+    item = copy.deepcopy(json_schema["schema"])
+    item["properties"] = {PACK_ID_FIELD: {"type": "string"}, **item["properties"]}
+    item["required"] = [PACK_ID_FIELD, *item["required"]]
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"{json_schema['name']}_packed",
+            "schema": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {"items": {"type": "array", "items": item}},
+                "required": ["items"],
+            },
+            "strict": True,
+        },
+    }
+
+
+def pack_instructions(count: int) -> str:
+    """Prompt lines explaining the packed request and response layout."""
+
+    return (
+        f"There are {count} posts below, each introduced by its post_id. Analyse each "
+        'post independently and return strict JSON {"items": [...]} with exactly one '
+        "object per post, copying its post_id.\n\n"
+    )
+
+
+def split_packed(payload: dict[str, Any], keys: Sequence[str]) -> dict[str, dict[str, Any]]:
+    """Per-key payloads from a packed response; unknown or duplicate IDs are ignored."""
+
+    wanted = set(keys)
+    results: dict[str, dict[str, Any]] = {}
+    items = payload.get("items")
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        key = item.get(PACK_ID_FIELD)
+        if key in wanted and key not in results:
+            results[key] = {k: v for k, v in item.items() if k != PACK_ID_FIELD}
+    return results
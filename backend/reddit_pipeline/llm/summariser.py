@@ -1,44 +1,115 @@
 """Summarisation utilities (LLM-backed).
 
-Strict-JSON output per spec. Uses OpenAI SDK with retries and truncation.
+Strict-JSON output per spec. Uses OpenAI SDK with retries. Prompts are packed
+to `summariser_max_input_tokens` with a tokenizer-backed budget instead of
+fixed character cuts. With `LLM_PACK_ENABLED=true`, short posts are packed
+several to a request (see `packing`).
 """
 
 from __future__ import annotations
 
+import math
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, cast
 
 import orjson
-from openai import OpenAI
 
 from ..config import settings
 from ..models import Post
 from ..utils import get_json_logger, retry_with_backoff
+from .cache import cache_key, response_cache
+from .limits import collect_isolated
+from .packing import group_by_budget, pack_instructions, packed_response_format, split_packed
+from .tokens import allocate_budget, count_tokens, truncate_to_tokens
+from .transport import chat_completion, model_concurrency
 
 log = get_json_logger("reddit_pipeline.llm.summariser")
 
+TEMPERATURE = 0.2
 SYSTEM_PROMPT = (
     "You are a rigorous marketing analyst. Be concise, factual, and specific. UK English."
 )
 
 
-def _truncate_text(text: str, max_chars: int) -> str:
-    if len(text) <= max_chars:
-        return text
-    return text[: max(0, max_chars - 1)] + "…"
+INSTRUCTIONS = (
+    "Provide post title + selftext + top comments (with scores).\n"
+    "Return strict JSON with keys: summary, pain_points[], "
+    "recommendations[], segments[], tools_mentioned[], contrarian_take, "
+    "key_metrics[], sources[].\n\n"
+)
+# Comments that would get fewer tokens than this are dropped rather than cut to a stub
+MIN_COMMENT_TOKENS = 24
+# Headroom for tokens merging differently across section boundaries
+_BOUNDARY_SLACK = 8
 
 
-def _build_user_content(post: Post, top_comments: list[dict[str, Any]]) -> str:
-    title = post.title
-    body = post.text or ""
-    comments_str = "\n\n".join(
-        f"- [score {c.get('score', 0)}] {c.get('body','')}" for c in top_comments
-    )
+def _comment_prefix(comment: dict[str, Any]) -> str:
+    return f"- [score {comment.get('score', 0)}] "
+
+
+def _comment_weight(comment: dict[str, Any]) -> float:
+    # Higher-scored comments get a larger share, with diminishing returns
+    return 1.0 + math.log1p(max(0, int(comment.get("score", 0) or 0)))
+
+
+def _build_user_content(title: str, body: str, comments: list[str]) -> str:
+    comments_str = "\n\n".join(comments)
     return (
         f"Post title:\n{title}\n\nPost selftext:\n{body}\n\n"
         f"Top comments (truncated):\n{comments_str}"
     )
 
 
+def _fit_to_budget(post: Post, comments: list[dict[str, Any]]) -> str:
+    """User content for `post` within `summariser_max_input_tokens` (whole prompt).
+
+    The title is kept first; the rest of the budget is split between the
+    selftext and the comments, comments weighted by score. Sections that fit
+    their share are kept whole and their unused share flows to the others.
+    Comments that would be cut to a stub are dropped, lowest-scored first.
+    """
+
+    model = settings.llm_model_summariser
+    title, body = post.title, post.text or ""
+    prefixes = [_comment_prefix(c) for c in comments]
+    bodies = [str(c.get("body", "")) for c in comments]
+    n = len(comments)
+    counts = count_tokens(
+        [SYSTEM_PROMPT, INSTRUCTIONS + _build_user_content("", "", []), title, body, "\n\n"]
+        + prefixes
+        + bodies,
+        model,
+    )
+    fixed, title_tokens, body_tokens, sep_tokens = sum(counts[:2]), *counts[2:5]
+    prefix_tokens, demands = counts[5 : 5 + n], counts[5 + n :]
+
+    budget = settings.summariser_max_input_tokens - fixed - _BOUNDARY_SLACK
+    title_budget = min(title_tokens, max(0, budget))
+    budget -= title_budget
+    keep = [i for i in range(n) if demands[i] > 0]
+    while True:
+        overhead = sum(prefix_tokens[i] + sep_tokens for i in keep)
+        weights = [_comment_weight(comments[i]) for i in keep]
+        alloc = allocate_budget(
+            [body_tokens] + [demands[i] for i in keep],
+            [max(1.0, sum(weights))] + weights,
+            budget - overhead,
+        )
+        stubs = [i for i, a in zip(keep, alloc[1:]) if a < min(MIN_COMMENT_TOKENS, demands[i])]
+        if not stubs:
+            break
+        keep.remove(min(stubs, key=lambda i: (_comment_weight(comments[i]), -i)))
+
+    def cut(text: str, demand: int, limit: int) -> str:
+        return text if demand <= limit else truncate_to_tokens(text, limit, model)
+
+    return _build_user_content(
+        cut(title, title_tokens, title_budget),
+        cut(body, body_tokens, alloc[0]),
+        [prefixes[i] + cut(bodies[i], demands[i], a) for i, a in zip(keep, alloc[1:])],
+    )
+
+
 def _response_format() -> dict[str, Any]:
     return {
         "type": "json_schema",
@@ -73,31 +144,141 @@ def _response_format() -> dict[str, Any]:
     }
 
 
-@retry_with_backoff()
-def _call_openai(messages: list[dict[str, str]]) -> dict[str, Any]:
-    client = OpenAI(api_key=settings.openai_api_key)
-    chat = cast(Any, client.chat.completions)
-    resp = chat.create(
-        model=settings.llm_model_summariser,
-        messages=messages,
-        response_format=_response_format(),
-        temperature=0.2,
-    )
-    content = resp.choices[0].message.content or "{}"
+def request_body(
+    messages: list[dict[str, str]], response_format: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """Chat completion parameters for `messages`, shared by the sync and batch paths."""
+
+    return {
+        "model": settings.llm_model_summariser,
+        "messages": messages,
+        "response_format": response_format or _response_format(),
+        "temperature": TEMPERATURE,
+    }
+
+
+def parse_content(content: str) -> dict[str, Any] | None:
+    """Summariser JSON from a completion's message content, or None if invalid."""
+
     try:
         return cast(dict[str, Any], orjson.loads(content))
     except Exception:
-        # As a fallback, wrap as string to maintain strictness for storage.
-        return {
-            "summary": content,
-            "pain_points": [],
-            "recommendations": [],
-            "segments": [],
-            "tools_mentioned": [],
-            "contrarian_take": "",
-            "key_metrics": [],
-            "sources": [],
-        }
+        return None
+
+
+def fallback_payload(content: str) -> dict[str, Any]:
+    # As a fallback, wrap as string to maintain strictness for storage.
+    return {
+        "summary": content,
+        "pain_points": [],
+        "recommendations": [],
+        "segments": [],
+        "tools_mentioned": [],
+        "contrarian_take": "",
+        "key_metrics": [],
+        "sources": [],
+    }
+
+
+@retry_with_backoff()
+def _call_openai(
+    messages: list[dict[str, str]], response_format: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    body = request_body(messages, response_format)
+    cache = response_cache()
+    key = cache_key(**body)
+    if cache is not None and (cached := cache.get(key)) is not None:
+        return cached
+    resp = chat_completion(body)
+    content = resp.choices[0].message.content or "{}"
+    payload = parse_content(content)
+    if payload is None:
+        return fallback_payload(content)
+    if cache is not None:
+        cache.put(key, payload)
+    return payload
+
+
+def build_messages(post: Post, comments: list[dict[str, Any]]) -> list[dict[str, str]]:
+    """Chat messages summarising `post` with its top-K comments, within the token budget."""
+
+    user_content = _fit_to_budget(post, comments[: settings.top_k_comments])
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": INSTRUCTIONS + user_content},
+    ]
+
+
+def summarise_post(post: Post, comments: list[dict[str, Any]]) -> dict[str, Any]:
+    """Summarise one post with its top-K comments using strict JSON."""
+
+    return _call_openai(build_messages(post, comments))
+
+
+def build_packed_messages(
+    posts: list[Post], comments_by_post: dict[str, list[dict[str, Any]]]
+) -> list[dict[str, str]]:
+    """Chat messages summarising several posts in one request, one section per post ID."""
+
+    sections = [
+        f"### post_id: {post.id}\n"
+        + _fit_to_budget(post, (comments_by_post.get(post.id) or [])[: settings.top_k_comments])
+        for post in posts
+    ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": INSTRUCTIONS + pack_instructions(len(posts)) + "\n\n".join(sections),
+        },
+    ]
+
+
+def plan_packs(
+    posts: list[Post], comments_by_post: dict[str, list[dict[str, Any]]]
+) -> list[list[Post]]:
+    """Posts grouped for packed requests; one post per group when packing is off."""
+
+    if not settings.llm_pack_enabled:
+        return [[post] for post in posts]
+    texts = [
+        "\n".join(
+            [post.title, post.text or ""]
+            + [
+                str(c.get("body", ""))
+                for c in (comments_by_post.get(post.id) or [])[: settings.top_k_comments]
+            ]
+        )
+        for post in posts
+    ]
+    sizes = [
+        min(n, settings.summariser_max_input_tokens)
+        for n in count_tokens(texts, settings.llm_model_summariser)
+    ]
+    return group_by_budget(posts, sizes)
+
+
+def summarise_pack(
+    posts: list[Post], comments_by_post: dict[str, list[dict[str, Any]]]
+) -> dict[str, dict[str, Any]]:
+    """Summarise a group of posts in one request; post_id -> summariser JSON.
+
+    A single post uses the regular per-post request. Posts the packed
+    response leaves out are summarised on their own.
+    """
+
+    if len(posts) == 1:
+        post = posts[0]
+        return {post.id: summarise_post(post, comments_by_post.get(post.id) or [])}
+    payload = _call_openai(
+        build_packed_messages(posts, comments_by_post), packed_response_format(_response_format())
+    )
+    results = split_packed(payload, [post.id for post in posts])
+    for post in posts:
+        if post.id not in results:
+            log.warning("Post missing from packed summary; retrying alone", extra={"id": post.id})
+            results[post.id] = summarise_post(post, comments_by_post.get(post.id) or [])
+    return {post.id: results[post.id] for post in posts}
 
 
 def summarise_posts_with_comments(
@@ -106,42 +287,23 @@ def summarise_posts_with_comments(
 ) -> dict[str, dict[str, Any]]:
     """Summarise each post with its top-K comments using strict JSON.
 
-    Returns a mapping of post_id -> summariser JSON dict.
+    Requests (one per post, or one per pack with packing on) run
+    concurrently, bounded per model by the transport. Returns a mapping of
+    post_id -> summariser JSON dict in input order; a request that fails is
+    logged and its posts left out unless every request fails.
     """
 
     log.info("Summarising posts", extra={"count": len(posts)})
-    results: dict[str, dict[str, Any]] = {}
-    max_chars_per_section = 2000  # coarse truncation guard before tokenisation
-    top_k = settings.top_k_comments
-
-    for post in posts:
-        comments = (comments_by_post.get(post.id) or [])[:top_k]
-        # truncate long comment bodies
-        trimmed_comments = []
-        for c in comments:
-            body = _truncate_text(str(c.get("body", "")), 800)
-            trimmed_comments.append({"score": c.get("score", 0), "body": body})
-
-        user_content = _build_user_content(
-            post,
-            trimmed_comments,
-        )
-        user_content = _truncate_text(user_content, max_chars_per_section)
-
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": (
-                    "Provide post title + selftext + top comments (with scores).\n"
-                    "Return strict JSON with keys: summary, pain_points[], "
-                    "recommendations[], segments[], tools_mentioned[], contrarian_take, "
-                    "key_metrics[], sources[].\n\n" + user_content
-                ),
-            },
-        ]
-
-        payload = _call_openai(messages)
-        results[post.id] = payload
-
-    return results
+    if not posts:
+        return {}
+    packs = plan_packs(posts, comments_by_post)
+    workers = min(len(packs), model_concurrency(settings.llm_model_summariser))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            ",".join(p.id for p in pack): pool.submit(summarise_pack, pack, comments_by_post)
+            for pack in packs
+        }
+    results = {
+        k: v for pack in collect_isolated(futures, "summarise").values() for k, v in pack.items()
+    }
+    return {post.id: results[post.id] for post in posts if post.id in results}
@@ -0,0 +1,129 @@
+"""Token counting and token-budget allocation for LLM prompts.
+
+Token counts come from the model's tiktoken encoding, loaded once per model
+and counted in batches. When the BPE files cannot be loaded (for example on
+an offline box without a warm tiktoken cache), a four-characters-per-token
+approximation is used instead, so budgets still hold roughly.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from functools import cache
+from typing import Any, Protocol, TypeVar
+
+import tiktoken
+
+from ..utils import get_json_logger
+
+log = get_json_logger("reddit_pipeline.llm.tokens")
+
+FALLBACK_ENCODING = "o200k_base"
+ELLIPSIS = "…"
+
+T = TypeVar("T")
+
+
+class Encoding(Protocol):
+    """The subset of `tiktoken.Encoding` used here."""
+
+    def encode_batch(self, text: list[str], *, disallowed_special: Any = ...) -> Any: ...
+
+    def decode(self, tokens: Any) -> str: ...
+
+
+class ApproxEncoding:
+    """Treats every four characters as one token."""
+
+    def encode_batch(self, text: list[str], *, disallowed_special: Any = ()) -> list[list[str]]:
+        return [[t[i : i + 4] for i in range(0, len(t), 4)] for t in text]
+
+    def decode(self, tokens: Any) -> str:
+        return "".join(tokens)
+
+
+@cache
+def encoding(model: str) -> Encoding:
+    """Tokenizer for `model`, loaded once per process."""
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as exc:
+        log.warning(
+            "tiktoken unavailable; approximating tokens", extra={"model": model, "error": str(exc)}
+        )
+        return ApproxEncoding()
+
+
+def _encode(texts: list[str], model: str) -> list[list[Any]]:
+    tokens: list[list[Any]] = encoding(model).encode_batch(texts, disallowed_special=())
+    return tokens
+
+
+def count_tokens(texts: list[str], model: str) -> list[int]:
+    """Token count of each text, encoded as one batch."""
+
+    return [len(tokens) for tokens in _encode(texts, model)]
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """`text` cut to at most `max_tokens` tokens, ending in an ellipsis if cut."""
+
+    tokens = _encode([text], model)[0]
+    if len(tokens) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    return encoding(model).decode(tokens[: max_tokens - 1]) + ELLIPSIS
+
+
+def allocate_budget(demands: list[int], weights: list[float], budget: int) -> list[int]:
+    """Split `budget` across items by weight without giving any item more than it needs.
+
+    Water-filling: items whose demand fits inside their weighted share are
+    granted in full and their unused share is redistributed; the remaining
+    items split what is left in proportion to their weights.
+    """
+
+    alloc = [0] * len(demands)
+    active = {i for i, demand in enumerate(demands) if demand > 0}
+    remaining = max(0, budget)
+    while active and remaining > 0:
+        total_weight = sum(weights[i] for i in active)
+        satisfied = [i for i in active if demands[i] <= remaining * weights[i] / total_weight]
+        if not satisfied:
+            for i in active:
+                alloc[i] = int(remaining * weights[i] / total_weight)
+            break
+        for i in satisfied:
+            alloc[i] = demands[i]
+            remaining -= demands[i]
+            active.discard(i)
+    return alloc
+
+
+def batch_by_tokens(
+    items: Sequence[T], sizes: Sequence[int], max_items: int, max_tokens: int
+) -> list[list[T]]:
+    """Split `items` in order into batches of at most `max_items` and `max_tokens`.
+
+    Greedy: each batch is filled until the next item would exceed either
+    limit. An item larger than `max_tokens` gets a batch of its own.
+    """
+
+    max_items = max(1, max_items)
+    batches: list[list[T]] = []
+    current: list[T] = []
+    used = 0
+    for item, size in zip(items, sizes):
+        if current and (len(current) >= max_items or used + size > max_tokens):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += size
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,248 @@
+"""Shared transport for OpenAI requests.
+
+One long-lived sync client (and an async one for asyncio callers) is built per
+process, so connections are kept alive and reused instead of being set up for
+every request. Clients use `HTTP_TIMEOUT_SECONDS` and route through the
+cassette when one is active.
+
+Every request goes through `chat_completion` / `create_embeddings` (or their
+async counterparts), which hold the model's concurrency slot, respect the
+client-side rate limiter (fed from the headers of successful and failed
+responses alike, so a 429's `Retry-After` pauses every caller) and record
+per-model request, error, latency and token counters (`usage_stats`). Each
+model gets a semaphore sized by `LLM_MAX_CONCURRENCY` (or a per-model override
+in `LLM_CONCURRENCY_OVERRIDES`, JSON such as {"gpt-4o": 2}).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, cast
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from ..cassette import async_httpx_transport, httpx_transport
+from ..config import settings
+from ..ratelimit import OPENAI_HOST, limiter
+
+# Connecting should be quick even when generation is slow
+CONNECT_TIMEOUT_SECONDS = 10.0
+
+_lock = threading.Lock()
+_sync_client: OpenAI | None = None
+_async_client: AsyncOpenAI | None = None
+_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_async_semaphores: dict[str, asyncio.Semaphore] = {}
+_usage: dict[str, dict[str, float]] = {}
+# Keeps async-client close tasks alive until they finish
+_closing: set[asyncio.Task[None]] = set()
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.http_timeout_seconds,
+        connect=min(CONNECT_TIMEOUT_SECONDS, settings.http_timeout_seconds),
+    )
+
+
+def sync_client() -> OpenAI:
+    """Process-wide OpenAI client with keep-alive connections."""
+
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            http_client = httpx.Client(
+                transport=httpx_transport() or httpx.HTTPTransport(), timeout=_timeout()
+            )
+            _sync_client = OpenAI(
+                api_key=settings.openai_api_key, timeout=_timeout(), http_client=http_client
+            )
+        return _sync_client
+
+
+def async_client() -> AsyncOpenAI:
+    """Process-wide async OpenAI client; use it from a single event loop."""
+
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            http_client = httpx.AsyncClient(
+                transport=async_httpx_transport() or httpx.AsyncHTTPTransport(),
+                timeout=_timeout(),
+            )
+            _async_client = AsyncOpenAI(
+                api_key=settings.openai_api_key, timeout=_timeout(), http_client=http_client
+            )
+        return _async_client
+
+
+def close_clients() -> None:
+    """Close both clients and forget them (the next call builds new ones).
+
+    The async client is closed on the running event loop when called from
+    one, otherwise on a short-lived loop; asyncio callers that used it can
+    await `aclose_clients()` instead.
+    """
+
+    global _sync_client, _async_client
+    with _lock:
+        sync, async_ = _sync_client, _async_client
+        _sync_client = _async_client = None
+    if sync is not None:
+        sync.close()
+    if async_ is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(async_.close())
+        return
+    task = loop.create_task(async_.close())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+async def aclose_clients() -> None:
+    """Close both clients, awaiting the async one on the caller's event loop."""
+
+    global _async_client
+    with _lock:
+        async_, _async_client = _async_client, None
+    if async_ is not None:
+        await async_.close()
+    close_clients()
+
+
+def model_concurrency(model: str) -> int:
+    """Maximum in-flight requests for `model`."""
+
+    return max(1, settings.llm_concurrency_overrides.get(model, settings.llm_max_concurrency))
+
+
+def model_slot(model: str) -> threading.BoundedSemaphore:
+    """Process-wide semaphore for `model`; held around each sync request."""
+
+    with _lock:
+        if model not in _semaphores:
+            _semaphores[model] = threading.BoundedSemaphore(model_concurrency(model))
+        return _semaphores[model]
+
+
+def _async_slot(model: str) -> asyncio.Semaphore:
+    with _lock:
+        if model not in _async_semaphores:
+            _async_semaphores[model] = asyncio.Semaphore(model_concurrency(model))
+        return _async_semaphores[model]
+
+
+def _record(model: str, started: float, response: Any | None) -> None:
+    # `response` is None when the request failed
+    usage = getattr(response, "usage", None)
+    with _lock:
+        counters = _usage.setdefault(
+            model,
+            {
+                "requests": 0,
+                "errors": 0,
+                "latency_seconds": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            },
+        )
+        counters["requests"] += 1
+        counters["latency_seconds"] += time.perf_counter() - started
+        if response is None:
+            counters["errors"] += 1
+        if usage is not None:
+            counters["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            counters["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+
+def usage_stats() -> dict[str, dict[str, float]]:
+    """Per-model request, error, latency and token counters since process start."""
+
+    with _lock:
+        return {
+            model: {
+                **counters,
+                "latency_seconds": round(counters["latency_seconds"], 3),
+                "mean_latency_seconds": round(
+                    counters["latency_seconds"] / max(1, counters["requests"]), 3
+                ),
+            }
+            for model, counters in _usage.items()
+        }
+
+
+def reset_usage() -> None:
+    with _lock:
+        _usage.clear()
+
+
+def _observe_error(exc: Exception) -> None:
+    # Error responses (429s above all) carry the headers the limiter needs
+    response = getattr(exc, "response", None)
+    if response is not None:
+        limiter.observe(OPENAI_HOST, getattr(response, "headers", None))
+
+
+def _request(model: str, create: Any, body: dict[str, Any]) -> Any:
+    with model_slot(model):
+        limiter.acquire(OPENAI_HOST)
+        started = time.perf_counter()
+        try:
+            raw = create(**body)
+        except Exception as exc:
+            _record(model, started, None)
+            _observe_error(exc)
+            raise
+    limiter.observe(OPENAI_HOST, raw.headers)
+    response = raw.parse()
+    _record(model, started, response)
+    return response
+
+
+async def _arequest(model: str, create: Any, body: dict[str, Any]) -> Any:
+    async with _async_slot(model):
+        await limiter.acquire_async(OPENAI_HOST)
+        started = time.perf_counter()
+        try:
+            raw = await create(**body)
+        except Exception as exc:
+            _record(model, started, None)
+            _observe_error(exc)
+            raise
+    limiter.observe(OPENAI_HOST, raw.headers)
+    response = raw.parse()
+    _record(model, started, response)
+    return response
+
+
+def chat_completion(body: dict[str, Any]) -> Any:
+    """Parsed chat completion for `body` (see `summariser.request_body`)."""
+
+    chat = cast(Any, sync_client().chat.completions)
+    return _request(body["model"], chat.with_raw_response.create, body)
+
+
+def create_embeddings(body: dict[str, Any]) -> Any:
+    """Parsed embeddings response for `body` (see `embeddings.request_body`)."""
+
+    return _request(body["model"], sync_client().embeddings.with_raw_response.create, body)
+
+
+async def achat_completion(body: dict[str, Any]) -> Any:
+    """Async counterpart of `chat_completion`."""
+
+    chat = cast(Any, async_client().chat.completions)
+    return await _arequest(body["model"], chat.with_raw_response.create, body)
+
+
+async def acreate_embeddings(body: dict[str, Any]) -> Any:
+    """Async counterpart of `create_embeddings`."""
+
+    embeddings = async_client().embeddings
+    return await _arequest(body["model"], embeddings.with_raw_response.create, body)
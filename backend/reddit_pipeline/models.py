@@ -5,8 +5,13 @@ These schemas are used across ingestion, processing, and storage layers.
 
 from __future__ import annotations
 
+import sys
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import datetime
 
+import numpy as np
+import numpy.typing as npt
 from pydantic import BaseModel, Field
 
 
@@ -23,6 +28,153 @@ class Post(BaseModel):
     created_utc: datetime
     subreddit: str = Field(..., description="Subreddit or topic name")
     text: str | None = Field(None, description="Raw text; avoid PII beyond usernames")
+    is_duplicate: bool = Field(
+        default=False, description="Near-duplicate of another post in the run"
+    )
+
+    def in_window(self, since: datetime | None = None, min_comments: int | None = None) -> bool:
+        """True if created at/after `since` with more than `min_comments` comments.
+
+        Either bound may be None to skip that check.
+        """
+
+        if since is not None and self.created_utc < since:
+            return False
+        return min_comments is None or self.num_comments > max(0, min_comments)
+
+
+def _intern_column(values: Sequence[str]) -> tuple[npt.NDArray[np.int32], tuple[str, ...]]:
+    """Dictionary-encode strings into integer codes plus interned labels."""
+
+    index: dict[str, int] = {}
+    codes = np.fromiter(
+        (index.setdefault(v, len(index)) for v in values), dtype=np.int32, count=len(values)
+    )
+    return codes, tuple(sys.intern(v) for v in index)
+
+
+@dataclass(frozen=True, eq=False)
+class PostBatch:
+    """Columnar view over posts for vectorised filtering and ranking.
+
+    Numeric fields live in NumPy arrays (`created_utc` as epoch seconds) and
+    `source`/`subreddit` are dictionary-encoded. The original `Post` objects
+    are kept by reference, so converting back is just indexing.
+    """
+
+    posts: tuple[Post, ...]
+    score: npt.NDArray[np.int64]
+    num_comments: npt.NDArray[np.int64]
+    created_utc: npt.NDArray[np.float64]
+    source_codes: npt.NDArray[np.int32]
+    source_labels: tuple[str, ...]
+    subreddit_codes: npt.NDArray[np.int32]
+    subreddit_labels: tuple[str, ...]
+
+    @classmethod
+    def from_posts(cls, posts: Sequence[Post]) -> PostBatch:
+        n = len(posts)
+        source_codes, source_labels = _intern_column([p.source for p in posts])
+        subreddit_codes, subreddit_labels = _intern_column([p.subreddit for p in posts])
+        return cls(
+            posts=tuple(posts),
+            score=np.fromiter((p.score for p in posts), dtype=np.int64, count=n),
+            num_comments=np.fromiter((p.num_comments for p in posts), dtype=np.int64, count=n),
+            created_utc=np.fromiter(
+                (p.created_utc.timestamp() for p in posts), dtype=np.float64, count=n
+            ),
+            source_codes=source_codes,
+            source_labels=source_labels,
+            subreddit_codes=subreddit_codes,
+            subreddit_labels=subreddit_labels,
+        )
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+    def to_posts(self) -> list[Post]:
+        return list(self.posts)
+
+    def take(self, indices: npt.ArrayLike) -> PostBatch:
+        """Return a new batch with rows at `indices` (or where a boolean mask is true)."""
+
+        idx = np.asarray(indices)
+        if idx.dtype == np.bool_:
+            idx = np.flatnonzero(idx)
+        posts = self.posts
+        return PostBatch(
+            posts=tuple(posts[i] for i in idx.tolist()),
+            score=self.score[idx],
+            num_comments=self.num_comments[idx],
+            created_utc=self.created_utc[idx],
+            source_codes=self.source_codes[idx],
+            source_labels=self.source_labels,
+            subreddit_codes=self.subreddit_codes[idx],
+            subreddit_labels=self.subreddit_labels,
+        )
+
+    def window_mask(
+        self, since: datetime | None = None, min_comments: int | None = None
+    ) -> npt.NDArray[np.bool_]:
+        """Vectorised `Post.in_window` over the whole batch."""
+
+        mask = np.ones(len(self), dtype=np.bool_)
+        if since is not None:
+            mask &= self.created_utc >= since.timestamp()
+        if min_comments is not None:
+            mask &= self.num_comments > max(0, min_comments)
+        return mask
+
+    def source_mask(self, source: str) -> npt.NDArray[np.bool_]:
+        """Rows whose `source` equals `source`."""
+
+        if source not in self.source_labels:
+            return np.zeros(len(self), dtype=np.bool_)
+        mask: npt.NDArray[np.bool_] = self.source_codes == self.source_labels.index(source)
+        return mask
+
+    def subreddit_mask(self, subreddit: str) -> npt.NDArray[np.bool_]:
+        """Rows whose `subreddit` equals `subreddit`."""
+
+        if subreddit not in self.subreddit_labels:
+            return np.zeros(len(self), dtype=np.bool_)
+        code = self.subreddit_labels.index(subreddit)
+        mask: npt.NDArray[np.bool_] = self.subreddit_codes == code
+        return mask
+
+
+@dataclass(frozen=True, eq=False)
+class EmbeddingMatrix:
+    """Embeddings for a list of texts as one contiguous `(n, dim)` float32 matrix.
+
+    Row `i` belongs to text `i`; `mask[i]` is False (and the row all zeros)
+    where the text was empty or has no vector. `row` returns views into the
+    matrix, so handing rows on to vector math or writers does not copy.
+    """
+
+    vectors: npt.NDArray[np.float32]
+    mask: npt.NDArray[np.bool_]
+
+    @classmethod
+    def zeros(cls, n: int, dim: int) -> EmbeddingMatrix:
+        return cls(np.zeros((n, dim), dtype=np.float32), np.zeros(n, dtype=np.bool_))
+
+    def __len__(self) -> int:
+        return len(self.mask)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    def row(self, i: int) -> npt.NDArray[np.float32] | None:
+        """View of row `i`, or None if it has no vector."""
+
+        return self.vectors[i] if self.mask[i] else None
+
+    def valid_rows(self) -> npt.NDArray[np.intp]:
+        """Indices of rows that have a vector."""
+
+        return np.flatnonzero(self.mask)
 
 
 class Insight(BaseModel):
@@ -4,6 +4,10 @@ Implements a composite ranking score per requirements:
 - Inputs: score, comments, upvote_ratio (optional), created_utc
 - Freshness decay so newer posts rank higher.
 
+The batch functions evaluate the same formula over NumPy arrays with one
+pinned `now` and select the top N by partial selection instead of a full
+sort; ordering matches the scalar path (ties keep input order).
+
 All functions are pure and side-effect free for testability.
 """
 
@@ -11,7 +15,16 @@ from __future__ import annotations
 
 from datetime import UTC, datetime
 
-from .models import Post
+import numpy as np
+import numpy.typing as npt
+
+from .models import Post, PostBatch
+
+SCORE_WEIGHT = 1.0
+COMMENT_WEIGHT = 0.5
+RATIO_WEIGHT = 2.0
+# half-life ~ 48h: decay = 0.5 ** (age_hours/48)
+HALF_LIFE_HOURS = 48.0
 
 
 def composite_rank(
@@ -19,6 +32,7 @@ def composite_rank(
     comments: int,
     upvote_ratio: float | None,
     created_utc: datetime,
+    now: datetime | None = None,
 ) -> float:
     """Compute a composite ranking score.
 
@@ -28,31 +42,66 @@ def composite_rank(
     - Time decay: exponential decay by age in hours
     """
 
-    score_weight = 1.0
-    comment_weight = 0.5
-    ratio_weight = 2.0
-    # half-life ~ 48h: decay = 0.5 ** (age_hours/48)
-    half_life_hours = 48.0
-
-    base = score_weight * float(score) + comment_weight * float(comments)
-    ratio_bonus = ratio_weight * float(upvote_ratio) if upvote_ratio is not None else 0.0
+    base = SCORE_WEIGHT * float(score) + COMMENT_WEIGHT * float(comments)
+    ratio_bonus = RATIO_WEIGHT * float(upvote_ratio) if upvote_ratio is not None else 0.0
 
-    now = datetime.now(UTC)
+    now = now or datetime.now(UTC)
     age_hours = max(0.0, (now - created_utc).total_seconds() / 3600.0)
-    decay = 0.5 ** (age_hours / half_life_hours)
+    decay = 0.5 ** (age_hours / HALF_LIFE_HOURS)
 
     return float((base + ratio_bonus) * decay)
 
 
-def rank_posts(posts: list[Post]) -> list[Post]:
+def composite_rank_batch(
+    batch: PostBatch,
+    now: datetime | None = None,
+    upvote_ratio: npt.NDArray[np.float64] | None = None,
+) -> npt.NDArray[np.float64]:
+    """Vectorised `composite_rank` over a batch, with one `now` for every row.
+
+    `upvote_ratio` may hold NaN for rows without a ratio.
+    """
+
+    now_ts = (now or datetime.now(UTC)).timestamp()
+    base = SCORE_WEIGHT * batch.score.astype(np.float64) + COMMENT_WEIGHT * batch.num_comments
+    if upvote_ratio is not None:
+        base = base + RATIO_WEIGHT * np.nan_to_num(upvote_ratio, nan=0.0)
+    age_hours = np.maximum(0.0, (now_ts - batch.created_utc) / 3600.0)
+    ranks: npt.NDArray[np.float64] = base * np.power(0.5, age_hours / HALF_LIFE_HOURS)
+    return ranks
+
+
+def top_n_indices(scores: npt.NDArray[np.float64], n: int) -> npt.NDArray[np.intp]:
+    """Indices of the `n` highest scores, descending, ties in input order.
+
+    Uses `argpartition` (O(len)) and only sorts the candidates that can make
+    the cut, so the cost is O(len + k log k) rather than a full sort.
+    """
+
+    total = len(scores)
+    if n <= 0 or total == 0:
+        return np.empty(0, dtype=np.intp)
+    if n >= total:
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, n - 1)[:n]
+    threshold = scores[part].min()
+    # Everything tied at the threshold competes, so stable tie-breaking matches a full sort
+    candidates = np.flatnonzero(scores >= threshold)
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order[:n]
+
+
+def rank_posts(posts: list[Post], now: datetime | None = None) -> list[Post]:
     """Return posts sorted descending by composite rank."""
 
-    def _rank(p: Post) -> float:
-        return composite_rank(
-            score=p.score,
-            comments=p.num_comments,
-            upvote_ratio=None,  # not present in Post model; handled upstream if available
-            created_utc=p.created_utc,
-        )
+    batch = PostBatch.from_posts(posts)
+    order = np.argsort(-composite_rank_batch(batch, now), kind="stable")
+    return [posts[i] for i in order.tolist()]
+
+
+def top_n_posts(posts: list[Post], n: int, now: datetime | None = None) -> list[Post]:
+    """Return the `n` highest-ranked posts, equal to `rank_posts(posts)[:n]`."""
 
-    return sorted(posts, key=_rank, reverse=True)
+    batch = PostBatch.from_posts(posts)
+    order = top_n_indices(composite_rank_batch(batch, now), n)
+    return [posts[i] for i in order.tolist()]
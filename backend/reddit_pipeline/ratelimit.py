@@ -0,0 +1,213 @@
+"""Shared client-side rate limiting for outbound API calls.
+
+Complements `utils.retry_with_backoff`: instead of discovering a quota by
+hitting a 429 and sleeping a random interval, every client acquires a token
+from a per-host bucket before calling out. Buckets refill slightly below each
+provider's published quota and are corrected from the provider's own
+`Retry-After` / `X-Ratelimit-*` response headers. Works from threads and from
+asyncio code.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from typing import Any
+from urllib.parse import urlsplit
+
+from .config import settings
+
+OPENAI_HOST = "api.openai.com"
+
+# Requests per second and burst size per host, from each provider's documented quota
+DEFAULT_RATES: dict[str, tuple[float, float]] = {
+    "oauth.reddit.com": (100 / 60, 10),  # 100 QPM per OAuth client
+    "hn.algolia.com": (10_000 / 3600, 10),  # 10k requests per hour per IP
+    "api.producthunt.com": (450 / 900, 5),  # 450 requests per 15 minutes
+    OPENAI_HOST: (5_000 / 60, 50),  # tier-dependent; corrected from headers
+}
+FALLBACK_RATE: tuple[float, float] = (10.0, 10)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def host_of(url: str) -> str:
+    """Return the lower-cased host of a URL (or the input if it is a bare host)."""
+
+    return (urlsplit(url).hostname or url).lower()
+
+
+def parse_duration(value: str) -> float | None:
+    """Parse a reset duration such as `"12"`, `"1.5"`, `"20ms"` or `"6m0s"` into seconds."""
+
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(num) * _DURATION_UNITS[unit] for num, unit in parts)
+
+
+def parse_retry_after(value: str) -> float | None:
+    """Parse a `Retry-After` header (delta seconds or HTTP-date) into seconds from now."""
+
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _lower_headers(headers: Any) -> dict[str, str]:
+    if not isinstance(headers, Mapping):
+        return {}
+    return {str(k).lower(): str(v) for k, v in headers.items()}
+
+
+def retry_after_from_exception(exc: BaseException) -> float | None:
+    """Return the server-requested delay carried by an HTTP error, if any."""
+
+    response = getattr(exc, "response", None)
+    headers = _lower_headers(getattr(response, "headers", None))
+    value = headers.get("retry-after")
+    return parse_retry_after(value) if value is not None else None
+
+
+class TokenBucket:
+    """Thread-safe token bucket with reservation semantics.
+
+    Callers reserve a token and sleep until it is theirs, so concurrent callers
+    queue in arrival order instead of all retrying at once.
+    """
+
+    def __init__(self, rate: float, capacity: float, headroom: float = 0.9) -> None:
+        self.rate = max(1e-6, rate * headroom)
+        self.capacity = max(1.0, capacity)
+        self.headroom = headroom
+        self._configured_rate = self.rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take `tokens` now and return how long the caller must wait before using them."""
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Block all acquisitions for `seconds` (e.g. after a `Retry-After`)."""
+
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def update_quota(self, remaining: float, reset_seconds: float | None) -> None:
+        """Align the bucket with the provider's view of the current window."""
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, remaining)
+            if reset_seconds is None or reset_seconds <= 0:
+                return
+            if remaining < 1:
+                self._blocked_until = max(self._blocked_until, now + reset_seconds)
+                return
+            # Spread what is left of the window evenly, never above the configured rate
+            self.rate = min(self._configured_rate, remaining * self.headroom / reset_seconds)
+
+    def observe(self, headers: Any) -> None:
+        """Honour `Retry-After` and `X-Ratelimit-*` headers from a response."""
+
+        h = _lower_headers(headers)
+        if not h:
+            return
+        retry_after = h.get("retry-after")
+        if retry_after is not None:
+            delay = parse_retry_after(retry_after)
+            if delay:
+                self.pause(delay)
+        # Reddit: x-ratelimit-remaining/-reset; OpenAI: x-ratelimit-*-requests
+        remaining = h.get("x-ratelimit-remaining") or h.get("x-ratelimit-remaining-requests")
+        reset = h.get("x-ratelimit-reset") or h.get("x-ratelimit-reset-requests")
+        if remaining is None:
+            return
+        try:
+            remaining_value = float(remaining)
+        except ValueError:
+            return
+        self.update_quota(remaining_value, parse_duration(reset) if reset else None)
+
+
+class RateLimiter:
+    """Registry of per-host token buckets shared by every API client."""
+
+    def __init__(
+        self,
+        rates: Mapping[str, tuple[float, float]] | None = None,
+        headroom: float = 0.9,
+    ) -> None:
+        self._rates = dict(DEFAULT_RATES if rates is None else rates)
+        self._headroom = headroom
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        host = host_of(host)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, capacity = self._rates.get(host, FALLBACK_RATE)
+                bucket = TokenBucket(rate, capacity, self._headroom)
+                self._buckets[host] = bucket
+            return bucket
+
+    def acquire(self, host: str, tokens: float = 1.0) -> None:
+        self.bucket(host).acquire(tokens)
+
+    async def acquire_async(self, host: str, tokens: float = 1.0) -> None:
+        await self.bucket(host).acquire_async(tokens)
+
+    def observe(self, host: str, headers: Any) -> None:
+        self.bucket(host).observe(headers)
+
+
+def _configured_rates() -> dict[str, tuple[float, float]]:
+    rates = dict(DEFAULT_RATES)
+    for host, per_second in settings.rate_limit_overrides.items():
+        _, capacity = rates.get(host.lower(), FALLBACK_RATE)
+        rates[host.lower()] = (float(per_second), capacity)
+    return rates
+
+
+limiter = RateLimiter(_configured_rates(), headroom=settings.rate_limit_headroom)
@@ -6,88 +6,381 @@ safe to be executed by CI (weekly schedule) and locally for development.
 
 from __future__ import annotations
 
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
+import numpy as np
+import numpy.typing as npt
+
+from .cassette import active_cassette
+from .clients.hackernews import HackerNewsClient
+from .clients.producthunt import ProductHuntClient
 from .clients.reddit import RedditClient
 from .config import settings
+from .dedupe import (
+    dedupe_posts,
+    flag_near_duplicates,
+    flag_semantic_duplicates,
+    merge_by_canonical_url,
+)
+from .llm import insights as insights_llm
+from .llm import summariser as summariser_llm
+from .llm.batch import (
+    default_backend,
+    embed_texts_batch,
+    generate_insights_batch,
+    summarise_posts_batch,
+)
+from .llm.cache import embedding_cache, response_cache
 from .llm.embeddings import embed_texts
-from .llm.insights import generate_insights_from_summaries
-from .llm.summariser import summarise_posts_with_comments
-from .models import Post
-from .ranking import rank_posts
-from .storage.supabase import upsert_embedding, upsert_insight
+from .llm.limits import collect_isolated
+from .llm.transport import close_clients, model_concurrency, usage_stats
+from .models import Post, PostBatch
+from .ranking import HALF_LIFE_HOURS, composite_rank_batch, top_n_posts
+from .state import (
+    PipelineState,
+    advance_watermarks,
+    filter_new_or_changed,
+    filter_unprocessed,
+    load_state,
+    mark_processed,
+    save_state,
+)
+from .storage.supabase import (
+    refresh_rank_scores,
+    upsert_embeddings,
+    upsert_insight,
+    upsert_posts,
+)
+from .storage.vector_index import update_local_index
 from .utils import get_json_logger
 
 log = get_json_logger("reddit_pipeline.run")
 
+# How often to check whether a queued source fetch has started
+FETCH_QUEUE_POLL_SECONDS = 0.05
+
+
+@dataclass(frozen=True)
+class SourceTask:
+    """A single source fetch to run inside the concurrent fetch stage."""
+
+    name: str
+    fetch: Callable[[], list[Post]]
+    timeout_seconds: float
 
-def fetch_sources() -> list[Post]:
-    """Fetch items from enabled sources.
 
-    Currently enables Reddit only (HN/PH disabled by default via settings).
+def run_fetch_stage(
+    tasks: list[SourceTask], max_workers: int
+) -> tuple[list[Post], dict[str, float]]:
+    """Run source fetches concurrently on a bounded thread pool.
+
+    Up to `max_workers` sources run at once, so the stage takes about as long
+    as its slowest source rather than the sum of all of them. Each source is
+    isolated: an exception or a missed deadline only drops that source's
+    posts. A source's timeout counts from when it starts running, not from
+    when it was queued. Returns the merged posts (in task order) and
+    per-source wall-clock timings.
     """
 
-    log.info("Fetching sources...")
+    if not tasks:
+        return [], {}
 
-    posts: list[Post] = []
+    started_at: dict[int, float] = {}
+
+    def _timed(index: int, task: SourceTask) -> tuple[list[Post], float]:
+        started = started_at[index] = time.perf_counter()
+        items = task.fetch()
+        return items, time.perf_counter() - started
 
-    # Reddit fetch (enabled by default via required secrets)
+    posts: list[Post] = []
+    timings: dict[str, float] = {}
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(tasks))), thread_name_prefix="fetch"
+    )
     try:
-        reddit = RedditClient(
-            client_id=settings.reddit_client_id,
-            client_secret=settings.reddit_client_secret,
-            user_agent=settings.reddit_user_agent,
+        stage_started = time.perf_counter()
+        # A source queued behind a hung one may never start; give up on it once
+        # every source could have run back to back
+        queue_deadline = stage_started + sum(task.timeout_seconds for task in tasks)
+
+        def _result(index: int, task: SourceTask, future: Future[Any]) -> Any:
+            while (started := started_at.get(index)) is None:
+                wait = min(FETCH_QUEUE_POLL_SECONDS, queue_deadline - time.perf_counter())
+                if wait <= 0:
+                    raise FutureTimeoutError
+                try:
+                    return future.result(timeout=wait)
+                except FutureTimeoutError:
+                    continue
+            remaining = task.timeout_seconds - (time.perf_counter() - started)
+            return future.result(timeout=max(0.0, remaining))
+
+        futures = [(task, executor.submit(_timed, i, task)) for i, task in enumerate(tasks)]
+        for index, (task, future) in enumerate(futures):
+            try:
+                items, elapsed = _result(index, task, future)
+            except FutureTimeoutError:
+                future.cancel()
+                timings[task.name] = time.perf_counter() - started_at.get(index, stage_started)
+                log.error(
+                    "Source fetch timed out",
+                    extra={"source": task.name, "timeout_seconds": task.timeout_seconds},
+                )
+                continue
+            except Exception as exc:
+                timings[task.name] = time.perf_counter() - started_at.get(index, stage_started)
+                log.error("Source fetch failed", extra={"source": task.name, "error": str(exc)})
+                continue
+            timings[task.name] = elapsed
+            posts.extend(items)
+    finally:
+        # Do not block on a hung source; its thread finishes in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return posts, timings
+
+
+def _reddit_client() -> RedditClient:
+    return RedditClient(
+        client_id=settings.reddit_client_id,
+        client_secret=settings.reddit_client_secret,
+        user_agent=settings.reddit_user_agent,
+    )
+
+
+def _fetch_reddit() -> list[Post]:
+    reddit = _reddit_client()
+    # Fetch last N days (configurable) for a small curated list of subs
+    since = datetime.now(UTC) - timedelta(days=max(1, settings.reddit_lookback_days))
+    subs = [
+        "technology",
+        "programming",
+    ]
+    per_sub = max(1, min(10, settings.top_n_posts))
+    # Filter to window and minimum comments (configurable) while streaming
+    return list(
+        reddit.iter_top_submissions(
+            subs, per_sub, since=since, min_comments=settings.reddit_min_comments
         )
-        # Fetch last N days (configurable) for a small curated list of subs
-        since = datetime.now(UTC) - timedelta(days=max(1, settings.reddit_lookback_days))
-        subs = [
-            "technology",
-            "programming",
-        ]
-        per_sub = max(1, min(10, settings.top_n_posts))
-        fetched = reddit.fetch_top_submissions(subs, since, per_sub)
-        # Filter to window and minimum comments (configurable)
-        posts.extend(
-            [
-                p
-                for p in fetched
-                if p.created_utc >= since and p.num_comments > max(0, settings.reddit_min_comments)
-            ]
+    )
+
+
+def _fetch_hackernews() -> list[Post]:
+    return list(HackerNewsClient().iter_top(limit=max(1, settings.top_n_posts)))
+
+
+def _fetch_producthunt() -> list[Post]:
+    return list(ProductHuntClient().iter_today(limit=max(1, settings.top_n_posts)))
+
+
+def fetch_sources(state: PipelineState | None = None) -> list[Post]:
+    """Fetch items from enabled sources concurrently.
+
+    Reddit is always enabled; HN/PH are opt-in via settings. Per-source timings
+    are logged so the slowest source is visible. When `state` is given, items
+    already processed in an earlier run (and not materially changed since) are
+    dropped so downstream work only covers new content.
+    """
+
+    log.info("Fetching sources...")
+
+    tasks = [SourceTask("reddit", _fetch_reddit, settings.reddit_fetch_timeout_seconds)]
+    if settings.hackernews_enabled:
+        tasks.append(
+            SourceTask("hackernews", _fetch_hackernews, settings.hackernews_fetch_timeout_seconds)
+        )
+    if settings.producthunt_enabled:
+        tasks.append(
+            SourceTask(
+                "producthunt", _fetch_producthunt, settings.producthunt_fetch_timeout_seconds
+            )
         )
-    except Exception as exc:  # pragma: no cover
-        log.error("Reddit fetch failed", extra={"error": str(exc)})
 
+    posts, timings = run_fetch_stage(tasks, settings.fetch_max_workers)
+    log.info(
+        "Fetched %d posts from %d sources",
+        len(posts),
+        len(tasks),
+        extra={"timings": {name: round(sec, 3) for name, sec in timings.items()}},
+    )
+    if state is not None:
+        fresh = filter_new_or_changed(posts, state, settings.incremental_comment_growth)
+        log.info("Skipping %d already-processed posts", len(posts) - len(fresh))
+        posts = fresh
     return posts
 
 
-def process(posts: list[Post]) -> list[Post]:
-    """Run dedupe/ranking/LLM pipelines with top-N selection.
+def hydrate_comments(posts: list[Post]) -> dict[str, list[dict[str, Any]]]:
+    """Fetch the top-K comments for the selected Reddit posts in one bulk call.
 
-    Note: fetching comments is not implemented here; provide top-K per post via
-    external fetch in a real client. For now, pass empty comments.
+    Non-Reddit posts (and every post when `top_k_comments` is 0) get an empty
+    list so the summariser sees a complete mapping.
+    """
+
+    comments_by_post: dict[str, list[dict[str, Any]]] = {p.id: [] for p in posts}
+    reddit_ids = [p.id for p in posts if p.source == "reddit"]
+    if not reddit_ids or settings.top_k_comments <= 0:
+        return comments_by_post
+    fetched = _reddit_client().fetch_comments_bulk(
+        reddit_ids, settings.top_k_comments, max_workers=settings.comments_max_workers
+    )
+    comments_by_post.update(fetched)
+    return comments_by_post
+
+
+def dedupe(posts: list[Post]) -> list[Post]:
+    """Drop exact duplicates by ID, merge same-URL posts across sources and
+    flag near-duplicate reposts.
+
+    Flagged posts stay in the list (with `is_duplicate=True`) so they can be
+    persisted, but `process` skips them.
+    """
+
+    posts = dedupe_posts(posts)
+    if settings.url_dedupe_enabled:
+        posts = merge_by_canonical_url(posts)
+    if settings.near_dedupe_enabled:
+        posts = flag_near_duplicates(posts, settings.near_dedupe_threshold)
+    log.info("Flagged %d duplicate posts", sum(1 for p in posts if p.is_duplicate))
+    return posts
+
+
+def semantic_dedupe(
+    posts: list[Post],
+) -> tuple[list[Post], dict[str, npt.NDArray[np.float32]]]:
+    """Flag stories that are the same in embedding space, before any LLM work.
+
+    Embeds the titles of posts not already flagged and keeps the top-ranked
+    post of each cluster. Returns the posts and the title vectors by post ID
+    (row views into the embedding matrix) so `process` can reuse them instead
+    of embedding the titles again.
+    """
+
+    candidates = [p for p in posts if not p.is_duplicate]
+    if len(candidates) < 2:
+        return posts, {}
+    embedded = embed_texts([p.title for p in candidates])
+    flagged = flag_semantic_duplicates(
+        candidates, embedded.vectors, settings.semantic_dedupe_threshold
+    )
+    log.info("Flagged %d semantic duplicates", sum(1 for p in flagged if p.is_duplicate))
+    by_id = {p.id: p for p in flagged}
+    posts = [by_id.get(p.id, p) for p in posts]
+    return posts, {candidates[i].id: embedded.vectors[i] for i in embedded.valid_rows()}
+
+
+def run_llm_stage(
+    posts: list[Post], comments_by_post: dict[str, list[dict[str, Any]]]
+) -> tuple[dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+    """Summarise posts and generate their insights on one thread pool.
+
+    Each post's insight request is submitted as soon as its summary is ready,
+    so total wall time approaches the slowest summary + insight pair rather
+    than the sum of all calls. With `LLM_PACK_ENABLED` the unit of work is a
+    pack of posts rather than a single post. In-flight requests per model are
+    bounded by the transport. Returns `(summaries, insights)` keyed by post ID
+    in input order; failed items are left out unless every item of a stage
+    fails.
     """
 
-    log.info("Processing %d posts...", len(posts))
     if not posts:
-        return posts
+        return {}, {}
+    packs = summariser_llm.plan_packs(posts, comments_by_post)
+    workers = min(
+        2 * len(packs),
+        model_concurrency(settings.llm_model_summariser)
+        + model_concurrency(settings.llm_model_munger),
+    )
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        summary_futures = {
+            ",".join(p.id for p in pack): pool.submit(
+                summariser_llm.summarise_pack, pack, comments_by_post
+            )
+            for pack in packs
+        }
+        pack_keys = {future: key for key, future in summary_futures.items()}
+        insight_futures: dict[str, Future[dict[str, dict[str, Any]]]] = {}
+        for future in as_completed(pack_keys):
+            if future.exception() is None:
+                for group in insights_llm.plan_packs(future.result()):
+                    insight_futures[",".join(group)] = pool.submit(
+                        insights_llm.generate_insights_pack, group
+                    )
+    by_post = {
+        post_id: payload
+        for pack in collect_isolated(summary_futures, "summarise").values()
+        for post_id, payload in pack.items()
+    }
+    summaries = {p.id: by_post[p.id] for p in posts if p.id in by_post}
+    insight_packs = collect_isolated(insight_futures, "insights")
+    by_post = {
+        post_id: payload for pack in insight_packs.values() for post_id, payload in pack.items()
+    }
+    insights = {post_id: by_post[post_id] for post_id in summaries if post_id in by_post}
+    return summaries, insights
+
 
-    ranked = rank_posts(posts)
-    top_n = settings.top_n_posts
-    selected = ranked[:top_n]
+def process(
+    posts: list[Post],
+    title_vectors: dict[str, npt.NDArray[np.float32]] | None = None,
+    state: PipelineState | None = None,
+) -> list[Post]:
+    """Run ranking/LLM pipelines with top-N selection.
 
-    # Placeholder comments map: in a real integration, supply top-K comments
-    comments_by_post: dict[str, list[dict[str, Any]]] = {p.id: [] for p in selected}
+    Posts flagged `is_duplicate` by `dedupe` are skipped, and so are posts
+    `state` records as already summarised with unchanged content. Top-K
+    comments for the selected Reddit posts are hydrated in bulk before
+    summarisation. Title vectors already computed by `semantic_dedupe` are
+    reused. Completed posts are upserted (with `rank_score`) before their
+    insights, which reference them. Returns the selected posts whose summary
+    and insight were both generated and stored; posts whose LLM calls failed
+    are left out so the next run retries them.
+    """
 
-    summaries = summarise_posts_with_comments(selected, comments_by_post)
-    insights = generate_insights_from_summaries(summaries)
+    log.info("Processing %d posts...", len(posts))
+    candidates = [p for p in posts if not p.is_duplicate]
+    if state is not None:
+        before = len(candidates)
+        candidates = filter_unprocessed(candidates, state, settings.incremental_comment_growth)
+        log.info("Skipping %d already summarised posts", before - len(candidates))
+    if not candidates:
+        return candidates
+
+    selected = top_n_posts(candidates, settings.top_n_posts)
+
+    comments_by_post = hydrate_comments(selected)
+
+    if settings.llm_batch_mode:
+        backend = default_backend()
+        summaries = summarise_posts_batch(selected, comments_by_post, backend)
+        insights = generate_insights_batch(summaries, backend)
+    else:
+        summaries, insights = run_llm_stage(selected, comments_by_post)
+
+    completed = [p for p in selected if p.id in insights]
+    if len(completed) < len(selected):
+        log.info(
+            "Leaving %d posts with failed LLM calls for the next run",
+            len(selected) - len(completed),
+        )
+    # Posts first: insights reference `posts(id)`
+    upsert_ranked_posts(completed)
 
     # Embeddings: post.title, summariser.summary, and each insight record
+    title_vectors = title_vectors or {}
     texts: list[str] = []
     embedding_targets: list[tuple[str, str]] = []  # (entity_type, entity_id)
+    reused = [("post", p.id) for p in selected if p.id in title_vectors]
     for p in selected:
-        texts.append(p.title)
-        embedding_targets.append(("post", p.id))
+        if p.id not in title_vectors:
+            texts.append(p.title)
+            embedding_targets.append(("post", p.id))
         summ = summaries.get(p.id, {}).get("summary", "")
         texts.append(str(summ))
         embedding_targets.append(("post", f"{p.id}#summary"))
@@ -96,10 +389,24 @@ def process(posts: list[Post]) -> list[Post]:
         texts.append(str(insight_json))
         embedding_targets.append(("insight", post_id))
 
-    vectors = embed_texts(texts)
-    for (entity_type, entity_id), vec in zip(embedding_targets, vectors):
-        if vec:
-            upsert_embedding(entity_type, entity_id, vec)
+    if settings.llm_batch_mode:
+        embedded = embed_texts_batch(texts, backend)
+    else:
+        embedded = embed_texts(texts)
+    valid = embedded.valid_rows()
+    targets = reused + [embedding_targets[i] for i in valid]
+    if not reused and len(valid) == len(embedded):
+        # Nothing reused and no empty rows: hand the matrix to storage as is
+        vectors = embedded.vectors
+    else:
+        # Fill one preallocated matrix in place instead of stacking copies
+        vectors = np.empty((len(targets), embedded.dim), dtype=np.float32)
+        for row, (_, entity_id) in enumerate(reused):
+            vectors[row] = title_vectors[entity_id]
+        np.take(embedded.vectors, valid, axis=0, out=vectors[len(reused) :])
+    upsert_embeddings(targets, vectors)
+    if settings.vector_index_enabled:
+        update_local_index(targets, vectors)
 
     # Persist insights JSON per-post
     for post_id, data in insights.items():
@@ -126,21 +433,69 @@ def process(posts: list[Post]) -> list[Post]:
             }
         )
 
-    return selected
+    return completed
 
 
-def persist(posts: list[Post]) -> None:
-    """Persist outputs to Supabase using UPSERT semantics. Placeholder for now."""
+def upsert_ranked_posts(posts: list[Post]) -> None:
+    """UPSERT posts with their current `rank_score` materialised.
+
+    `rank_score` is written at ingest so dashboard reads sort on the index.
+    Posts flagged `is_duplicate` get a score of 0 so they sink below the post
+    that was kept.
+    """
 
     log.info("Persisting %d posts...", len(posts))
+    if not posts:
+        return
+    ranks = composite_rank_batch(PostBatch.from_posts(posts))
+    ranks[[i for i, p in enumerate(posts) if p.is_duplicate]] = 0.0
+    upsert_posts(posts, {p.id: float(r) for p, r in zip(posts, ranks.tolist())})
+
+
+def persist(posts: list[Post]) -> None:
+    """Persist posts with `upsert_ranked_posts`, then refresh ranks in bulk.
+
+    The database re-applies the freshness decay to every recent post, which
+    also ages posts from earlier runs. Summarised posts are written by
+    `process` ahead of their insights; `main` passes the remaining ones here.
+    """
+
+    upsert_ranked_posts(posts)
+    refreshed = refresh_rank_scores(HALF_LIFE_HOURS)
+    log.info("Refreshed rank scores for %d posts", refreshed)
 
 
 def main() -> None:
     log.info("Starting pipeline with settings loaded")
     _ = settings  # ensure settings is initialised
-    posts = fetch_sources()
-    processed = process(posts)
-    persist(processed)
+    use_state = settings.incremental_fetch_enabled or settings.skip_processed_enabled
+    state = load_state(settings.pipeline_state_path) if use_state else None
+    posts = dedupe(fetch_sources(state if settings.incremental_fetch_enabled else None))
+    title_vectors: dict[str, npt.NDArray[np.float32]] = {}
+    if settings.semantic_dedupe_enabled:
+        posts, title_vectors = semantic_dedupe(posts)
+    summarised = process(posts, title_vectors, state if settings.skip_processed_enabled else None)
+    # Only posts that made it through the LLM stages count as processed, so a
+    # post that hit a transient error is fetched and summarised again next run.
+    # `process` already wrote those; duplicates are persisted too so
+    # `posts.is_duplicate` records them.
+    duplicates = [p for p in posts if p.is_duplicate]
+    persist(duplicates)
+    processed = summarised + duplicates
+    cassette = active_cassette()
+    if cassette is not None:
+        cassette.save()
+    if state is not None:
+        # Only advance once outputs are persisted so a failed run is retried in full
+        advance_watermarks(state, processed)
+        mark_processed(state, summarised)
+        save_state(state, settings.pipeline_state_path)
+    for name, cache in (("responses", response_cache()), ("embeddings", embedding_cache())):
+        if cache is not None:
+            log.info("LLM cache stats", extra={"cache": name, **cache.stats()})
+    for model, usage in usage_stats().items():
+        log.info("LLM usage", extra={"model": model, **usage})
+    close_clients()
     log.info("Pipeline finished")
 
 
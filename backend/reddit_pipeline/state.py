@@ -0,0 +1,173 @@
+"""Local pipeline state: per-source watermarks for incremental ingestion.
+
+Each source/subreddit pair keeps the IDs (with their comment counts) already
+processed. Later runs use this to pass only new or materially changed items
+downstream, so LLM work scales with new content rather than with the lookback
+window.
+
+Independently of the watermarks, every post that went through the LLM stages
+is recorded with a hash of its content, so a post that is still hot a week
+later is not summarised again unless it was edited or its discussion grew.
+
+State lives in a small JSON file; a missing or unreadable file simply means a
+full run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+import orjson
+from pydantic import BaseModel, Field
+
+from .models import Post
+from .utils import get_json_logger
+
+log = get_json_logger("reddit_pipeline.state")
+
+# Cap on remembered IDs per watermark so the state file stays small
+MAX_SEEN_PER_KEY = 5000
+# Cap on remembered processed posts (oldest are forgotten first)
+MAX_PROCESSED = 20000
+
+
+class SourceWatermark(BaseModel):
+    """Incremental ingestion watermark for one source/subreddit pair."""
+
+    seen: dict[str, int] = Field(
+        default_factory=dict, description="Processed post ID -> comment count at the time"
+    )
+
+
+class ProcessedPost(BaseModel):
+    """What a post looked like when it last went through the LLM stages."""
+
+    content_hash: str
+    num_comments: int = 0
+
+
+class PipelineState(BaseModel):
+    """Everything the pipeline persists locally between runs."""
+
+    watermarks: dict[str, SourceWatermark] = Field(default_factory=dict)
+    processed: dict[str, ProcessedPost] = Field(
+        default_factory=dict, description="Summarised post ID -> content at the time"
+    )
+
+
+def watermark_key(post: Post) -> str:
+    """Return the watermark key for a post, e.g. `reddit:programming`."""
+
+    return f"{post.source}:{post.subreddit.lower()}"
+
+
+def content_hash(post: Post) -> str:
+    """Short stable hash of the post content the LLM stages read."""
+
+    payload = "\x1f".join((post.title, post.text or "", post.url))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_state(path: str | Path) -> PipelineState:
+    """Load state from `path`; returns empty state when missing or invalid."""
+
+    p = Path(path)
+    if not p.exists():
+        return PipelineState()
+    try:
+        return PipelineState.model_validate(orjson.loads(p.read_bytes()))
+    except Exception as exc:
+        log.error("Ignoring unreadable pipeline state", extra={"path": str(p), "error": str(exc)})
+        return PipelineState()
+
+
+def save_state(state: PipelineState, path: str | Path) -> None:
+    """Atomically write state to `path`."""
+
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_bytes(orjson.dumps(state.model_dump(mode="json")))
+    os.replace(tmp, p)
+
+
+def _grew(current: int, previous: int, comment_growth: float) -> bool:
+    """True if the comment count reached `comment_growth` times `previous`."""
+
+    return current >= max(previous + 1, previous * comment_growth)
+
+
+def is_new_or_changed(post: Post, state: PipelineState, comment_growth: float) -> bool:
+    """True if the post was never processed, was edited, or its discussion grew materially.
+
+    "Materially" means the comment count reached `comment_growth` times the
+    count recorded when the post was last processed. Posts that went through
+    the LLM stages defer to `needs_processing`, so an edit is caught here too
+    rather than only after the fetch filter has already dropped the post.
+    """
+
+    mark = state.watermarks.get(watermark_key(post))
+    if mark is None:
+        return True
+    previous = mark.seen.get(post.id)
+    if previous is None:
+        return True
+    if post.id in state.processed:
+        return needs_processing(post, state, comment_growth)
+    return _grew(post.num_comments, previous, comment_growth)
+
+
+def filter_new_or_changed(
+    posts: list[Post], state: PipelineState, comment_growth: float
+) -> list[Post]:
+    """Drop posts already processed whose discussion has not grown materially."""
+
+    return [p for p in posts if is_new_or_changed(p, state, comment_growth)]
+
+
+def advance_watermarks(state: PipelineState, posts: list[Post]) -> None:
+    """Record `posts` as processed under their source/subreddit watermark."""
+
+    for post in posts:
+        mark = state.watermarks.setdefault(watermark_key(post), SourceWatermark())
+        # Re-insert so the dict stays ordered from least to most recently seen
+        mark.seen.pop(post.id, None)
+        mark.seen[post.id] = post.num_comments
+    for mark in state.watermarks.values():
+        overflow = len(mark.seen) - MAX_SEEN_PER_KEY
+        if overflow > 0:
+            for stale in list(mark.seen)[:overflow]:
+                del mark.seen[stale]
+
+
+def needs_processing(post: Post, state: PipelineState, comment_growth: float) -> bool:
+    """True if the post was never summarised, was edited, or its discussion grew."""
+
+    record = state.processed.get(post.id)
+    if record is None or record.content_hash != content_hash(post):
+        return True
+    return _grew(post.num_comments, record.num_comments, comment_growth)
+
+
+def filter_unprocessed(
+    posts: list[Post], state: PipelineState, comment_growth: float
+) -> list[Post]:
+    """Drop posts already summarised whose content has not changed materially."""
+
+    return [p for p in posts if needs_processing(p, state, comment_growth)]
+
+
+def mark_processed(state: PipelineState, posts: list[Post]) -> None:
+    """Record `posts` as summarised with their current content hash."""
+
+    for post in posts:
+        state.processed.pop(post.id, None)
+        state.processed[post.id] = ProcessedPost(
+            content_hash=content_hash(post), num_comments=post.num_comments
+        )
+    overflow = len(state.processed) - MAX_PROCESSED
+    if overflow > 0:
+        for stale in list(state.processed)[:overflow]:
+            del state.processed[stale]
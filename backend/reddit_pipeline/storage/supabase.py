@@ -5,9 +5,12 @@ All writes must be idempotent (UPSERT) keyed by stable IDs.
 
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping, Sequence
 from typing import Any
 
+import numpy as np
+import numpy.typing as npt
+
 try:  # import optional dependency (third-party)
     from supabase import Client, create_client
 except Exception:  # pragma: no cover
@@ -16,31 +19,42 @@ except Exception:  # pragma: no cover
 
 from ..config import settings
 from ..models import Post, UpsertResult
+from ..ratelimit import host_of, limiter
 from ..utils import get_json_logger, retry_with_backoff
 
 log = get_json_logger("reddit_pipeline.storage.supabase")
 
+# Rows per embeddings insert request
+EMBEDDING_WRITE_CHUNK = 200
+
 
 class SupabaseStore:
     def __init__(self, url: str, key: str) -> None:
         self.url = url
         self.key = key
         self._client: Client | None = None
+        self._host = host_of(url)
 
     def _get_client(self) -> Client:
         if self._client is None:
             if create_client is None:
                 raise RuntimeError("supabase client not available")
             self._client = create_client(self.url, self.key)
+        # Every caller issues a request right after obtaining the client
+        limiter.acquire(self._host)
         return self._client
 
     @retry_with_backoff()
-    def upsert_posts(self, posts: Iterable[Post]) -> UpsertResult:
+    def upsert_posts(
+        self, posts: Iterable[Post], rank_scores: Mapping[str, float] | None = None
+    ) -> UpsertResult:
+        """UPSERT posts, materialising `rank_score` when scores are given."""
+
         items = list(posts)
         log.info("Upserting posts", extra={"count": len(items)})
         if not items or not settings.supabase_enable_writes:
             return UpsertResult(inserted=0, updated=0)
-        data = [
+        data: list[dict[str, Any]] = [
             {
                 "id": p.id,
                 "title": p.title,
@@ -51,14 +65,34 @@ class SupabaseStore:
                 "comments_count": p.num_comments,
                 "subreddit_or_channel": p.subreddit,
                 "source_id": None,
+                "is_duplicate": p.is_duplicate,
             }
             for p in items
         ]
+        if rank_scores is not None:
+            for row in data:
+                if row["id"] in rank_scores:
+                    row["rank_score"] = round(float(rank_scores[row["id"]]), 6)
         client = self._get_client()
         resp = client.table("posts").upsert(data, on_conflict="id").execute()
         inserted = len(resp.data) if getattr(resp, "data", None) else 0
         return UpsertResult(inserted=inserted, updated=0)
 
+    @retry_with_backoff()
+    def refresh_rank_scores(self, half_life_hours: float) -> int:
+        """Re-apply rank decay to every recent post in one SQL call.
+
+        Runs `refresh_rank_scores()` from `supabase/schema.sql`; returns the
+        number of posts refreshed.
+        """
+
+        if not settings.supabase_enable_writes:
+            return 0
+        client = self._get_client()
+        resp = client.rpc("refresh_rank_scores", {"half_life_hours": half_life_hours}).execute()
+        data = getattr(resp, "data", None)
+        return int(data) if isinstance(data, int | float) else 0
+
     @retry_with_backoff()
     def upsert_insight(self, insight: dict[str, Any]) -> None:
         if not settings.supabase_enable_writes:
@@ -66,18 +100,41 @@ class SupabaseStore:
         client = self._get_client()
         client.table("insights").upsert(insight, on_conflict="id").execute()
 
+    def upsert_embedding(self, entity_type: str, entity_id: str, vector: npt.ArrayLike) -> None:
+        self.upsert_embeddings([(entity_type, entity_id)], np.asarray([vector]))
+
     @retry_with_backoff()
-    def upsert_embedding(self, entity_type: str, entity_id: str, vector: list[float]) -> None:
-        if not settings.supabase_enable_writes:
+    def upsert_embeddings(
+        self, targets: Sequence[tuple[str, str]], vectors: npt.NDArray[np.float32]
+    ) -> None:
+        """Replace the embeddings of `targets` (entity type and ID per row of `vectors`).
+
+        One delete per entity type and one insert per `EMBEDDING_WRITE_CHUNK`
+        rows; vectors are converted to JSON lists only here.
+        """
+
+        log.info("Upserting embeddings", extra={"count": len(targets)})
+        if not targets or not settings.supabase_enable_writes:
             return
-        client = self._get_client()
-        # simple delete+insert to ensure idempotency for this demo
-        client.table("embeddings").delete().eq("entity_type", entity_type).eq(
-            "entity_id", entity_id
-        ).execute()
-        client.table("embeddings").insert(
-            {"entity_type": entity_type, "entity_id": entity_id, "embedding": vector}
-        ).execute()
+        ids_by_type: dict[str, list[str]] = {}
+        for entity_type, entity_id in targets:
+            ids_by_type.setdefault(entity_type, []).append(entity_id)
+        # delete+insert keeps the write idempotent without a unique key on the table
+        for entity_type, ids in ids_by_type.items():
+            client = self._get_client()
+            client.table("embeddings").delete().eq("entity_type", entity_type).in_(
+                "entity_id", ids
+            ).execute()
+        for start in range(0, len(targets), EMBEDDING_WRITE_CHUNK):
+            chunk = targets[start : start + EMBEDDING_WRITE_CHUNK]
+            rows = [
+                {"entity_type": entity_type, "entity_id": entity_id, "embedding": vector}
+                for (entity_type, entity_id), vector in zip(
+                    chunk, vectors[start : start + EMBEDDING_WRITE_CHUNK].tolist()
+                )
+            ]
+            client = self._get_client()
+            client.table("embeddings").insert(rows).execute()
 
 
 # --- Module-level helpers used by pipeline ---
@@ -101,6 +158,16 @@ def upsert_post(post_dict: dict[str, Any]) -> None:
     _ensure_store().upsert_posts([p])
 
 
+def upsert_posts(posts: list[Post], rank_scores: Mapping[str, float] | None = None) -> UpsertResult:
+    """UPSERT posts in one request, with their current `rank_score` if given."""
+    return _ensure_store().upsert_posts(posts, rank_scores)
+
+
+def refresh_rank_scores(half_life_hours: float) -> int:
+    """Decay `posts.rank_score` in bulk inside the database."""
+    return _ensure_store().refresh_rank_scores(half_life_hours)
+
+
 def upsert_comment(comment_dict: dict[str, Any]) -> None:
     """UPSERT a single comment into Supabase (not implemented here)."""
     log.info("upsert_comment", extra={"id": comment_dict.get("id")})
@@ -111,6 +178,11 @@ def upsert_insight(insight_dict: dict[str, Any]) -> None:
     _ensure_store().upsert_insight(insight_dict)
 
 
-def upsert_embedding(entity_type: str, entity_id: str, vector: list[float]) -> None:
+def upsert_embedding(entity_type: str, entity_id: str, vector: npt.ArrayLike) -> None:
     """UPSERT an embedding vector for a post/insight."""
     _ensure_store().upsert_embedding(entity_type, entity_id, vector)
+
+
+def upsert_embeddings(targets: Sequence[tuple[str, str]], vectors: npt.NDArray[np.float32]) -> None:
+    """UPSERT one embedding per `(entity_type, entity_id)` from the rows of `vectors`."""
+    _ensure_store().upsert_embeddings(targets, vectors)
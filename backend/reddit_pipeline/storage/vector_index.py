@@ -0,0 +1,308 @@
+"""Local on-disk vector index for semantic search over post and insight embeddings.
+
+An inverted-file (IVF) index: vectors are clustered with spherical k-means and
+a query only scores the rows of its `nprobe` nearest clusters. Small indexes
+(fewer than `MIN_TRAIN_ROWS` vectors) are searched exactly. Rows are keyed by
+`(entity_type, entity_id)`, as in the Supabase `embeddings` table.
+
+Adding a key that already exists replaces its vector; deletes leave a
+tombstone that is compacted away once tombstones make up `COMPACT_RATIO` of
+the rows. The index is retrained whenever it has doubled in size since the
+last training run.
+
+On disk the index is a directory of `.npy` files plus `meta.json`, written to
+a sibling directory and swapped in so a crashed save never leaves a mix of
+old and new files. `VectorIndex.open` memory-maps the vectors, so loading a
+large index is cheap and only the probed rows are read.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import orjson
+
+from ..config import settings
+from ..utils import get_json_logger
+
+log = get_json_logger("reddit_pipeline.storage.vector_index")
+
+Key = tuple[str, str]
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.npy"
+ALIVE_FILE = "alive.npy"
+ASSIGN_FILE = "assign.npy"
+CENTROIDS_FILE = "centroids.npy"
+
+MIN_TRAIN_ROWS = 256
+TRAIN_SAMPLE = 20000
+KMEANS_ITERATIONS = 10
+COMPACT_RATIO = 0.25
+_SEED = 0x5EED
+
+
+def _normalise(matrix: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    out: npt.NDArray[np.float32] = np.divide(
+        matrix, norms, out=np.zeros_like(matrix), where=norms > 0
+    )
+    return out
+
+
+def _top_k(scores: npt.NDArray[np.float32], k: int) -> npt.NDArray[np.intp]:
+    """Indices of the `k` largest `scores`, best first."""
+
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k)[:k]
+    ordered: npt.NDArray[np.intp] = part[np.argsort(-scores[part], kind="stable")]
+    return ordered
+
+
+def train_centroids(
+    vectors: npt.NDArray[np.float32], nlist: int, iterations: int = KMEANS_ITERATIONS
+) -> npt.NDArray[np.float32]:
+    """Spherical k-means centroids (unit length) for unit-length `vectors`.
+
+    Seeded, so the same vectors always give the same clustering. Clusters
+    that end up empty are re-seeded from a random vector.
+    """
+
+    rng = np.random.default_rng(_SEED)
+    nlist = max(1, min(nlist, len(vectors)))
+    centroids: npt.NDArray[np.float32] = vectors[
+        rng.choice(len(vectors), size=nlist, replace=False)
+    ]
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.flatnonzero(np.bincount(assign, minlength=nlist) == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), size=len(empty))]
+        centroids = _normalise(sums)
+    return centroids
+
+
+class VectorIndex:
+    """IVF index over unit-normalised float32 vectors keyed by `(entity_type, entity_id)`."""
+
+    def __init__(self, dim: int, nprobe: int = 8) -> None:
+        self.dim = dim
+        self.nprobe = nprobe
+        self._vectors: npt.NDArray[np.float32] = np.zeros((0, dim), dtype=np.float32)
+        self._alive: npt.NDArray[np.bool_] = np.zeros(0, dtype=np.bool_)
+        self._assign: npt.NDArray[np.int32] = np.zeros(0, dtype=np.int32)
+        self._centroids: npt.NDArray[np.float32] | None = None
+        self._keys: list[Key] = []
+        self._rows: dict[Key, int] = {}
+        self._trained_size = 0
+        self._lists: tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]] | None = None
+
+    @classmethod
+    def open(cls, path: str | Path, dim: int, nprobe: int = 8) -> VectorIndex:
+        """Load the index at `path` (vectors memory-mapped), or an empty one if missing.
+
+        Raises ValueError if the stored index has a different dimension.
+        """
+
+        index = cls(dim, nprobe)
+        root = Path(path)
+        if not (root / META_FILE).exists():
+            return index
+        meta = orjson.loads((root / META_FILE).read_bytes())
+        if meta["dim"] != dim:
+            raise ValueError(f"Vector index at {root} has dim {meta['dim']}, expected {dim}")
+        index._vectors = np.load(root / VECTORS_FILE, mmap_mode="r")
+        index._alive = np.load(root / ALIVE_FILE)
+        index._assign = np.load(root / ASSIGN_FILE)
+        if (root / CENTROIDS_FILE).exists():
+            index._centroids = np.load(root / CENTROIDS_FILE)
+        index._keys = [(entity_type, entity_id) for entity_type, entity_id in meta["keys"]]
+        index._rows = {key: row for row, key in enumerate(index._keys) if index._alive[row]}
+        index._trained_size = meta["trained_size"]
+        return index
+
+    def save(self, path: str | Path) -> None:
+        """Write the index to `path`, replacing any previous copy in one swap."""
+
+        root = Path(path)
+        root.parent.mkdir(parents=True, exist_ok=True)
+        tmp = root.with_name(root.name + ".tmp")
+        old = root.with_name(root.name + ".old")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        np.save(tmp / VECTORS_FILE, np.ascontiguousarray(self._vectors))
+        np.save(tmp / ALIVE_FILE, self._alive)
+        np.save(tmp / ASSIGN_FILE, self._assign)
+        if self._centroids is not None:
+            np.save(tmp / CENTROIDS_FILE, self._centroids)
+        meta = {
+            "version": FORMAT_VERSION,
+            "dim": self.dim,
+            "trained_size": self._trained_size,
+            "keys": self._keys,
+        }
+        (tmp / META_FILE).write_bytes(orjson.dumps(meta))
+        shutil.rmtree(old, ignore_errors=True)
+        if root.exists():
+            os.replace(root, old)
+        os.replace(tmp, root)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._rows
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def vector(self, key: Key) -> npt.NDArray[np.float32] | None:
+        """Stored (unit-length) vector for `key`, or None."""
+
+        row = self._rows.get(key)
+        return None if row is None else np.asarray(self._vectors[row])
+
+    def upsert(self, keys: Sequence[Key], vectors: npt.ArrayLike) -> None:
+        """Add or replace the vectors of `keys` (one row of `vectors` per key)."""
+
+        matrix = _normalise(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        if len(keys) != len(matrix):
+            raise ValueError(f"Got {len(keys)} keys for {len(matrix)} vectors")
+        # Last occurrence wins when a key repeats within the call
+        latest = {key: i for i, key in enumerate(keys)}
+        keys = list(latest)
+        matrix = matrix[list(latest.values())]
+        self.delete(keys)
+        start = len(self._keys)
+        self._vectors = np.concatenate([self._vectors, matrix])
+        self._alive = np.concatenate([self._alive, np.ones(len(keys), dtype=np.bool_)])
+        if self._centroids is not None:
+            assign = np.argmax(matrix @ self._centroids.T, axis=1).astype(np.int32)
+        else:
+            assign = np.zeros(len(keys), dtype=np.int32)
+        self._assign = np.concatenate([self._assign, assign])
+        for offset, key in enumerate(keys):
+            self._keys.append(key)
+            self._rows[key] = start + offset
+        self._lists = None
+        self._maintain()
+
+    def delete(self, keys: Iterable[Key]) -> int:
+        """Remove `keys`; returns how many were present."""
+
+        removed = 0
+        for key in keys:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._alive[row] = False
+                removed += 1
+        if removed:
+            self._lists = None
+        return removed
+
+    def _maintain(self) -> None:
+        dead = len(self._keys) - len(self._rows)
+        if dead > COMPACT_RATIO * len(self._keys):
+            self._compact()
+        alive = len(self._rows)
+        if alive >= MIN_TRAIN_ROWS and (not self.trained or alive >= 2 * self._trained_size):
+            self.train()
+
+    def _compact(self) -> None:
+        rows = np.flatnonzero(self._alive)
+        self._vectors = np.ascontiguousarray(self._vectors[rows])
+        self._assign = self._assign[rows]
+        self._alive = np.ones(len(rows), dtype=np.bool_)
+        self._keys = [self._keys[i] for i in rows]
+        self._rows = {key: i for i, key in enumerate(self._keys)}
+        self._lists = None
+
+    def train(self) -> None:
+        """(Re)cluster the live vectors into about sqrt(n) lists and reassign every row."""
+
+        self._compact()
+        n = len(self._keys)
+        if n == 0:
+            return
+        rng = np.random.default_rng(_SEED)
+        sample = self._vectors
+        if n > TRAIN_SAMPLE:
+            sample = self._vectors[np.sort(rng.choice(n, size=TRAIN_SAMPLE, replace=False))]
+        self._centroids = train_centroids(np.asarray(sample), int(np.sqrt(n)))
+        self._assign = np.argmax(self._vectors @ self._centroids.T, axis=1).astype(np.int32)
+        self._trained_size = n
+        self._lists = None
+        log.info("Vector index trained", extra={"rows": n, "lists": len(self._centroids)})
+
+    def _inverted_lists(self) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """Live rows grouped by list (`order`) with each list's start offset."""
+
+        if self._lists is None:
+            assert self._centroids is not None
+            live = np.flatnonzero(self._alive)
+            order = live[np.argsort(self._assign[live], kind="stable")]
+            counts = np.bincount(self._assign[live], minlength=len(self._centroids))
+            offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.intp)
+            self._lists = (order, offsets)
+        return self._lists
+
+    def search(
+        self, queries: npt.ArrayLike, k: int = 10, nprobe: int | None = None
+    ) -> list[list[tuple[Key, float]]]:
+        """Top-`k` `(key, cosine similarity)` matches for each query row, best first."""
+
+        q = _normalise(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        if not self._rows or k <= 0:
+            return [[] for _ in q]
+        if self._centroids is None:
+            live = np.flatnonzero(self._alive)
+            scores = q @ np.asarray(self._vectors[live]).T
+            return [
+                [(self._keys[live[j]], float(row[j])) for j in _top_k(row, k)] for row in scores
+            ]
+
+        order, offsets = self._inverted_lists()
+        probes = min(nprobe or self.nprobe, len(self._centroids))
+        nearest = np.argsort(-(q @ self._centroids.T), axis=1)[:, :probes]
+        results: list[list[tuple[Key, float]]] = []
+        for query, lists in zip(q, nearest):
+            # Sorted rows keep reads from the memory-mapped vectors sequential
+            rows = np.sort(np.concatenate([order[offsets[c] : offsets[c + 1]] for c in lists]))
+            scores = np.asarray(self._vectors[rows]) @ query
+            results.append([(self._keys[rows[j]], float(scores[j])) for j in _top_k(scores, k)])
+        return results
+
+    def related(self, key: Key, k: int = 10) -> list[tuple[Key, float]]:
+        """Nearest neighbours of an indexed key, excluding the key itself."""
+
+        vec = self.vector(key)
+        if vec is None:
+            return []
+        return [hit for hit in self.search(vec, k + 1)[0] if hit[0] != key][:k]
+
+
+def update_local_index(keys: Sequence[Key], vectors: npt.ArrayLike) -> None:
+    """Upsert `vectors` into the index at `VECTOR_INDEX_PATH` and save it.
+
+    An index built for a different `EMBEDDINGS_DIM` is discarded and rebuilt.
+    """
+
+    path = Path(settings.vector_index_path)
+    try:
+        index = VectorIndex.open(path, settings.embeddings_dim, settings.vector_index_nprobe)
+    except ValueError as exc:
+        log.warning("Rebuilding vector index", extra={"path": str(path), "error": str(exc)})
+        index = VectorIndex(settings.embeddings_dim, settings.vector_index_nprobe)
+    index.upsert(keys, vectors)
+    index.save(path)
+    log.info("Vector index updated", extra={"path": str(path), "rows": len(index)})
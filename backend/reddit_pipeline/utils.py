@@ -10,6 +10,8 @@ from collections.abc import Callable
 from functools import wraps
 from typing import Any, TypeVar
 
+from .ratelimit import retry_after_from_exception
+
 T = TypeVar("T")
 
 
@@ -51,6 +53,7 @@ def retry_with_backoff(
     - Retries on specified exceptions (default: all Exceptions)
     - Uses exponential backoff with full jitter
     - Caps attempts and max delay
+    - Waits at least as long as a server-sent `Retry-After` on HTTP errors
     """
 
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
@@ -60,12 +63,15 @@ def retry_with_backoff(
             while True:
                 try:
                     return func(*args, **kwargs)
-                except exceptions:  # pragma: no cover - behaviour tested separately
+                except exceptions as exc:  # pragma: no cover - behaviour tested separately
                     attempt += 1
                     if attempt >= max_attempts:
                         raise
                     delay = min(max_delay_seconds, base_delay_seconds * (2 ** (attempt - 1)))
                     delay = random.uniform(0, delay)
+                    retry_after = retry_after_from_exception(exc)
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
                     time.sleep(delay)
 
         return wrapper
@@ -0,0 +1,130 @@
+"""Unit tests for the record/replay cassette transport."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+
+from reddit_pipeline.cassette import (
+    AsyncCassetteTransport,
+    Cassette,
+    CassetteAdapter,
+    CassetteMiss,
+    CassetteTransport,
+    request_key,
+)
+
+
+def _upstream(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(200, json={"n": len(calls)}, headers={"x-ratelimit-remaining": "9"})
+
+    return httpx.MockTransport(handler)
+
+
+class TestRequestKey:
+    """Test request key normalisation."""
+
+    def test_query_order_is_ignored(self):
+        """Test that query parameter order does not change the key."""
+        assert request_key("get", "https://Example.com/a?b=2&a=1", None) == request_key(
+            "GET", "https://example.com/a?a=1&b=2", b""
+        )
+
+    def test_body_changes_key(self):
+        """Test that different bodies produce different keys."""
+        assert request_key("POST", "https://example.com", b"a") != request_key(
+            "POST", "https://example.com", b"b"
+        )
+
+
+class TestCassetteRoundTrip:
+    """Test recording and replaying exchanges."""
+
+    def test_record_then_replay_httpx(self, tmp_path):
+        """Test that replay serves recorded responses in order without the network."""
+        path = tmp_path / "c.jsonl.gz"
+        calls = []
+        recorder = Cassette(path, "record")
+        with httpx.Client(transport=CassetteTransport(recorder, _upstream(calls))) as client:
+            first = client.get("https://api.example.com/x?q=1").json()
+            second = client.get("https://api.example.com/x?q=1").json()
+        recorder.save()
+
+        player = Cassette(path, "replay")
+        offline = httpx.MockTransport(lambda r: pytest.fail("network used in replay"))
+        with httpx.Client(transport=CassetteTransport(player, offline)) as client:
+            replayed = [client.get("https://api.example.com/x?q=1").json() for _ in range(3)]
+            headers = client.get("https://api.example.com/x?q=1").headers
+
+        assert (first, second) == ({"n": 1}, {"n": 2})
+        assert replayed == [{"n": 1}, {"n": 2}, {"n": 2}]
+        assert headers["x-ratelimit-remaining"] == "9"
+        assert len(calls) == 2
+
+    def test_replay_miss_raises(self, tmp_path):
+        """Test that an unrecorded request fails loudly in replay mode."""
+        path = tmp_path / "c.jsonl.gz"
+        Cassette(path, "record").save()
+
+        with httpx.Client(transport=CassetteTransport(Cassette(path, "replay"))) as client:
+            with pytest.raises(CassetteMiss):
+                client.get("https://api.example.com/unknown")
+
+    def test_replay_injects_latency(self, tmp_path):
+        """Test that replay waits the configured latency per request."""
+        path = tmp_path / "c.jsonl.gz"
+        recorder = Cassette(path, "record")
+        with httpx.Client(transport=CassetteTransport(recorder, _upstream([]))) as client:
+            client.get("https://api.example.com/x")
+        recorder.save()
+
+        player = Cassette(path, "replay", latency_ms=50)
+        with httpx.Client(transport=CassetteTransport(player)) as client:
+            started = time.perf_counter()
+            client.get("https://api.example.com/x")
+            assert time.perf_counter() - started >= 0.05
+
+    def test_async_transport_round_trip(self, tmp_path):
+        """Test the async transport records and replays like the sync one."""
+        path = tmp_path / "c.jsonl.gz"
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(1)
+            return httpx.Response(200, json={"ok": True})
+
+        async def fetch(cassette, inner=None):
+            transport = AsyncCassetteTransport(cassette, inner)
+            async with httpx.AsyncClient(transport=transport) as client:
+                return (await client.get("https://hn.example.com/a")).json()
+
+        recorder = Cassette(path, "record")
+        assert asyncio.run(fetch(recorder, httpx.MockTransport(handler))) == {"ok": True}
+        recorder.save()
+
+        assert asyncio.run(fetch(Cassette(path, "replay"))) == {"ok": True}
+        assert len(calls) == 1
+
+    def test_requests_adapter_replays(self, tmp_path):
+        """Test that PRAW's requests session can be served from an httpx recording."""
+        path = tmp_path / "c.jsonl.gz"
+        recorder = Cassette(path, "record")
+        with httpx.Client(transport=CassetteTransport(recorder, _upstream([]))) as client:
+            client.post("https://oauth.example.com/api", content=b"grant_type=x")
+        recorder.save()
+
+        session = requests.Session()
+        session.mount("https://", CassetteAdapter(Cassette(path, "replay")))
+        response = session.post("https://oauth.example.com/api", data=b"grant_type=x")
+
+        assert response.status_code == 200
+        assert response.json() == {"n": 1}
+
+    def test_invalid_mode(self, tmp_path):
+        """Test that unknown modes are rejected."""
+        with pytest.raises(ValueError):
+            Cassette(tmp_path / "c.jsonl.gz", "off")
@@ -1,8 +1,20 @@
 """Unit tests for deduplication utilities."""
 
+import random
 from datetime import UTC, datetime
 
-from reddit_pipeline.dedupe import dedupe_posts
+import numpy as np
+
+from reddit_pipeline.dedupe import (
+    canonicalize_url,
+    dedupe_posts,
+    find_near_duplicate_clusters,
+    find_semantic_duplicate_clusters,
+    flag_near_duplicates,
+    flag_semantic_duplicates,
+    merge_by_canonical_url,
+    minhash_signatures,
+)
 from reddit_pipeline.models import Post
 
 
@@ -228,3 +240,219 @@ class TestDedupePosts:
         assert deduped[0].id == "3"
         assert deduped[1].id == "1"
         assert deduped[2].id == "2"
+
+
+def _story(pid: str, title: str, score: int = 10, subreddit: str = "test", text: str = "") -> Post:
+    return Post(
+        id=pid,
+        title=title,
+        score=score,
+        num_comments=0,
+        created_utc=datetime.now(UTC),
+        subreddit=subreddit,
+        author="user",
+        url=f"https://example.com/{pid}",
+        text=text,
+    )
+
+
+class TestNearDuplicates:
+    """Test MinHash/LSH near-duplicate detection."""
+
+    def test_signatures_are_deterministic(self):
+        """Test that identical text yields identical signatures across calls."""
+        a = minhash_signatures(["OpenAI releases new model"])
+        b = minhash_signatures(["OpenAI releases new model"])
+        assert (a == b).all()
+        assert a.shape == (1, 128)
+
+    def test_crosspost_is_flagged(self):
+        """Test that a cross-post with minor edits is flagged, keeping the most engaged."""
+        body = "The company announced a new open source database engine written in Rust."
+        posts = [
+            _story("1", "New open-source database engine written in Rust", 5, text=body),
+            _story("2", "Unrelated: my thoughts on remote work", 50),
+            _story(
+                "3",
+                "New open source database engine written in Rust!",
+                500,
+                subreddit="programming",
+                text=body,
+            ),
+        ]
+
+        flagged = flag_near_duplicates(posts)
+
+        assert [p.id for p in flagged] == ["1", "2", "3"]
+        assert [p.is_duplicate for p in flagged] == [True, False, False]
+        assert posts[0].is_duplicate is False  # input is not mutated
+
+    def test_distinct_posts_are_not_flagged(self):
+        """Test that different stories are left alone."""
+        posts = [
+            _story("1", "Python 3.13 released with free-threaded build"),
+            _story("2", "Rust 2024 edition is now stable"),
+            _story("3", "Why we moved our monolith to Kubernetes"),
+        ]
+
+        assert find_near_duplicate_clusters(posts) == []
+        assert not any(p.is_duplicate for p in flag_near_duplicates(posts))
+
+    def test_empty_text_never_matches(self):
+        """Test that posts without text content never cluster together."""
+        posts = [_story("1", "!!!"), _story("2", "???")]
+        assert find_near_duplicate_clusters(posts) == []
+
+    def test_clusters_scale_to_many_posts(self):
+        """Test that exact reposts are clustered among many distinct posts."""
+        rng = random.Random(3)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        posts = [
+            _story(str(i), " ".join("".join(rng.choices(letters, k=6)) for _ in range(8)))
+            for i in range(500)
+        ]
+        posts.append(_story("repost", posts[42].title))
+
+        clusters = find_near_duplicate_clusters(posts)
+
+        assert [42, 500] in clusters
+
+
+def _link(pid: str, source: str, url: str, score: int, comments: int) -> Post:
+    return _story(pid, f"Story {pid}", score).model_copy(
+        update={"source": source, "url": url, "num_comments": comments}
+    )
+
+
+class TestCanonicalUrl:
+    """Test URL canonicalisation for cross-source matching."""
+
+    def test_tracking_params_and_host_are_normalised(self):
+        """Test that tracking parameters, www/m. prefixes and trailing slashes are dropped."""
+        expected = "https://blog.example.org/post?id=7"
+        assert canonicalize_url("http://WWW.blog.example.org/post/?utm_source=hn&id=7") == expected
+        assert canonicalize_url("https://m.blog.example.org/post?id=7&fbclid=x#top") == expected
+
+    def test_prefixes_kept_when_no_domain_would_remain(self):
+        """Test that `amp.dev`-style hosts are not reduced to a bare suffix."""
+        assert canonicalize_url("https://amp.dev/docs") == "https://amp.dev/docs"
+        assert canonicalize_url("https://m.example/x") == "https://m.example/x"
+        assert canonicalize_url("https://m.co.uk/x") == "https://m.co.uk/x"
+        assert canonicalize_url("https://amp.bbc.co.uk/news") == "https://bbc.co.uk/news"
+        assert canonicalize_url("https://amp.dev/p") != canonicalize_url("https://dev/p")
+
+    def test_only_default_ports_are_dropped(self):
+        """Test that :80/:443 are dropped but other ports keep URLs distinct."""
+        assert canonicalize_url("http://foo.com:80/x") == "https://foo.com/x"
+        assert canonicalize_url("https://foo.com:443/x") == "https://foo.com/x"
+        assert canonicalize_url("http://foo.com:8080/x") == "https://foo.com:8080/x"
+        assert canonicalize_url("https://foo.com:80/x") == "https://foo.com:80/x"
+        assert canonicalize_url("http://foo.com:99999/x") is None
+
+    def test_query_order_is_ignored(self):
+        """Test that remaining query parameters are sorted."""
+        assert canonicalize_url("https://a.io/p?b=2&a=1") == canonicalize_url(
+            "https://a.io/p?a=1&b=2"
+        )
+
+    def test_redirectors_are_unwrapped(self):
+        """Test that known redirectors resolve to their destination."""
+        target = "https://a.io/p"
+        assert canonicalize_url("https://www.google.com/url?q=https%3A%2F%2Fa.io%2Fp") == target
+        assert canonicalize_url("https://l.facebook.com/l.php?u=https://a.io/p/") == target
+        assert canonicalize_url("https://youtu.be/abc123?si=x") == canonicalize_url(
+            "https://www.youtube.com/watch?v=abc123"
+        )
+
+    def test_unusable_urls(self):
+        """Test that missing, placeholder and non-HTTP URLs are not matched."""
+        assert canonicalize_url(None) is None
+        assert canonicalize_url("https://example.com") is None
+        assert canonicalize_url("mailto:a@b.c") is None
+
+
+class TestMergeByCanonicalUrl:
+    """Test cross-source merging of posts linking to the same URL."""
+
+    def test_same_link_across_sources_is_merged(self):
+        """Test that the most engaged post keeps combined engagement."""
+        posts = [
+            _link("r1", "reddit", "https://www.a.io/launch?utm_source=reddit", 40, 10),
+            _link("hn1", "hackernews", "https://a.io/launch", 300, 120),
+            _link("other", "reddit", "https://b.io/", 5, 1),
+        ]
+
+        merged = merge_by_canonical_url(posts)
+
+        assert [p.id for p in merged] == ["r1", "hn1", "other"]
+        assert [p.is_duplicate for p in merged] == [True, False, False]
+        assert (merged[1].score, merged[1].num_comments) == (340, 130)
+        assert merged[2] is posts[2]
+        assert posts[1].score == 300  # input is not mutated
+
+    def test_placeholder_urls_are_not_merged(self):
+        """Test that posts without a real URL are never merged."""
+        posts = [
+            _link("1", "hackernews", "https://example.com", 1, 0),
+            _link("2", "hackernews", "https://example.com", 2, 0),
+        ]
+
+        assert not any(p.is_duplicate for p in merge_by_canonical_url(posts))
+
+    def test_near_duplicate_pass_skips_merged_posts(self):
+        """Test that posts already flagged are left out of near-duplicate clustering."""
+        posts = merge_by_canonical_url(
+            [
+                _link("1", "reddit", "https://a.io/x", 100, 0),
+                _link("2", "hackernews", "https://a.io/x", 1, 0),
+            ]
+        )
+        posts.append(_story("3", posts[1].title, 50))
+
+        flagged = flag_near_duplicates(posts)
+
+        assert [p.is_duplicate for p in flagged] == [False, True, False]
+
+
+def _unit_rows(n: int, dim: int = 64, seed: int = 0) -> np.ndarray:
+    rows = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+class TestSemanticDuplicates:
+    """Test embedding-space duplicate detection."""
+
+    def test_paraphrases_cluster(self):
+        """Test that vectors above the cosine threshold are clustered."""
+        vectors = _unit_rows(3)
+        paraphrase = vectors[0] + 0.05 * _unit_rows(1, seed=1)[0]
+
+        clusters = find_semantic_duplicate_clusters(np.vstack([vectors, paraphrase]), 0.9)
+
+        assert clusters == [[0, 3]]
+
+    def test_zero_vectors_never_match(self):
+        """Test that rows without an embedding are ignored."""
+        assert find_semantic_duplicate_clusters(np.zeros((3, 8), dtype=np.float32)) == []
+
+    def test_lower_ranked_member_is_flagged(self):
+        """Test that the higher-ranked post is kept and already-flagged posts are skipped."""
+        vectors = _unit_rows(3)
+        vectors[2] = vectors[0]
+        posts = [
+            _story("1", "OpenAI ships a new model", 10),
+            _story("2", "Unrelated", 10).model_copy(update={"is_duplicate": True}),
+            _story("3", "New model released by OpenAI", 500),
+        ]
+
+        flagged = flag_semantic_duplicates(posts, vectors)
+
+        assert [p.is_duplicate for p in flagged] == [True, True, False]
+        assert flagged[1] is posts[1]
+
+    def test_clusters_scale_to_many_vectors(self):
+        """Test that a duplicate is found among many unrelated vectors."""
+        vectors = _unit_rows(2000, dim=256)
+        vectors = np.vstack([vectors, vectors[1234]])
+
+        assert find_semantic_duplicate_clusters(vectors) == [[1234, 2000]]
@@ -1,11 +1,14 @@
 """Integration tests with mocked clients and VCR-style cassettes."""
 
-from datetime import UTC, datetime
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
-from reddit_pipeline.clients.hackernews import HackerNewsClient
+from reddit_pipeline.clients.hackernews import AsyncHackerNewsClient, HackerNewsClient
 from reddit_pipeline.clients.producthunt import ProductHuntClient
 from reddit_pipeline.clients.reddit import RedditClient
 from reddit_pipeline.llm.summariser import summarise_posts_with_comments
@@ -138,6 +141,120 @@ class TestRedditClientIntegration:
         assert comments[1]["body"] == "Interesting perspective"
         assert comments[1]["score"] == 5
 
+    @patch("praw.Reddit")
+    def test_reddit_client_fetch_comments_bulk(self, mock_reddit_class):
+        """Test bulk comment hydration reuses one session and skips MoreComments."""
+        from praw.models import MoreComments
+
+        mock_reddit = MagicMock()
+        mock_reddit_class.return_value = mock_reddit
+
+        def make_submission(id):
+            low = MagicMock(id=f"{id}-low", body="Meh", score=1)
+            low.author.name = "a1"
+            high = MagicMock(id=f"{id}-high", body="Top answer", score=50)
+            high.author.name = "a2"
+            more = MagicMock(spec=MoreComments)
+            submission = MagicMock()
+            submission.comments = [low, high, more]
+            return submission
+
+        mock_reddit.submission.side_effect = make_submission
+
+        client = RedditClient(
+            client_id="test_id", client_secret="test_secret", user_agent="test_agent"
+        )
+        results = client.fetch_comments_bulk(["p1", "p2", "p3"], limit=1, max_workers=2)
+
+        assert list(results) == ["p1", "p2", "p3"]
+        assert results["p2"] == [
+            {"id": "p2-high", "body": "Top answer", "score": 50, "author": "a2"}
+        ]
+        mock_reddit_class.assert_called_once()
+        more_comments_used = [c for c in mock_reddit.mock_calls if "replace_more" in str(c)]
+        assert more_comments_used == []
+
+    @patch("praw.Reddit")
+    def test_reddit_client_fetch_comments_bulk_isolates_failures(self, mock_reddit_class):
+        """Test a failing post yields an empty list without dropping the others."""
+        mock_reddit = MagicMock()
+        mock_reddit_class.return_value = mock_reddit
+
+        def make_submission(id):
+            if id == "bad":
+                raise Exception("API Error")
+            comment = MagicMock(id="c1", body="Fine", score=3)
+            comment.author.name = "a"
+            submission = MagicMock()
+            submission.comments = [comment]
+            return submission
+
+        mock_reddit.submission.side_effect = make_submission
+
+        client = RedditClient(
+            client_id="test_id", client_secret="test_secret", user_agent="test_agent"
+        )
+        with patch("reddit_pipeline.utils.time.sleep"):
+            results = client.fetch_comments_bulk(["good", "bad"], limit=5)
+
+        assert len(results["good"]) == 1
+        assert results["bad"] == []
+
+    @patch("praw.Reddit")
+    def test_reddit_client_low_budget_pauses_workers_once(self, mock_reddit_class):
+        """Test that workers hitting a low rate-limit budget share one pause."""
+        from reddit_pipeline.ratelimit import RateLimiter
+
+        mock_reddit = MagicMock()
+        mock_reddit_class.return_value = mock_reddit
+        mock_reddit.auth.limits = {"remaining": 1, "reset_timestamp": time.time() + 0.3}
+        mock_reddit.submission.side_effect = lambda id: MagicMock(comments=[])
+
+        client = RedditClient(
+            client_id="test_id", client_secret="test_secret", user_agent="test_agent"
+        )
+        with patch("reddit_pipeline.clients.reddit.limiter", RateLimiter()):
+            started = time.perf_counter()
+            client.fetch_comments_bulk(["p1", "p2", "p3", "p4"], limit=1, max_workers=4)
+            elapsed = time.perf_counter() - started
+
+        assert 0.2 <= elapsed < 0.6
+
+    @patch("praw.Reddit")
+    def test_reddit_client_iter_filters_while_streaming(self, mock_reddit_class):
+        """Test that the streaming variant applies window and comment filters."""
+        mock_reddit = MagicMock()
+        mock_reddit_class.return_value = mock_reddit
+        now = datetime.now(UTC)
+
+        def make(id, age_days, comments):
+            sub = MagicMock(
+                id=id,
+                title=id,
+                score=1,
+                num_comments=comments,
+                created_utc=(now - timedelta(days=age_days)).timestamp(),
+                url="https://example.com",
+                selftext="",
+            )
+            sub.subreddit.display_name = "test"
+            sub.author.name = "u"
+            return sub
+
+        mock_reddit.subreddit.return_value.hot.return_value = iter(
+            [make("fresh", 1, 20), make("old", 40, 20), make("quiet", 1, 2)]
+        )
+
+        client = RedditClient(
+            client_id="test_id", client_secret="test_secret", user_agent="test_agent"
+        )
+        stream = client.iter_top_submissions(
+            ["test"], 10, since=now - timedelta(days=30), min_comments=5
+        )
+
+        assert next(stream).id == "fresh"
+        assert list(stream) == []
+
     @patch("praw.Reddit")
     def test_reddit_client_error_handling(self, mock_reddit_class):
         """Test Reddit client error handling."""
@@ -203,6 +320,33 @@ class TestHackerNewsClientIntegration:
         assert posts[1].title == "HN Post 2"
         assert posts[1].score == 200
 
+    @patch("httpx.Client.get")
+    def test_hackernews_client_iter_top_pages(self, mock_get):
+        """Test that iter_top pages through results until the limit is reached."""
+        pages = [
+            {
+                "nbPages": 3,
+                "hits": [
+                    {"objectID": f"p{page}-{i}", "title": "t", "num_comments": 10 * i}
+                    for i in range(2)
+                ],
+            }
+            for page in range(3)
+        ]
+        responses = []
+        for page in pages:
+            response = MagicMock()
+            response.json.return_value = page
+            responses.append(response)
+        mock_get.side_effect = responses
+
+        client = HackerNewsClient()
+        posts = list(client.iter_top(limit=3, page_size=2, min_comments=5))
+
+        assert [p.id for p in posts] == ["p0-1"]
+        assert mock_get.call_count == 2
+        assert mock_get.call_args.kwargs["params"] == {"hitsPerPage": 2, "page": 1}
+
     @patch("httpx.Client.get")
     def test_hackernews_client_error_handling(self, mock_get):
         """Test HackerNews client error handling."""
@@ -216,6 +360,89 @@ class TestHackerNewsClientIntegration:
         assert posts == []
 
 
+class TestAsyncHackerNewsClientIntegration:
+    """Integration tests for the async HackerNews window client."""
+
+    @staticmethod
+    def _hit(ts: int) -> dict:
+        return {
+            "objectID": str(ts),
+            "title": f"Story {ts}",
+            "points": 10,
+            "num_comments": 2,
+            "created_at_i": ts,
+            "author": "hnuser",
+            "url": f"https://example.com/{ts}",
+        }
+
+    def test_iter_window_fetches_slices_and_pages(self):
+        """Test that every slice and page in the window is fetched once."""
+        seen_params = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen_params.append(dict(request.url.params))
+            lo = int(request.url.params["numericFilters"].split(",")[0].split(">=")[1])
+            page = int(request.url.params["page"])
+            return httpx.Response(
+                200, json={"nbHits": 4, "nbPages": 2, "hits": [self._hit(lo + page)]}
+            )
+
+        async def run():
+            async with AsyncHackerNewsClient(transport=httpx.MockTransport(handler)) as client:
+                since = datetime(2024, 1, 1, tzinfo=UTC)
+                return await client.fetch_window(since, since + timedelta(days=3))
+
+        posts = asyncio.run(run())
+
+        # 3 daily slices x 2 pages
+        assert len(seen_params) == 6
+        assert len({p.id for p in posts}) == 6
+        assert all(p.source == "hackernews" for p in posts)
+        assert all(q["tags"] == "story" for q in seen_params)
+
+    def test_iter_window_splits_oversized_slices(self):
+        """Test that slices over Algolia's hit cap are split and re-queried."""
+        ranges = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            filters = request.url.params["numericFilters"].split(",")
+            lo = int(filters[0].split(">=")[1])
+            hi = int(filters[1].split("<")[1])
+            ranges.append((lo, hi))
+            nb_hits = 2000 if hi - lo > 3600 else 1
+            return httpx.Response(200, json={"nbHits": nb_hits, "nbPages": 1, "hits": []})
+
+        async def run():
+            async with AsyncHackerNewsClient(transport=httpx.MockTransport(handler)) as client:
+                since = datetime(2024, 1, 1, tzinfo=UTC)
+                return await client.fetch_window(since, since + timedelta(hours=2))
+
+        asyncio.run(run())
+
+        start = int(datetime(2024, 1, 1, tzinfo=UTC).timestamp())
+        assert (start, start + 7200) in ranges
+        assert (start, start + 3600) in ranges
+        assert (start + 3600, start + 7200) in ranges
+
+    def test_iter_window_skips_failed_pages(self):
+        """Test that a failing page is skipped and the rest are yielded."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.params["page"] == "1":
+                return httpx.Response(500)
+            return httpx.Response(200, json={"nbHits": 2, "nbPages": 2, "hits": [self._hit(1)]})
+
+        async def run():
+            async with AsyncHackerNewsClient(
+                transport=httpx.MockTransport(handler), max_attempts=1
+            ) as client:
+                since = datetime(2024, 1, 1, tzinfo=UTC)
+                return await client.fetch_window(since, since + timedelta(hours=1))
+
+        posts = asyncio.run(run())
+        assert [p.id for p in posts] == ["1"]
+
+
 class TestProductHuntClientIntegration:
     """Integration tests for ProductHunt client."""
 
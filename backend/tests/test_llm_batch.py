@@ -0,0 +1,157 @@
+"""Unit tests for batch-job execution of the LLM stages."""
+
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import orjson
+import pytest
+
+from reddit_pipeline.llm import batch, embeddings, summariser
+from reddit_pipeline.llm.batch import (
+    BatchError,
+    BatchRequest,
+    LocalBatchBackend,
+    embed_texts_batch,
+    generate_insights_batch,
+    run_batch,
+    summarise_posts_batch,
+)
+from reddit_pipeline.llm.cache import EmbeddingCache, ResponseCache
+from reddit_pipeline.models import Post
+
+
+def _post(pid: str) -> Post:
+    return Post(
+        id=pid,
+        title=f"Post {pid}",
+        url=f"https://example.com/{pid}",
+        author="user",
+        score=10,
+        num_comments=1,
+        created_utc=datetime.now(UTC),
+        subreddit="test",
+    )
+
+
+def _chat_handler(seen: list[dict]):
+    def handler(endpoint: str, body: dict) -> dict:
+        seen.append(body)
+        if "Post bad" in body["messages"][1]["content"]:
+            raise RuntimeError("rejected")
+        content = orjson.dumps({"summary": body["messages"][1]["content"][-6:]}).decode()
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    return handler
+
+
+@pytest.fixture(autouse=True)
+def _batch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch.settings, "llm_batch_dir", str(tmp_path / "batches"))
+    monkeypatch.setattr(batch.settings, "llm_batch_poll_seconds", 0.0)
+
+
+class TestRunBatch:
+    """Test batch submission, polling and result mapping."""
+
+    def test_results_are_mapped_by_custom_id(self, tmp_path):
+        """Test that bodies come back by ID and failed lines are dropped."""
+
+        def handler(endpoint, body):
+            if body["n"] == 2:
+                raise RuntimeError("bad")
+            return {"echo": body["n"], "endpoint": endpoint}
+
+        backend = LocalBatchBackend(handler, tmp_path / "jobs")
+        requests = [BatchRequest(f"id-{n}", {"n": n}) for n in (1, 2, 3)]
+
+        bodies = run_batch(requests, "/v1/test", backend, "test")
+
+        assert bodies == {
+            "id-1": {"echo": 1, "endpoint": "/v1/test"},
+            "id-3": {"echo": 3, "endpoint": "/v1/test"},
+        }
+        lines = (tmp_path / "jobs" / "local-1.input.jsonl").read_bytes().splitlines()
+        assert orjson.loads(lines[0]) == {
+            "custom_id": "id-1",
+            "method": "POST",
+            "url": "/v1/test",
+            "body": {"n": 1},
+        }
+
+    def test_failed_batch_raises(self):
+        """Test that a batch ending in a non-completed state fails the stage."""
+
+        class Failing:
+            def submit(self, input_path, endpoint):
+                return "b1"
+
+            def status(self, batch_id):
+                return "expired"
+
+            def results(self, batch_id):
+                return []
+
+        with pytest.raises(BatchError, match="expired"):
+            run_batch([BatchRequest("a", {})], "/v1/test", Failing(), "test")
+
+
+class TestBatchStages:
+    """Test the batch counterparts of the synchronous stages."""
+
+    @patch("reddit_pipeline.llm.batch.response_cache", return_value=None)
+    def test_summaries_use_sync_request_bodies(self, _cache, tmp_path):
+        """Test that batch requests match the synchronous path and map back in order."""
+        seen: list[dict] = []
+        backend = LocalBatchBackend(_chat_handler(seen), tmp_path / "jobs")
+        posts = [_post("a"), _post("bad"), _post("b")]
+
+        results = summarise_posts_batch(posts, {"a": [{"score": 3, "body": "hi"}]}, backend)
+
+        assert list(results) == ["a", "b"]
+        expected = summariser.request_body(
+            summariser.build_messages(posts[0], [{"score": 3, "body": "hi"}])
+        )
+        assert seen[0] == expected
+
+    def test_cached_items_skip_the_batch(self, tmp_path):
+        """Test that cached responses are reused and new ones are cached."""
+        seen: list[dict] = []
+        backend = LocalBatchBackend(_chat_handler(seen), tmp_path / "jobs")
+        cache = ResponseCache(tmp_path / "c.sqlite3", ttl_seconds=60, max_entries=10)
+
+        with patch.object(batch, "response_cache", return_value=cache):
+            first = generate_insights_batch({"a": {"summary": "x"}}, backend)
+            second = generate_insights_batch({"a": {"summary": "x"}, "b": {}}, backend)
+
+        assert second["a"] == first["a"]
+        assert len(seen) == 2
+        assert cache.stats()["hits"] == 1
+
+    @patch("reddit_pipeline.llm.batch.response_cache", return_value=None)
+    def test_all_failures_raise(self, _cache, tmp_path):
+        """Test that a stage where nothing succeeded fails loudly."""
+        backend = LocalBatchBackend(_chat_handler([]), tmp_path / "jobs")
+
+        with pytest.raises(BatchError):
+            summarise_posts_batch([_post("bad")], {}, backend)
+
+    def test_embeddings_dedupe_and_keep_order(self, tmp_path, monkeypatch):
+        """Test that each distinct uncached text is embedded once and results keep order."""
+        monkeypatch.setattr(batch.settings, "embeddings_dim", 2)
+        inputs: list[list[str]] = []
+
+        def handler(endpoint, body):
+            inputs.append(body["input"])
+            return {"data": [{"embedding": [float(len(body["input"][0])), 1.0, 9.0]}]}
+
+        backend = LocalBatchBackend(handler, tmp_path / "jobs")
+        cache = EmbeddingCache(tmp_path / "c.sqlite3", max_entries=10)
+        cache.put_many(batch.settings.embeddings_model, 2, ["cached"], [[5.0, 5.0]])
+
+        with patch.object(batch, "embedding_cache", return_value=cache):
+            vectors = embed_texts_batch(["ab", "", "cached", "ab", "abc"], backend)
+
+        two, three = embeddings.reduce_dims([[2.0, 1.0], [3.0, 1.0]], 2).tolist()
+        assert vectors.mask.tolist() == [True, False, True, True, True]
+        assert vectors.vectors.tolist() == [two, [0.0, 0.0], [5.0, 5.0], two, three]
+        assert sorted(inputs) == [["ab"], ["abc"]]
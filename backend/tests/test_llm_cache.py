@@ -0,0 +1,170 @@
+"""Unit tests for the on-disk LLM response and embedding caches."""
+
+from unittest.mock import MagicMock, patch
+
+from reddit_pipeline.llm import cache as cache_mod
+from reddit_pipeline.llm.cache import EmbeddingCache, ResponseCache, cache_key
+
+MESSAGES = [{"role": "user", "content": "Summarise this"}]
+FORMAT = {"type": "json_schema", "json_schema": {"name": "s"}}
+
+
+class TestCacheKey:
+    """Test request hashing."""
+
+    def test_key_is_stable(self):
+        """Test that identical requests hash the same regardless of dict order."""
+        reordered = {"json_schema": {"name": "s"}, "type": "json_schema"}
+        assert cache_key("m", FORMAT, MESSAGES, 0.2) == cache_key("m", reordered, MESSAGES, 0.2)
+
+    def test_every_input_changes_key(self):
+        """Test that model, format, messages and temperature are all part of the key."""
+        base = cache_key("m", FORMAT, MESSAGES, 0.2)
+        assert cache_key("other", FORMAT, MESSAGES, 0.2) != base
+        assert cache_key("m", {"type": "json_object"}, MESSAGES, 0.2) != base
+        assert cache_key("m", FORMAT, [{"role": "user", "content": "x"}], 0.2) != base
+        assert cache_key("m", FORMAT, MESSAGES, 0.0) != base
+
+
+class TestResponseCache:
+    """Test storage, expiry, eviction and counters."""
+
+    def test_round_trip_and_counters(self, tmp_path):
+        """Test that stored responses are returned and hits/misses are counted."""
+        cache = ResponseCache(tmp_path / "c.sqlite3", ttl_seconds=60, max_entries=10)
+
+        assert cache.get("k") is None
+        cache.put("k", {"summary": "ok", "pain_points": ["a"]})
+
+        assert cache.get("k") == {"summary": "ok", "pain_points": ["a"]}
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    def test_entries_persist_across_instances(self, tmp_path):
+        """Test that a rerun reads what the previous run wrote."""
+        path = tmp_path / "c.sqlite3"
+        first = ResponseCache(path, ttl_seconds=60, max_entries=10)
+        first.put("k", {"v": 1})
+        first.close()
+
+        assert ResponseCache(path, ttl_seconds=60, max_entries=10).get("k") == {"v": 1}
+
+    def test_expired_entries_miss(self, tmp_path, monkeypatch):
+        """Test that entries older than the TTL are dropped."""
+        clock = [1000.0]
+        monkeypatch.setattr(cache_mod.time, "time", lambda: clock[0])
+        cache = ResponseCache(tmp_path / "c.sqlite3", ttl_seconds=60, max_entries=10)
+        cache.put("k", {"v": 1})
+
+        clock[0] += 61
+
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self, tmp_path, monkeypatch):
+        """Test that the entry accessed longest ago is evicted first."""
+        clock = [1000.0]
+        monkeypatch.setattr(cache_mod.time, "time", lambda: clock[0])
+        cache = ResponseCache(tmp_path / "c.sqlite3", ttl_seconds=3600, max_entries=2)
+        for key in ("a", "b"):
+            cache.put(key, {"k": key})
+            clock[0] += 1
+        cache.get("a")
+        clock[0] += 1
+
+        cache.put("c", {"k": "c"})
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"k": "a"}
+        assert cache.get("c") == {"k": "c"}
+
+
+class TestCachedCalls:
+    """Test that the LLM call sites consult the cache."""
+
+    @patch("reddit_pipeline.llm.transport.sync_client")
+    def test_summariser_call_is_served_from_cache(self, mock_openai, tmp_path):
+        """Test that a repeated request does not reach the API."""
+        from reddit_pipeline.llm import summariser
+
+        raw = MagicMock(headers={})
+        raw.parse.return_value.choices = [MagicMock(message=MagicMock(content='{"summary": "s"}'))]
+        create = mock_openai.return_value.chat.completions.with_raw_response.create
+        create.return_value = raw
+        cache = ResponseCache(tmp_path / "c.sqlite3", ttl_seconds=60, max_entries=10)
+
+        with patch.object(summariser, "response_cache", return_value=cache):
+            first = summariser._call_openai(MESSAGES)
+            second = summariser._call_openai(MESSAGES)
+
+        assert first == second == {"summary": "s"}
+        assert create.call_count == 1
+        assert cache.stats()["hits"] == 1
+
+    @patch("reddit_pipeline.llm.transport.sync_client")
+    def test_unparseable_response_is_not_cached(self, mock_openai, tmp_path):
+        """Test that fallback payloads for invalid JSON are not stored."""
+        from reddit_pipeline.llm import insights
+
+        raw = MagicMock(headers={})
+        raw.parse.return_value.choices = [MagicMock(message=MagicMock(content="not json"))]
+        mock_openai.return_value.chat.completions.with_raw_response.create.return_value = raw
+        cache = ResponseCache(tmp_path / "c.sqlite3", ttl_seconds=60, max_entries=10)
+
+        with patch.object(insights, "response_cache", return_value=cache):
+            result = insights._call_openai(MESSAGES)
+
+        assert result["short_rationale"] == "not json"
+        assert len(cache) == 0
+
+
+class TestEmbeddingCache:
+    """Test the float32 embedding store."""
+
+    def test_round_trip_in_order(self, tmp_path):
+        """Test that vectors come back in input order with None for misses."""
+        cache = EmbeddingCache(tmp_path / "c.sqlite3", max_entries=10)
+        cache.put_many("m", 2, ["a", "b"], [[0.5, 1.0], [0.25, -2.0]])
+
+        found = cache.get_many("m", 2, ["b", "x", "a", "b"])
+
+        assert found.mask.tolist() == [True, False, True, True]
+        assert found.vectors.tolist() == [[0.25, -2.0], [0.0, 0.0], [0.5, 1.0], [0.25, -2.0]]
+        assert cache.stats() == {"hits": 3, "misses": 1, "entries": 2}
+
+    def test_model_and_dim_are_part_of_the_key(self, tmp_path):
+        """Test that a different model or dimension never returns a stale vector."""
+        cache = EmbeddingCache(tmp_path / "c.sqlite3", max_entries=10)
+        cache.put_many("m", 2, ["a"], [[1.0, 0.0]])
+
+        assert not cache.get_many("other", 2, ["a"]).mask.any()
+        assert not cache.get_many("m", 3, ["a"]).mask.any()
+
+    def test_size_is_capped(self, tmp_path):
+        """Test that the least recently used vectors are evicted."""
+        cache = EmbeddingCache(tmp_path / "c.sqlite3", max_entries=2)
+        cache.put_many("m", 1, ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+
+        assert len(cache) == 2
+
+    @patch("reddit_pipeline.llm.transport.sync_client")
+    def test_embed_texts_only_sends_misses(self, mock_openai, tmp_path, monkeypatch):
+        """Test that cached texts skip the API and results merge back in order."""
+        from reddit_pipeline.llm import embeddings
+
+        monkeypatch.setattr(embeddings.settings, "embeddings_dim", 2)
+        cache = EmbeddingCache(tmp_path / "c.sqlite3", max_entries=10)
+        cache.put_many(embeddings.settings.embeddings_model, 2, ["cached"], [[1.0, 0.0]])
+        raw = MagicMock(headers={})
+        raw.parse.return_value.data = [MagicMock(embedding=[0.0, 1.0])]
+        create = mock_openai.return_value.embeddings.with_raw_response.create
+        create.return_value = raw
+
+        with patch.object(embeddings, "embedding_cache", return_value=cache):
+            first = embeddings.embed_texts(["new", "", "cached"])
+            second = embeddings.embed_texts(["cached", "new"])
+
+        assert first.mask.tolist() == [True, False, True]
+        assert first.vectors.tolist() == [[0.0, 1.0], [0.0, 0.0], [1.0, 0.0]]
+        assert second.vectors.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+        create.assert_called_once()
+        assert create.call_args.kwargs["input"] == ["new"]
@@ -0,0 +1,102 @@
+"""Unit tests for batched embedding requests."""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from reddit_pipeline.llm import embeddings, tokens
+from reddit_pipeline.llm.tokens import ApproxEncoding
+
+
+@pytest.fixture(autouse=True)
+def _small_batches(monkeypatch):
+    monkeypatch.setattr(tokens, "encoding", lambda model: ApproxEncoding())
+    monkeypatch.setattr(embeddings.settings, "embeddings_dim", 2)
+    monkeypatch.setattr(embeddings.settings, "embeddings_batch_max_items", 2)
+    monkeypatch.setattr(embeddings.settings, "embeddings_batch_max_tokens", 100)
+    monkeypatch.setattr(embeddings, "embedding_cache", lambda: None)
+
+
+def _vec(n: int) -> list[float]:
+    return embeddings.reduce_dims([[float(n), 1.0]], 2)[0].tolist()
+
+
+def _rows(matrix) -> list[list[float]]:
+    return [matrix.vectors[i].tolist() if matrix.mask[i] else [] for i in range(len(matrix))]
+
+
+def _response(texts: list[str]) -> MagicMock:
+    return MagicMock(data=[MagicMock(embedding=[float(len(t)), 1.0]) for t in texts])
+
+
+class TestEmbedTexts:
+    """Test splitting, parallel dispatch and reassembly of embedding requests."""
+
+    def test_batches_are_split_and_reassembled_in_order(self):
+        """Test that inputs are split by item count and results keep their positions."""
+        sent: list[list[str]] = []
+        lock = threading.Lock()
+
+        def create(body):
+            with lock:
+                sent.append(body["input"])
+            return _response(body["input"])
+
+        texts = ["a", "", "bbb", "cc", "  ", "dddd", "eeeee"]
+        with patch.object(embeddings, "create_embeddings", side_effect=create):
+            vectors = embeddings.embed_texts(texts)
+
+        assert vectors.vectors.dtype == np.float32
+        assert vectors.vectors.shape == (7, 2)
+        assert _rows(vectors) == [_vec(1), [], _vec(3), _vec(2), [], _vec(4), _vec(5)]
+        assert sorted(sent) == [["a", "bbb"], ["cc", "dddd"], ["eeeee"]]
+
+    def test_token_limit_closes_a_batch(self, monkeypatch):
+        """Test that an input starts a new batch once the token budget would be exceeded."""
+        monkeypatch.setattr(embeddings.settings, "embeddings_batch_max_items", 10)
+
+        batches = embeddings.plan_batches(["x" * 300, "y" * 200, "z" * 120, "w" * 100])
+
+        assert batches == [[0], [1, 2], [3]]
+
+    @patch("reddit_pipeline.utils.time.sleep")
+    def test_only_the_failing_batch_is_retried(self, _sleep):
+        """Test that a transient failure re-sends just that batch."""
+        calls: list[list[str]] = []
+        failed = threading.Event()
+
+        def create(body):
+            calls.append(body["input"])
+            if body["input"] == ["cc"] and not failed.is_set():
+                failed.set()
+                raise RuntimeError("transient")
+            return _response(body["input"])
+
+        with patch.object(embeddings, "create_embeddings", side_effect=create):
+            vectors = embeddings.embed_texts(["a", "bb", "cc"])
+
+        assert _rows(vectors) == [_vec(1), _vec(2), _vec(2)]
+        assert sorted(calls) == [["a", "bb"], ["cc"], ["cc"]]
+
+
+class TestReducedDimensions:
+    """Test native dimensions and the local reduction fallback."""
+
+    def test_native_dimensions_are_requested(self, monkeypatch):
+        """Test that text-embedding-3 models get `dimensions` and others do not."""
+        monkeypatch.setattr(embeddings.settings, "embeddings_model", "text-embedding-3-small")
+
+        assert embeddings.request_body(["a"])["dimensions"] == 2
+
+        monkeypatch.setattr(embeddings.settings, "embeddings_model", "text-embedding-ada-002")
+        assert "dimensions" not in embeddings.request_body(["a"])
+
+    def test_reduce_dims_truncates_and_normalises(self):
+        """Test Matryoshka-style truncation followed by L2 normalisation."""
+        reduced = embeddings.reduce_dims([[3.0, 4.0, 100.0], [2.0], [0.0, 0.0]], 2)
+
+        assert reduced.dtype == np.float32
+        assert reduced[0].tolist() == pytest.approx([0.6, 0.8])
+        assert reduced[1:].tolist() == [[1.0, 0.0], [0.0, 0.0]]
@@ -0,0 +1,126 @@
+"""Unit tests for packing several posts into one LLM request."""
+
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import pytest
+
+from reddit_pipeline.llm import insights, packing, summariser, tokens
+from reddit_pipeline.llm.packing import group_by_budget, packed_response_format, split_packed
+from reddit_pipeline.llm.summariser import summarise_posts_with_comments
+from reddit_pipeline.llm.tokens import ApproxEncoding
+from reddit_pipeline.models import Post
+from reddit_pipeline.run import run_llm_stage
+
+
+def _post(pid: str, text: str = "") -> Post:
+    return Post(
+        id=pid,
+        title=f"Post {pid}",
+        url=f"https://example.com/{pid}",
+        author="user",
+        score=10,
+        num_comments=1,
+        created_utc=datetime.now(UTC),
+        subreddit="test",
+        text=text,
+    )
+
+
+@pytest.fixture(autouse=True)
+def _packing(monkeypatch):
+    monkeypatch.setattr(tokens, "encoding", lambda model: ApproxEncoding())
+    monkeypatch.setattr(packing.settings, "llm_pack_enabled", True)
+    monkeypatch.setattr(packing.settings, "llm_pack_max_posts", 3)
+    monkeypatch.setattr(packing.settings, "llm_pack_max_tokens", 100)
+
+
+def _packed_reply(messages, response_format=None):
+    """Answer a packed request with one item per post ID section, echoing the ID."""
+    if response_format is None:
+        return {"summary": "single"}
+    content = messages[1]["content"]
+    ids = [line.split(": ", 1)[1] for line in content.splitlines() if line.startswith("### ")]
+    return {"items": [{"post_id": pid, "summary": pid} for pid in ids]}
+
+
+class TestPackingHelpers:
+    """Test grouping, the packed schema and response splitting."""
+
+    def test_groups_use_pack_limits(self):
+        """Test that groups close at LLM_PACK_MAX_POSTS and LLM_PACK_MAX_TOKENS."""
+        groups = group_by_budget(list("abcdef"), [10, 10, 10, 10, 500, 30])
+
+        assert groups == [["a", "b", "c"], ["d"], ["e"], ["f"]]
+
+    def test_packed_schema_wraps_the_item_schema(self):
+        """Test that each array item is the original schema plus a required post_id."""
+        packed = packed_response_format(summariser._response_format())
+        item = packed["json_schema"]["schema"]["properties"]["items"]["items"]
+
+        assert packed["json_schema"]["strict"] is True
+        assert item["required"][0] == "post_id"
+        original = summariser._response_format()["json_schema"]["schema"]
+        assert item["required"][1:] == original["required"]
+        assert "post_id" not in original["properties"]
+
+    def test_split_ignores_unknown_and_duplicate_ids(self):
+        """Test that only the first item for each requested ID is kept."""
+        payload = {
+            "items": [
+                {"post_id": "a", "summary": "first"},
+                {"post_id": "x", "summary": "stray"},
+                {"post_id": "a", "summary": "again"},
+                "junk",
+            ]
+        }
+
+        assert split_packed(payload, ["a", "b"]) == {"a": {"summary": "first"}}
+        assert split_packed({"summary": "not packed"}, ["a"]) == {}
+
+
+class TestPackedStages:
+    """Test that packed requests map back to per-post results."""
+
+    def test_summaries_are_packed_and_split(self):
+        """Test that short posts share one request and results keep input order."""
+        posts = [_post(pid) for pid in "abcd"]
+
+        with patch.object(summariser, "_call_openai", side_effect=_packed_reply) as mock_call:
+            results = summarise_posts_with_comments(posts, {})
+
+        assert results == {
+            "a": {"summary": "a"},
+            "b": {"summary": "b"},
+            "c": {"summary": "c"},
+            "d": {"summary": "single"},
+        }
+        assert mock_call.call_count == 2
+
+    def test_missing_posts_are_retried_alone(self):
+        """Test that a post left out of a packed response gets its own request."""
+
+        def reply(messages, response_format=None):
+            if response_format is None:
+                return {"summary": "alone"}
+            return {"items": [{"post_id": "a", "summary": "a"}]}
+
+        with patch.object(summariser, "_call_openai", side_effect=reply):
+            results = summariser.summarise_pack([_post("a"), _post("b")], {})
+
+        assert results == {"a": {"summary": "a"}, "b": {"summary": "alone"}}
+
+    def test_run_llm_stage_packs_both_stages(self):
+        """Test that the pipelined stage packs summaries and insights."""
+        posts = [_post(pid) for pid in "abc"]
+
+        with (
+            patch.object(summariser, "_call_openai", side_effect=_packed_reply) as mock_summary,
+            patch.object(insights, "_call_openai", side_effect=_packed_reply) as mock_insight,
+        ):
+            summaries, results = run_llm_stage(posts, {})
+
+        assert list(summaries) == ["a", "b", "c"]
+        assert results == {pid: {"summary": pid} for pid in "abc"}
+        assert mock_summary.call_count == 1
+        assert mock_insight.call_count == 1
@@ -0,0 +1,135 @@
+"""Unit tests for token counting and summariser prompt packing."""
+
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import pytest
+
+from reddit_pipeline.llm import summariser, tokens
+from reddit_pipeline.llm.tokens import (
+    ApproxEncoding,
+    allocate_budget,
+    batch_by_tokens,
+    count_tokens,
+    truncate_to_tokens,
+)
+from reddit_pipeline.models import Post
+
+_cached_encoding = tokens.encoding
+
+
+@pytest.fixture(autouse=True)
+def _offline_encoding(monkeypatch):
+    # Deterministic 4-chars-per-token counting without tiktoken's BPE download
+    monkeypatch.setattr(tokens, "encoding", lambda model: ApproxEncoding())
+
+
+def _post(text: str, title: str = "A post about pricing pages") -> Post:
+    return Post(
+        id="p1",
+        title=title,
+        url="https://example.com/p1",
+        author="user",
+        score=10,
+        num_comments=3,
+        created_utc=datetime.now(UTC),
+        subreddit="test",
+        text=text,
+    )
+
+
+def _prompt_tokens(messages: list[dict[str, str]]) -> int:
+    return sum(count_tokens([m["content"] for m in messages], "any"))
+
+
+class TestAllocateBudget:
+    """Test water-filling budget allocation."""
+
+    def test_everything_fits(self):
+        """Test that demands under budget are granted in full."""
+        assert allocate_budget([10, 20, 0], [1, 1, 1], 100) == [10, 20, 0]
+
+    def test_unused_share_is_redistributed(self):
+        """Test that a small item's unused share goes to the larger ones."""
+        assert allocate_budget([10, 500, 500], [1, 1, 1], 210) == [10, 100, 100]
+
+    def test_weights_split_the_remainder(self):
+        """Test that contested budget is split by weight and never exceeded."""
+        alloc = allocate_budget([1000, 1000], [3, 1], 400)
+
+        assert alloc == [300, 100]
+        assert sum(allocate_budget([7, 9, 11], [1, 2, 3], 10)) <= 10
+
+
+class TestTokenHelpers:
+    """Test counting, truncation and the tokenizer fallback."""
+
+    def test_truncate_respects_limit(self):
+        """Test that truncated text stays within the limit and ends with an ellipsis."""
+        text = "x" * 100
+
+        cut = truncate_to_tokens(text, 5, "any")
+
+        assert cut.endswith("…")
+        assert count_tokens([cut], "any")[0] <= 5
+        assert truncate_to_tokens("short", 5, "any") == "short"
+
+    def test_falls_back_when_tiktoken_is_unavailable(self):
+        """Test that an unloadable encoding degrades to the approximation."""
+        with patch.object(tokens.tiktoken, "encoding_for_model", side_effect=OSError("offline")):
+            enc = _cached_encoding.__wrapped__("offline-test-model")
+
+        assert isinstance(enc, ApproxEncoding)
+
+
+class TestSummariserPacking:
+    """Test that summariser prompts use the token budget."""
+
+    def test_short_inputs_are_untouched(self):
+        """Test that nothing is cut when everything fits."""
+        comments = [{"score": 5, "body": "Great point about annual plans."}]
+
+        content = summariser.build_messages(_post("Short body."), comments)[1]["content"]
+
+        assert "Short body." in content
+        assert "- [score 5] Great point about annual plans." in content
+        assert "…" not in content
+
+    def test_budget_is_never_exceeded(self, monkeypatch):
+        """Test that long inputs are packed to the configured prompt budget."""
+        monkeypatch.setattr(summariser.settings, "summariser_max_input_tokens", 600)
+        comments = [{"score": s, "body": f"comment {s} " * 300} for s in (500, 50, 5)]
+
+        messages = summariser.build_messages(_post("body " * 2000), comments)
+
+        assert _prompt_tokens(messages) <= 600
+        assert "[score 500]" in messages[1]["content"]
+
+    def test_higher_scored_comments_get_more_budget(self, monkeypatch):
+        """Test that the budget for comments is weighted by score."""
+        monkeypatch.setattr(summariser.settings, "summariser_max_input_tokens", 800)
+        comments = [{"score": 1, "body": "a" * 4000}, {"score": 900, "body": "b" * 4000}]
+
+        content = summariser.build_messages(_post(""), comments)[1]["content"]
+
+        assert content.count("b") > 2 * content.count("a")
+
+    def test_stub_comments_are_dropped(self, monkeypatch):
+        """Test that comments that would be cut to a stub are left out, lowest score first."""
+        monkeypatch.setattr(summariser.settings, "summariser_max_input_tokens", 200)
+        comments = [{"score": s, "body": "z" * 2000} for s in (100, 1)]
+
+        content = summariser.build_messages(_post("y" * 2000), comments)[1]["content"]
+
+        assert "[score 100]" in content
+        assert "[score 1]" not in content
+
+
+class TestBatchByTokens:
+    """Test greedy batching by item count and token size."""
+
+    def test_limits_and_oversized_items(self):
+        """Test that batches close on either limit and an oversized item stands alone."""
+        batches = batch_by_tokens(list("abcdef"), [10, 10, 10, 10, 500, 30], 3, 100)
+
+        assert batches == [["a", "b", "c"], ["d"], ["e"], ["f"]]
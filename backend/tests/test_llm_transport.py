@@ -0,0 +1,167 @@
+"""Unit tests for the shared LLM transport."""
+
+import asyncio
+import threading
+import time
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from reddit_pipeline.llm import summariser, transport
+from reddit_pipeline.models import Post
+
+
+def _post(pid: str) -> Post:
+    return Post(
+        id=pid,
+        title=f"Post {pid}",
+        url=f"https://example.com/{pid}",
+        author="user",
+        score=10,
+        num_comments=1,
+        created_utc=datetime.now(UTC),
+        subreddit="test",
+    )
+
+
+class TestModelLimits:
+    """Test per-model semaphores and concurrent summarisation."""
+
+    def test_override_takes_precedence(self, monkeypatch):
+        """Test that per-model overrides replace the default limit."""
+        monkeypatch.setattr(transport.settings, "llm_max_concurrency", 4)
+        monkeypatch.setattr(transport.settings, "llm_concurrency_overrides", {"big-model": 1})
+
+        assert transport.model_concurrency("big-model") == 1
+        assert transport.model_concurrency("small-model") == 4
+
+    @patch("reddit_pipeline.llm.summariser.response_cache", return_value=None)
+    @patch("reddit_pipeline.llm.transport.sync_client")
+    def test_in_flight_requests_are_bounded(self, mock_client, _cache, monkeypatch):
+        """Test that summaries run concurrently but never above the model limit."""
+        model = "bounded-test-model"
+        monkeypatch.setattr(summariser.settings, "llm_model_summariser", model)
+        monkeypatch.setattr(transport.settings, "llm_concurrency_overrides", {model: 2})
+        lock = threading.Lock()
+        active = [0]
+        peak = [0]
+
+        def create(**kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            raw = MagicMock(headers={})
+            message = MagicMock(content='{"summary": "ok"}')
+            raw.parse.return_value.choices = [MagicMock(message=message)]
+            return raw
+
+        mock_client.return_value.chat.completions.with_raw_response.create.side_effect = create
+
+        posts = [_post(str(i)) for i in range(6)]
+        results = summariser.summarise_posts_with_comments(posts, {})
+
+        assert list(results) == [p.id for p in posts]
+        assert peak[0] == 2
+
+
+@pytest.fixture
+def fresh_transport():
+    transport.close_clients()
+    transport.reset_usage()
+    yield
+    transport.close_clients()
+    transport.reset_usage()
+
+
+class TestTransport:
+    """Test client reuse, timeouts and usage counters."""
+
+    def test_client_is_shared_and_uses_configured_timeout(self, fresh_transport, monkeypatch):
+        """Test that one client is reused and `HTTP_TIMEOUT_SECONDS` is applied."""
+        monkeypatch.setattr(transport.settings, "openai_api_key", "sk-test")
+        monkeypatch.setattr(transport.settings, "http_timeout_seconds", 42)
+
+        client = transport.sync_client()
+
+        assert transport.sync_client() is client
+        assert client.timeout.read == 42
+        assert client.timeout.connect == transport.CONNECT_TIMEOUT_SECONDS
+
+    def test_usage_counts_requests_errors_and_tokens(self, fresh_transport):
+        """Test that successes record tokens and failures count as errors."""
+        raw = MagicMock(headers={})
+        raw.parse.return_value.usage = MagicMock(prompt_tokens=120, completion_tokens=30)
+        create = MagicMock(side_effect=[raw, RuntimeError("boom")])
+        body = {"model": "usage-test-model", "messages": []}
+
+        with patch.object(transport, "sync_client") as mock_client:
+            mock_client.return_value.chat.completions.with_raw_response.create = create
+            transport.chat_completion(body)
+            with pytest.raises(RuntimeError):
+                transport.chat_completion(body)
+
+        stats = transport.usage_stats()["usage-test-model"]
+        assert stats["requests"] == 2
+        assert stats["errors"] == 1
+        assert stats["prompt_tokens"] == 120
+        assert stats["completion_tokens"] == 30
+
+    def test_async_requests_share_the_counters(self, fresh_transport):
+        """Test that the async path goes through the same slot and counters."""
+        raw = MagicMock(headers={})
+        raw.parse.return_value.usage = None
+        create = AsyncMock(return_value=raw)
+
+        with patch.object(transport, "async_client") as mock_client:
+            mock_client.return_value.embeddings.with_raw_response.create = create
+            response = asyncio.run(transport.acreate_embeddings({"model": "embed-test"}))
+
+        assert response is raw.parse.return_value
+        assert transport.usage_stats()["embed-test"]["requests"] == 1
+
+    def test_rate_limit_errors_feed_the_limiter(self, fresh_transport):
+        """Test that a 429's Retry-After reaches the shared limiter before re-raising."""
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        response = httpx.Response(429, headers={"retry-after": "7"}, request=request)
+        error = openai.RateLimitError("slow down", response=response, body=None)
+        body = {"model": "throttled-test-model", "messages": []}
+
+        with (
+            patch.object(transport, "sync_client") as mock_client,
+            patch.object(transport.limiter, "observe") as mock_observe,
+        ):
+            mock_client.return_value.chat.completions.with_raw_response.create.side_effect = error
+            with pytest.raises(openai.RateLimitError):
+                transport.chat_completion(body)
+
+        host, headers = mock_observe.call_args.args
+        assert host == transport.OPENAI_HOST
+        assert headers["retry-after"] == "7"
+
+    def test_close_clients_closes_the_async_client(self, fresh_transport, monkeypatch):
+        """Test that closing releases the async client's connections too."""
+        monkeypatch.setattr(transport.settings, "openai_api_key", "sk-test")
+        client = transport.async_client()
+        transport.sync_client()
+
+        transport.close_clients()
+
+        assert client.is_closed()
+        assert transport.async_client() is not client
+
+    def test_aclose_clients_on_the_owning_loop(self, fresh_transport, monkeypatch):
+        """Test that asyncio callers can close the async client on their own loop."""
+        monkeypatch.setattr(transport.settings, "openai_api_key", "sk-test")
+
+        async def run():
+            client = transport.async_client()
+            await transport.aclose_clients()
+            return client
+
+        assert asyncio.run(run()).is_closed()
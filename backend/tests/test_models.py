@@ -0,0 +1,93 @@
+"""Unit tests for pipeline models."""
+
+from datetime import UTC, datetime, timedelta
+
+import numpy as np
+
+from reddit_pipeline.models import Post, PostBatch
+
+
+def _post(pid: str, source: str, subreddit: str, comments: int, hours_ago: float) -> Post:
+    return Post(
+        id=pid,
+        source=source,
+        title=f"Post {pid}",
+        url=f"https://example.com/{pid}",
+        author="user",
+        score=int(pid) * 10,
+        num_comments=comments,
+        created_utc=datetime.now(UTC) - timedelta(hours=hours_ago),
+        subreddit=subreddit,
+    )
+
+
+def _posts() -> list[Post]:
+    return [
+        _post("1", "reddit", "technology", 3, 1),
+        _post("2", "reddit", "programming", 20, 2),
+        _post("3", "hackernews", "hn", 50, 100),
+        _post("4", "reddit", "technology", 8, 5),
+    ]
+
+
+class TestPostBatch:
+    """Test the columnar PostBatch representation."""
+
+    def test_round_trip(self):
+        """Test that conversion back returns the original Post objects."""
+        posts = _posts()
+        batch = PostBatch.from_posts(posts)
+
+        assert len(batch) == 4
+        assert batch.to_posts() == posts
+        assert batch.to_posts()[0] is posts[0]
+
+    def test_columns(self):
+        """Test numeric columns and interned categorical columns."""
+        posts = _posts()
+        batch = PostBatch.from_posts(posts)
+
+        assert batch.score.tolist() == [10, 20, 30, 40]
+        assert batch.num_comments.dtype == np.int64
+        assert batch.created_utc[0] == posts[0].created_utc.timestamp()
+        assert batch.source_labels == ("reddit", "hackernews")
+        assert batch.source_codes.tolist() == [0, 0, 1, 0]
+        assert batch.subreddit_labels == ("technology", "programming", "hn")
+
+    def test_window_mask_matches_in_window(self):
+        """Test the vectorised window filter agrees with Post.in_window."""
+        posts = _posts()
+        batch = PostBatch.from_posts(posts)
+        since = datetime.now(UTC) - timedelta(hours=24)
+
+        mask = batch.window_mask(since, min_comments=5)
+
+        assert mask.tolist() == [p.in_window(since, 5) for p in posts]
+        assert batch.window_mask().all()
+
+    def test_take_with_mask_and_indices(self):
+        """Test row selection by boolean mask and by index array."""
+        batch = PostBatch.from_posts(_posts())
+
+        reddit = batch.take(batch.source_mask("reddit"))
+        reordered = batch.take(np.array([3, 0]))
+
+        assert [p.id for p in reddit.to_posts()] == ["1", "2", "4"]
+        assert reddit.score.tolist() == [10, 20, 40]
+        assert [p.id for p in reordered.to_posts()] == ["4", "1"]
+        assert batch.subreddit_mask("technology").tolist() == [True, False, False, True]
+
+    def test_unknown_label_masks_are_empty(self):
+        """Test masks for labels that are not present."""
+        batch = PostBatch.from_posts(_posts())
+
+        assert not batch.source_mask("producthunt").any()
+        assert not batch.subreddit_mask("python").any()
+
+    def test_empty_batch(self):
+        """Test that an empty batch behaves."""
+        batch = PostBatch.from_posts([])
+
+        assert len(batch) == 0
+        assert batch.to_posts() == []
+        assert batch.window_mask().shape == (0,)
@@ -1,9 +1,18 @@
 """Unit tests for ranking utilities."""
 
+import random
 from datetime import UTC, datetime, timedelta
 
-from reddit_pipeline.models import Post
-from reddit_pipeline.ranking import composite_rank, rank_posts
+import numpy as np
+
+from reddit_pipeline.models import Post, PostBatch
+from reddit_pipeline.ranking import (
+    composite_rank,
+    composite_rank_batch,
+    rank_posts,
+    top_n_indices,
+    top_n_posts,
+)
 
 
 class TestCompositeRank:
@@ -193,3 +202,83 @@ class TestRankPosts:
         ranked = rank_posts([post])
         assert len(ranked) == 1
         assert ranked[0].id == "1"
+
+
+def _random_posts(count: int, seed: int = 7) -> list[Post]:
+    rng = random.Random(seed)
+    now = datetime.now(UTC)
+    return [
+        Post(
+            id=str(i),
+            title=f"Post {i}",
+            # Small value ranges force plenty of exact ties
+            score=rng.randint(0, 5),
+            num_comments=rng.randint(0, 3),
+            created_utc=now - timedelta(hours=rng.choice([0, 12, 48])),
+            subreddit="test",
+            author="user",
+            url=f"https://example.com/{i}",
+        )
+        for i in range(count)
+    ]
+
+
+class TestBatchRanking:
+    """Test vectorised ranking and top-N selection."""
+
+    def test_batch_matches_scalar(self):
+        """Test that the vectorised formula matches composite_rank."""
+        now = datetime.now(UTC)
+        posts = _random_posts(50)
+
+        ranks = composite_rank_batch(PostBatch.from_posts(posts), now)
+        expected = [
+            composite_rank(p.score, p.num_comments, None, p.created_utc, now) for p in posts
+        ]
+
+        assert np.allclose(ranks, expected, rtol=1e-12)
+
+    def test_batch_upvote_ratio_nan_means_absent(self):
+        """Test that NaN upvote ratios add no bonus."""
+        now = datetime.now(UTC)
+        posts = _random_posts(2)
+        batch = PostBatch.from_posts(posts)
+
+        ranks = composite_rank_batch(batch, now, upvote_ratio=np.array([0.5, np.nan]))
+
+        assert np.isclose(
+            ranks[0],
+            composite_rank(posts[0].score, posts[0].num_comments, 0.5, posts[0].created_utc, now),
+        )
+        assert np.isclose(
+            ranks[1],
+            composite_rank(posts[1].score, posts[1].num_comments, None, posts[1].created_utc, now),
+        )
+
+    def test_rank_posts_matches_sorted_with_ties(self):
+        """Test ordering is identical to a stable full sort, including ties."""
+        now = datetime.now(UTC)
+        posts = _random_posts(200)
+
+        expected = sorted(
+            posts,
+            key=lambda p: composite_rank(p.score, p.num_comments, None, p.created_utc, now),
+            reverse=True,
+        )
+
+        assert [p.id for p in rank_posts(posts, now)] == [p.id for p in expected]
+
+    def test_top_n_posts_equals_rank_prefix(self):
+        """Test top-N selection equals the prefix of the full ranking."""
+        now = datetime.now(UTC)
+        posts = _random_posts(300)
+        full = rank_posts(posts, now)
+
+        for n in (0, 1, 7, 20, 299, 300, 500):
+            assert [p.id for p in top_n_posts(posts, n, now)] == [p.id for p in full[:n]]
+
+    def test_top_n_indices_edge_cases(self):
+        """Test empty input and non-positive n."""
+        assert top_n_indices(np.array([]), 3).size == 0
+        assert top_n_indices(np.array([1.0, 2.0]), 0).size == 0
+        assert top_n_indices(np.array([1.0, 3.0, 2.0]), 2).tolist() == [1, 2]
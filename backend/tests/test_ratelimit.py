@@ -0,0 +1,144 @@
+"""Unit tests for the shared token-bucket rate limiter."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from reddit_pipeline.ratelimit import (
+    RateLimiter,
+    TokenBucket,
+    host_of,
+    parse_duration,
+    parse_retry_after,
+    retry_after_from_exception,
+)
+from reddit_pipeline.utils import retry_with_backoff
+
+
+class TestParsing:
+    """Test header and URL parsing helpers."""
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [("12", 12.0), ("1.5", 1.5), ("20ms", 0.02), ("6m0s", 360.0), ("1h", 3600.0)],
+    )
+    def test_parse_duration(self, value, expected):
+        """Test reset durations in Reddit and OpenAI formats."""
+        assert parse_duration(value) == pytest.approx(expected)
+
+    def test_parse_duration_invalid(self):
+        """Test that unparseable durations return None."""
+        assert parse_duration("soon") is None
+
+    def test_parse_retry_after_http_date(self):
+        """Test Retry-After given as an HTTP-date in the past clamps to zero."""
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_host_of(self):
+        """Test host extraction from URLs and bare hosts."""
+        assert host_of("https://API.OpenAI.com/v1/chat") == "api.openai.com"
+        assert host_of("oauth.reddit.com") == "oauth.reddit.com"
+
+    def test_retry_after_from_exception(self):
+        """Test that HTTP errors carrying Retry-After expose the delay."""
+        request = httpx.Request("GET", "https://hn.algolia.com/api/v1/search")
+        response = httpx.Response(429, headers={"Retry-After": "3"}, request=request)
+        exc = httpx.HTTPStatusError("Too Many Requests", request=request, response=response)
+
+        assert retry_after_from_exception(exc) == 3.0
+        assert retry_after_from_exception(ValueError("no response")) is None
+
+
+class TestTokenBucket:
+    """Test token bucket behaviour."""
+
+    def test_burst_then_throttle(self):
+        """Test that the burst is free and later tokens wait for refill."""
+        bucket = TokenBucket(rate=10.0, capacity=2, headroom=1.0)
+
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+    def test_headroom_reduces_rate(self):
+        """Test that headroom keeps throughput just under the quota."""
+        bucket = TokenBucket(rate=100.0, capacity=1, headroom=0.9)
+        assert bucket.rate == pytest.approx(90.0)
+
+    def test_retry_after_blocks(self):
+        """Test that Retry-After pauses the bucket."""
+        bucket = TokenBucket(rate=100.0, capacity=10, headroom=1.0)
+        bucket.observe(httpx.Headers({"Retry-After": "2"}))
+
+        assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+    def test_exhausted_quota_waits_for_reset(self):
+        """Test that zero remaining requests blocks until the window resets."""
+        bucket = TokenBucket(rate=100.0, capacity=10, headroom=1.0)
+        bucket.observe({"X-Ratelimit-Remaining": "0", "X-Ratelimit-Reset": "5"})
+
+        assert bucket.reserve() == pytest.approx(5.0, abs=0.05)
+
+    def test_remaining_quota_spreads_rate(self):
+        """Test that the rate adapts to the remaining budget in the window."""
+        bucket = TokenBucket(rate=100.0, capacity=10, headroom=1.0)
+        bucket.observe(
+            {"x-ratelimit-remaining-requests": "10", "x-ratelimit-reset-requests": "10s"}
+        )
+
+        assert bucket.rate == pytest.approx(1.0)
+
+    def test_non_mapping_headers_ignored(self):
+        """Test that mocked or missing headers are ignored."""
+        bucket = TokenBucket(rate=10.0, capacity=1, headroom=1.0)
+        bucket.observe(object())
+        assert bucket.reserve() == 0.0
+
+    def test_acquire_async(self):
+        """Test that async acquisition waits for a token."""
+        bucket = TokenBucket(rate=20.0, capacity=1, headroom=1.0)
+
+        async def run():
+            await bucket.acquire_async()
+            await bucket.acquire_async()
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        assert time.perf_counter() - started >= 0.04
+
+
+class TestRateLimiter:
+    """Test the per-host registry."""
+
+    def test_buckets_are_per_host(self):
+        """Test that each host gets its own bucket and rate."""
+        limiter = RateLimiter({"a.example.com": (1.0, 1)}, headroom=1.0)
+
+        assert limiter.bucket("https://a.example.com/x") is limiter.bucket("a.example.com")
+        assert limiter.bucket("a.example.com") is not limiter.bucket("b.example.com")
+        assert limiter.bucket("a.example.com").rate == pytest.approx(1.0)
+
+
+class TestRetryHonoursRetryAfter:
+    """Test that the retry decorator waits at least Retry-After."""
+
+    def test_retry_waits_for_retry_after(self, monkeypatch):
+        """Test the backoff delay is raised to the server-requested delay."""
+        sleeps = []
+        monkeypatch.setattr("reddit_pipeline.utils.time.sleep", sleeps.append)
+        request = httpx.Request("GET", "https://api.openai.com/v1/embeddings")
+        response = httpx.Response(429, headers={"Retry-After": "7"}, request=request)
+        calls = 0
+
+        @retry_with_backoff(max_attempts=2, base_delay_seconds=0.01)
+        def flaky():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise httpx.HTTPStatusError("429", request=request, response=response)
+            return "ok"
+
+        assert flaky() == "ok"
+        assert sleeps == [7.0]
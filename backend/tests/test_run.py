@@ -0,0 +1,297 @@
+"""Unit tests for pipeline orchestration stages."""
+
+import threading
+import time
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from reddit_pipeline.models import EmbeddingMatrix, Post
+from reddit_pipeline.run import (
+    SourceTask,
+    process,
+    run_fetch_stage,
+    run_llm_stage,
+    semantic_dedupe,
+)
+
+
+def _post(pid: str, source: str = "reddit") -> Post:
+    return Post(
+        id=pid,
+        source=source,
+        title=f"Post {pid}",
+        url=f"https://example.com/{pid}",
+        author="user",
+        score=10,
+        num_comments=10,
+        created_utc=datetime.now(UTC),
+        subreddit="test",
+    )
+
+
+class TestRunFetchStage:
+    """Test the concurrent multi-source fetch stage."""
+
+    def test_merges_posts_in_task_order(self):
+        """Test that posts from every source are merged in task order."""
+        tasks = [
+            SourceTask("reddit", lambda: [_post("r1"), _post("r2")], 5.0),
+            SourceTask("hackernews", lambda: [_post("h1", "hackernews")], 5.0),
+        ]
+
+        posts, timings = run_fetch_stage(tasks, max_workers=4)
+
+        assert [p.id for p in posts] == ["r1", "r2", "h1"]
+        assert set(timings) == {"reddit", "hackernews"}
+
+    def test_sources_run_concurrently(self):
+        """Test that stage latency tracks the slowest source, not the sum."""
+        barrier = threading.Barrier(3, timeout=2.0)
+
+        def _slow(pid: str):
+            def fetch():
+                barrier.wait()
+                time.sleep(0.1)
+                return [_post(pid)]
+
+            return fetch
+
+        tasks = [SourceTask(name, _slow(name), 5.0) for name in ("a", "b", "c")]
+
+        started = time.perf_counter()
+        posts, timings = run_fetch_stage(tasks, max_workers=3)
+        elapsed = time.perf_counter() - started
+
+        assert len(posts) == 3
+        assert elapsed < 0.25
+        assert all(t >= 0.1 for t in timings.values())
+
+    def test_failing_source_is_isolated(self):
+        """Test that one failing source does not drop the others."""
+
+        def boom():
+            raise RuntimeError("API Error")
+
+        tasks = [
+            SourceTask("reddit", boom, 5.0),
+            SourceTask("producthunt", lambda: [_post("p1", "producthunt")], 5.0),
+        ]
+
+        posts, timings = run_fetch_stage(tasks, max_workers=2)
+
+        assert [p.id for p in posts] == ["p1"]
+        assert "reddit" in timings
+
+    def test_source_timeout_is_isolated(self):
+        """Test that a source exceeding its timeout is dropped without blocking."""
+        release = threading.Event()
+
+        def hang():
+            release.wait(2.0)
+            return [_post("late")]
+
+        tasks = [
+            SourceTask("slow", hang, 0.05),
+            SourceTask("fast", lambda: [_post("f1")], 5.0),
+        ]
+
+        started = time.perf_counter()
+        posts, timings = run_fetch_stage(tasks, max_workers=2)
+        elapsed = time.perf_counter() - started
+        release.set()
+
+        assert [p.id for p in posts] == ["f1"]
+        assert elapsed < 1.0
+        assert timings["slow"] >= 0.05
+
+    def test_queued_sources_get_their_full_timeout(self):
+        """Test that a source waiting for a free worker is not charged for the wait."""
+
+        def _slow(pid: str):
+            def fetch():
+                time.sleep(0.15)
+                return [_post(pid)]
+
+            return fetch
+
+        tasks = [SourceTask(name, _slow(name), 0.3) for name in ("a", "b", "c")]
+
+        posts, timings = run_fetch_stage(tasks, max_workers=1)
+
+        assert [p.id for p in posts] == ["a", "b", "c"]
+        assert all(t < 0.3 for t in timings.values())
+
+    def test_empty_tasks(self):
+        """Test that no tasks yields no posts and no timings."""
+        assert run_fetch_stage([], max_workers=2) == ([], {})
+
+
+class TestSemanticDedupe:
+    """Test the optional embedding-space dedupe stage."""
+
+    @patch("reddit_pipeline.run.embed_texts")
+    def test_flags_paraphrase_and_returns_title_vectors(self, mock_embed):
+        """Test that a paraphrased title is flagged and vectors are returned for reuse."""
+        vectors = np.array([[1.0, 0.0], [0.0, 1.0], [0.99, 0.05]], dtype=np.float32)
+        mock_embed.return_value = EmbeddingMatrix(vectors, np.ones(3, dtype=np.bool_))
+        posts = [
+            _post("1"),
+            _post("2"),
+            _post("3").model_copy(update={"score": 500}),
+            _post("4").model_copy(update={"is_duplicate": True}),
+        ]
+
+        flagged, title_vectors = semantic_dedupe(posts)
+
+        mock_embed.assert_called_once_with(["Post 1", "Post 2", "Post 3"])
+        assert [p.is_duplicate for p in flagged] == [True, False, False, True]
+        assert title_vectors["2"].tolist() == [0.0, 1.0]
+        assert np.shares_memory(title_vectors["2"], vectors)
+        assert set(title_vectors) == {"1", "2", "3"}
+
+    @patch("reddit_pipeline.run.embed_texts")
+    def test_single_candidate_skips_embedding(self, mock_embed):
+        """Test that nothing is embedded when there is nothing to compare."""
+        posts = [_post("1")]
+
+        assert semantic_dedupe(posts) == (posts, {})
+        mock_embed.assert_not_called()
+
+
+class TestRunLlmStage:
+    """Test pipelined summarisation and insight generation."""
+
+    @patch("reddit_pipeline.llm.insights.generate_insight")
+    @patch("reddit_pipeline.llm.summariser.summarise_post")
+    def test_insight_starts_when_its_summary_is_ready(self, mock_summarise, mock_insight):
+        """Test that a fast post's insight does not wait for a slow summary."""
+        slow_started = threading.Event()
+        release = threading.Event()
+        order: list[str] = []
+
+        def summarise(post, comments):
+            if post.id == "slow":
+                slow_started.set()
+                release.wait(5)
+            return {"summary": post.id}
+
+        def insight(summary):
+            order.append(summary["summary"])
+            if summary["summary"] == "fast":
+                release.set()
+            return {"for": summary["summary"]}
+
+        mock_summarise.side_effect = summarise
+        mock_insight.side_effect = insight
+
+        summaries, insights = run_llm_stage([_post("slow"), _post("fast")], {})
+
+        assert slow_started.is_set()
+        assert order == ["fast", "slow"]
+        assert list(summaries) == ["slow", "fast"]
+        assert insights == {"slow": {"for": "slow"}, "fast": {"for": "fast"}}
+
+    @patch(
+        "reddit_pipeline.llm.insights.generate_insight", side_effect=lambda s: {"for": s["summary"]}
+    )
+    @patch("reddit_pipeline.llm.summariser.summarise_post")
+    def test_failing_item_is_isolated(self, mock_summarise, _insight):
+        """Test that one failed summary drops only that post."""
+
+        def summarise(post, comments):
+            if post.id == "bad":
+                raise RuntimeError("boom")
+            return {"summary": post.id}
+
+        mock_summarise.side_effect = summarise
+
+        summaries, insights = run_llm_stage([_post("a"), _post("bad"), _post("b")], {})
+
+        assert list(summaries) == ["a", "b"]
+        assert list(insights) == ["a", "b"]
+
+    @patch("reddit_pipeline.llm.summariser.summarise_post", side_effect=RuntimeError("down"))
+    def test_all_failures_raise(self, _summarise):
+        """Test that the stage fails loudly when nothing succeeds."""
+        with pytest.raises(RuntimeError, match="down"):
+            run_llm_stage([_post("a"), _post("b")], {})
+
+
+class TestProcessEmbeddings:
+    """Test that process writes every embedding in one bulk call."""
+
+    @patch("reddit_pipeline.run.upsert_posts")
+    @patch("reddit_pipeline.run.upsert_insight")
+    @patch("reddit_pipeline.run.upsert_embeddings")
+    @patch("reddit_pipeline.run.embed_texts")
+    @patch("reddit_pipeline.run.run_llm_stage")
+    @patch("reddit_pipeline.run.hydrate_comments", return_value={})
+    def test_reused_and_new_vectors_are_written_together(
+        self, _hydrate, mock_stage, mock_embed, mock_upsert, _insight, _posts
+    ):
+        """Test that reused title vectors and new rows share one write, skipping empty texts."""
+        mock_stage.return_value = ({"1": {"summary": ""}}, {"1": {"confidence": 0.5}})
+        embedded = EmbeddingMatrix.zeros(2, 2)
+        embedded.vectors[1] = [0.0, 1.0]
+        embedded.mask[1] = True
+        mock_embed.return_value = embedded
+        title = np.array([1.0, 0.0], dtype=np.float32)
+
+        process([_post("1")], title_vectors={"1": title})
+
+        mock_embed.assert_called_once_with(["", "{'confidence': 0.5}"])
+        targets, vectors = mock_upsert.call_args.args
+        assert targets == [("post", "1"), ("insight", "1")]
+        assert vectors.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+
+    @patch("reddit_pipeline.run.upsert_posts")
+    @patch("reddit_pipeline.run.upsert_insight")
+    @patch("reddit_pipeline.run.upsert_embeddings")
+    @patch("reddit_pipeline.run.embed_texts")
+    @patch("reddit_pipeline.run.run_llm_stage")
+    @patch("reddit_pipeline.run.hydrate_comments", return_value={})
+    def test_full_matrix_is_written_without_copying(
+        self, _hydrate, mock_stage, mock_embed, mock_upsert, _insight, _posts
+    ):
+        """Test that a matrix with every row valid reaches storage as the same array."""
+        mock_stage.return_value = ({"1": {"summary": "s"}}, {"1": {"confidence": 0.5}})
+        embedded = EmbeddingMatrix.zeros(3, 2)
+        embedded.mask[:] = True
+        mock_embed.return_value = embedded
+
+        process([_post("1")])
+
+        targets, vectors = mock_upsert.call_args.args
+        assert targets == [("post", "1"), ("post", "1#summary"), ("insight", "1")]
+        assert vectors is embedded.vectors
+
+    @patch("reddit_pipeline.run.upsert_embeddings")
+    @patch("reddit_pipeline.run.embed_texts")
+    @patch("reddit_pipeline.run.run_llm_stage")
+    @patch("reddit_pipeline.run.hydrate_comments", return_value={})
+    def test_posts_are_written_before_their_insights(
+        self, _hydrate, mock_stage, mock_embed, _embeddings
+    ):
+        """Test that completed posts and their rank exist before insight rows reference them."""
+        mock_stage.return_value = (
+            {"1": {"summary": "s"}, "2": {"summary": "s"}},
+            {"1": {"confidence": 0.5}},
+        )
+        mock_embed.side_effect = lambda texts: EmbeddingMatrix.zeros(len(texts), 2)
+        calls: list[str] = []
+
+        with (
+            patch("reddit_pipeline.run.upsert_posts") as mock_posts,
+            patch("reddit_pipeline.run.upsert_insight") as mock_insight,
+        ):
+            mock_posts.side_effect = lambda *a: calls.append("posts")
+            mock_insight.side_effect = lambda *a: calls.append("insight")
+            process([_post("1"), _post("2")])
+
+        assert calls == ["posts", "insight"]
+        posts, ranks = mock_posts.call_args.args
+        assert [p.id for p in posts] == ["1"]
+        assert ranks["1"] > 0
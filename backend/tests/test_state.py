@@ -0,0 +1,216 @@
+"""Unit tests for incremental-ingestion watermarks and the processed-post filter."""
+
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+from reddit_pipeline import state as state_mod
+from reddit_pipeline.models import EmbeddingMatrix, Post
+from reddit_pipeline.state import (
+    PipelineState,
+    SourceWatermark,
+    advance_watermarks,
+    filter_new_or_changed,
+    filter_unprocessed,
+    load_state,
+    mark_processed,
+    save_state,
+    watermark_key,
+)
+
+
+def _post(pid: str, comments: int = 10, subreddit: str = "Programming") -> Post:
+    return Post(
+        id=pid,
+        source="reddit",
+        title=f"Post {pid}",
+        url=f"https://example.com/{pid}",
+        author="user",
+        score=10,
+        num_comments=comments,
+        created_utc=datetime.now(UTC),
+        subreddit=subreddit,
+    )
+
+
+class TestWatermarks:
+    """Test watermark filtering and advancement."""
+
+    def test_empty_state_keeps_everything(self):
+        """Test that a first run processes every post."""
+        posts = [_post("1"), _post("2")]
+        assert filter_new_or_changed(posts, PipelineState(), 1.5) == posts
+
+    def test_processed_posts_are_skipped(self):
+        """Test that unchanged processed posts are skipped on the next run."""
+        state = PipelineState()
+        advance_watermarks(state, [_post("1"), _post("2")])
+
+        fresh = filter_new_or_changed([_post("1"), _post("3")], state, 1.5)
+
+        assert [p.id for p in fresh] == ["3"]
+
+    def test_materially_changed_posts_are_kept(self):
+        """Test that a post whose discussion grew past the threshold is reprocessed."""
+        state = PipelineState()
+        advance_watermarks(state, [_post("1", comments=10)])
+
+        assert filter_new_or_changed([_post("1", comments=14)], state, 1.5) == []
+        assert len(filter_new_or_changed([_post("1", comments=15)], state, 1.5)) == 1
+
+    def test_watermark_records_comment_counts_per_subreddit(self):
+        """Test that each source/subreddit watermark keeps seen IDs and comment counts."""
+        state = PipelineState()
+        advance_watermarks(state, [_post("1", comments=3), _post("2", comments=7)])
+
+        assert watermark_key(_post("1")) == "reddit:programming"
+        assert state.watermarks["reddit:programming"].seen == {"1": 3, "2": 7}
+
+    def test_seen_ids_are_capped(self, monkeypatch):
+        """Test that only the most recently seen IDs are retained."""
+        monkeypatch.setattr(state_mod, "MAX_SEEN_PER_KEY", 2)
+        state = PipelineState()
+        advance_watermarks(state, [_post("1"), _post("2"), _post("3")])
+
+        assert list(state.watermarks["reddit:programming"].seen) == ["2", "3"]
+
+
+class TestProcessedFilter:
+    """Test skipping posts that were already summarised."""
+
+    def test_unchanged_posts_are_skipped(self):
+        """Test that summarised posts are dropped until edited or their discussion grows."""
+        state = PipelineState()
+        mark_processed(state, [_post("1", comments=10), _post("2")])
+
+        edited = _post("2").model_copy(update={"text": "Update: fixed"})
+        fresh = filter_unprocessed(
+            [_post("1", comments=14), edited, _post("3"), _post("1", comments=15)], state, 1.5
+        )
+
+        assert [(p.id, p.num_comments) for p in fresh] == [("2", 10), ("3", 10), ("1", 15)]
+
+    def test_processed_set_is_capped(self, monkeypatch):
+        """Test that the oldest processed posts are forgotten first."""
+        monkeypatch.setattr(state_mod, "MAX_PROCESSED", 2)
+        state = PipelineState()
+        mark_processed(state, [_post("1"), _post("2"), _post("3")])
+
+        assert list(state.processed) == ["2", "3"]
+
+    @patch("reddit_pipeline.run.upsert_posts")
+    @patch("reddit_pipeline.run.upsert_embeddings")
+    @patch("reddit_pipeline.run.upsert_insight")
+    @patch(
+        "reddit_pipeline.run.embed_texts",
+        side_effect=lambda texts: EmbeddingMatrix.zeros(len(texts), 1),
+    )
+    @patch("reddit_pipeline.llm.insights.generate_insight", return_value={})
+    @patch("reddit_pipeline.llm.summariser.summarise_post", return_value={})
+    @patch("reddit_pipeline.run.hydrate_comments", return_value={})
+    def test_process_skips_summarised_posts(self, _hydrate, mock_summarise, *_):
+        """Test that process only sends unsummarised posts to the LLM stages."""
+        from reddit_pipeline.run import process
+
+        state = PipelineState()
+        mark_processed(state, [_post("1")])
+
+        selected = process([_post("1"), _post("2")], state=state)
+
+        assert [p.id for p in selected] == ["2"]
+        assert [c.args[0].id for c in mock_summarise.call_args_list] == ["2"]
+
+    @patch("reddit_pipeline.run.embedding_cache", return_value=None)
+    @patch("reddit_pipeline.run.response_cache", return_value=None)
+    @patch("reddit_pipeline.run.refresh_rank_scores", return_value=0)
+    @patch("reddit_pipeline.run.upsert_posts")
+    @patch("reddit_pipeline.run.upsert_embeddings")
+    @patch("reddit_pipeline.run.upsert_insight")
+    @patch(
+        "reddit_pipeline.run.embed_texts",
+        side_effect=lambda texts: EmbeddingMatrix.zeros(len(texts), 1),
+    )
+    @patch("reddit_pipeline.llm.insights.generate_insight", return_value={})
+    @patch("reddit_pipeline.llm.summariser.summarise_post")
+    @patch("reddit_pipeline.run.hydrate_comments", return_value={})
+    def test_failed_posts_are_not_marked_processed(
+        self,
+        _hydrate,
+        mock_summarise,
+        _insight,
+        _embed,
+        _upsert_insight,
+        _upsert_embeddings,
+        mock_upsert,
+        _refresh,
+        _response_cache,
+        _embedding_cache,
+        tmp_path,
+    ):
+        """Test that a post whose summary failed is neither processed nor watermarked."""
+        from reddit_pipeline import run
+
+        def summarise(post, comments):
+            if post.id == "bad":
+                raise RuntimeError("transient")
+            return {"summary": post.id}
+
+        mock_summarise.side_effect = summarise
+        path = tmp_path / "state.json"
+        posts = [_post("good"), _post("bad", subreddit="Other")]
+        with (
+            patch.object(run.settings, "pipeline_state_path", str(path)),
+            patch.object(run.settings, "near_dedupe_enabled", False),
+            patch.object(run, "fetch_sources", return_value=posts),
+        ):
+            run.main()
+
+        state = load_state(path)
+        assert list(state.processed) == ["good"]
+        assert "bad" not in state.watermarks.get("reddit:other", SourceWatermark()).seen
+        assert [p.id for p in mock_upsert.call_args.args[0]] == ["good"]
+
+    def test_edited_post_survives_both_filters(self):
+        """Test that an edit with no new comments passes the fetch and processed filters."""
+        state = PipelineState()
+        original = _post("1", comments=10)
+        advance_watermarks(state, [original])
+        mark_processed(state, [original])
+        edited = original.model_copy(update={"text": "Updated with new details"})
+
+        fetched = filter_new_or_changed([original, edited], state, 1.5)
+
+        assert fetched == [edited]
+        assert filter_unprocessed(fetched, state, 1.5) == [edited]
+
+
+class TestStatePersistence:
+    """Test loading and saving the state file."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that state survives a save/load cycle."""
+        path = tmp_path / "state.json"
+        state = PipelineState()
+        advance_watermarks(state, [_post("1", comments=7)])
+
+        save_state(state, path)
+        loaded = load_state(path)
+
+        assert loaded == state
+
+    def test_missing_or_corrupt_file_is_empty(self, tmp_path):
+        """Test that a missing or unreadable file falls back to a full run."""
+        assert load_state(tmp_path / "missing.json") == PipelineState()
+
+        corrupt = tmp_path / "corrupt.json"
+        corrupt.write_text("{not json")
+        assert load_state(corrupt) == PipelineState()
+
+    def test_older_state_files_still_load(self, tmp_path):
+        """Test that files written with the retired `newest_created_utc` field load."""
+        path = tmp_path / "state.json"
+        path.write_text(
+            '{"watermarks": {"reddit:x": '
+            '{"newest_created_utc": "2024-01-01T00:00:00Z", "seen": {"1": 4}}}}'
+        )
+
+        assert load_state(path).watermarks["reddit:x"].seen == {"1": 4}
@@ -0,0 +1,137 @@
+"""Unit tests for the Supabase storage adapter with a mocked client."""
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from reddit_pipeline.models import Post
+from reddit_pipeline.storage.supabase import SupabaseStore
+
+
+def _post(pid: str, hours_ago: float = 0) -> Post:
+    return Post(
+        id=pid,
+        title=f"Post {pid}",
+        url=f"https://example.com/{pid}",
+        author="user",
+        score=100,
+        num_comments=50,
+        created_utc=datetime.now(UTC) - timedelta(hours=hours_ago),
+        subreddit="test",
+    )
+
+
+def _store() -> tuple[SupabaseStore, MagicMock]:
+    store = SupabaseStore("https://example.supabase.co", "key")
+    client = MagicMock()
+    store._client = client
+    return store, client
+
+
+class TestRankScorePersistence:
+    """Test rank_score materialisation and bulk refresh."""
+
+    def test_upsert_posts_writes_rank_score(self):
+        """Test that given rank scores are written alongside each post."""
+        store, client = _store()
+
+        store.upsert_posts([_post("1"), _post("2")], {"1": 125.0})
+
+        rows = client.table.return_value.upsert.call_args.args[0]
+        assert rows[0]["rank_score"] == 125.0
+        assert "rank_score" not in rows[1]
+
+    def test_upsert_posts_without_scores(self):
+        """Test that rank_score is omitted when no scores are given."""
+        store, client = _store()
+
+        store.upsert_posts([_post("1")])
+
+        rows = client.table.return_value.upsert.call_args.args[0]
+        assert "rank_score" not in rows[0]
+
+    def test_refresh_rank_scores_calls_rpc(self):
+        """Test that the decay refresh runs as a single database function call."""
+        store, client = _store()
+        client.rpc.return_value.execute.return_value = MagicMock(data=42)
+
+        assert store.refresh_rank_scores(48.0) == 42
+        client.rpc.assert_called_once_with("refresh_rank_scores", {"half_life_hours": 48.0})
+
+    @patch("reddit_pipeline.storage.supabase.settings")
+    def test_writes_disabled(self, mock_settings):
+        """Test that nothing is sent when writes are disabled."""
+        mock_settings.supabase_enable_writes = False
+        store, client = _store()
+
+        assert store.upsert_posts([_post("1")], {"1": 1.0}).inserted == 0
+        assert store.refresh_rank_scores(48.0) == 0
+        client.table.assert_not_called()
+        client.rpc.assert_not_called()
+
+
+class TestEmbeddingWrites:
+    """Test bulk embedding writes."""
+
+    @patch("reddit_pipeline.storage.supabase.EMBEDDING_WRITE_CHUNK", 2)
+    def test_rows_are_written_in_chunks(self):
+        """Test one delete per entity type and chunked inserts from the matrix rows."""
+        store, client = _store()
+        vectors = np.arange(6, dtype=np.float32).reshape(3, 2)
+        targets = [("post", "1"), ("post", "1#summary"), ("insight", "1")]
+
+        store.upsert_embeddings(targets, vectors)
+
+        table = client.table.return_value
+        deletes = table.delete.return_value.eq.call_args_list
+        assert [c.args for c in deletes] == [("entity_type", "post"), ("entity_type", "insight")]
+        inserts = [c.args[0] for c in table.insert.call_args_list]
+        assert [len(rows) for rows in inserts] == [2, 1]
+        assert inserts[1][0] == {
+            "entity_type": "insight",
+            "entity_id": "1",
+            "embedding": [4.0, 5.0],
+        }
+
+
+class TestPersist:
+    """Test the pipeline persist stage."""
+
+    @patch("reddit_pipeline.run.refresh_rank_scores", return_value=0)
+    @patch("reddit_pipeline.run.upsert_posts")
+    def test_persist_materialises_current_rank(self, mock_upsert, mock_refresh):
+        """Test that persist writes the decayed composite rank for each post."""
+        from reddit_pipeline.run import persist
+
+        persist([_post("fresh"), _post("old", hours_ago=48)])
+
+        posts, ranks = mock_upsert.call_args.args
+        assert [p.id for p in posts] == ["fresh", "old"]
+        assert abs(ranks["fresh"] - 125.0) < 0.01
+        assert abs(ranks["old"] - 62.5) < 0.01
+        mock_refresh.assert_called_once_with(48.0)
+
+    @patch("reddit_pipeline.run.refresh_rank_scores", return_value=0)
+    @patch("reddit_pipeline.run.upsert_posts")
+    def test_duplicates_are_persisted_with_zero_rank(self, mock_upsert, _refresh):
+        """Test that flagged duplicates are stored but cannot outrank the kept post."""
+        from reddit_pipeline.run import persist
+
+        persist([_post("kept"), _post("dup").model_copy(update={"is_duplicate": True})])
+
+        posts, ranks = mock_upsert.call_args.args
+        assert [p.id for p in posts] == ["kept", "dup"]
+        assert ranks["dup"] == 0.0
+        assert ranks["kept"] > 0
+
+    def test_sql_refresh_skips_duplicates(self):
+        """Test that the SQL refresh only re-ranks non-duplicates and zeroes the rest."""
+        schema = (Path(__file__).parents[2] / "supabase" / "schema.sql").read_text()
+        body = schema[schema.index("function refresh_rank_scores(") :]
+        body = body[: body.index("$$;")]
+        decay, zero = body.split("get diagnostics")
+
+        assert "not coalesce(is_duplicate, false)" in decay
+        assert "or coalesce(is_duplicate, false)" in zero
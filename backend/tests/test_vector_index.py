@@ -0,0 +1,131 @@
+"""Unit tests for the local on-disk vector index."""
+
+import numpy as np
+import pytest
+
+from reddit_pipeline.storage import vector_index
+from reddit_pipeline.storage.vector_index import VectorIndex, update_local_index
+
+
+def _clustered(n: int, dim: int = 16, clusters: int = 12, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim))
+    points = centres[rng.integers(0, clusters, n)] + 0.3 * rng.standard_normal((n, dim))
+    return points.astype(np.float32)
+
+
+def _keys(n: int) -> list[tuple[str, str]]:
+    return [("post", str(i)) for i in range(n)]
+
+
+class TestExactSearch:
+    """Test small indexes, which are searched exactly."""
+
+    def test_nearest_first_with_cosine_scores(self):
+        """Test that matches come back best first with cosine similarity."""
+        index = VectorIndex(dim=2)
+        index.upsert(_keys(3), [[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]])
+
+        hits = index.search([[1.0, 0.1]], k=2)[0]
+
+        assert [key for key, _ in hits] == [("post", "0"), ("post", "2")]
+        assert hits[0][1] == pytest.approx(0.995, abs=1e-3)
+        assert not index.trained
+
+    def test_upsert_replaces_and_delete_removes(self):
+        """Test that re-adding a key replaces its vector and deleted keys never match."""
+        index = VectorIndex(dim=2)
+        index.upsert(_keys(2), [[1.0, 0.0], [0.0, 1.0]])
+        index.upsert([("post", "0")], [[0.0, 1.0]])
+
+        assert len(index) == 2
+        assert index.vector(("post", "0")).tolist() == [0.0, 1.0]
+        assert index.delete([("post", "1"), ("post", "missing")]) == 1
+        assert [key for key, _ in index.search([[0.0, 1.0]], k=5)[0]] == [("post", "0")]
+
+    def test_related_excludes_the_key(self):
+        """Test that related-post lookups skip the post itself."""
+        index = VectorIndex(dim=2)
+        index.upsert(_keys(3), [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]])
+
+        assert [key for key, _ in index.related(("post", "0"), k=1)] == [("post", "1")]
+        assert index.related(("post", "missing")) == []
+
+
+class TestIvfSearch:
+    """Test the clustered index."""
+
+    def test_batched_queries_match_exact_search(self, monkeypatch):
+        """Test that probing a few lists finds nearly all exact top-5 neighbours."""
+        monkeypatch.setattr(vector_index, "MIN_TRAIN_ROWS", 100)
+        vectors = _clustered(800)
+        index = VectorIndex(dim=16, nprobe=4)
+        index.upsert(_keys(800), vectors)
+        exact = VectorIndex(dim=16)
+        exact.upsert(_keys(800), vectors)
+        exact._centroids = None
+
+        approx_hits = index.search(vectors[:50], k=5)
+        exact_hits = exact.search(vectors[:50], k=5)
+
+        assert index.trained
+        overlap = [
+            len({key for key, _ in a} & {key for key, _ in e})
+            for a, e in zip(approx_hits, exact_hits)
+        ]
+        assert sum(overlap) / (5 * 50) >= 0.9
+        assert all(hits[0][0] == ("post", str(i)) for i, hits in enumerate(approx_hits))
+
+    def test_tombstones_are_compacted(self, monkeypatch):
+        """Test that deleted rows are dropped once they pass the compaction ratio."""
+        monkeypatch.setattr(vector_index, "MIN_TRAIN_ROWS", 10**6)
+        index = VectorIndex(dim=16)
+        index.upsert(_keys(100), _clustered(100))
+        index.delete(_keys(40))
+        index.upsert([("post", "new")], _clustered(1, seed=1))
+
+        assert len(index) == 61
+        assert len(index._keys) == 61
+
+
+class TestPersistence:
+    """Test saving, memory-mapped loading and the run hook."""
+
+    def test_round_trip_is_memory_mapped(self, tmp_path, monkeypatch):
+        """Test that a saved index reloads with mapped vectors and the same results."""
+        monkeypatch.setattr(vector_index, "MIN_TRAIN_ROWS", 100)
+        vectors = _clustered(300)
+        index = VectorIndex(dim=16)
+        index.upsert(_keys(300), vectors)
+        index.delete([("post", "5")])
+        index.save(tmp_path / "idx")
+
+        loaded = VectorIndex.open(tmp_path / "idx", dim=16)
+
+        assert isinstance(loaded._vectors, np.memmap)
+        assert len(loaded) == 299
+        assert loaded.search(vectors[:3], k=3) == index.search(vectors[:3], k=3)
+        loaded.upsert([("insight", "1")], vectors[:1])
+        loaded.save(tmp_path / "idx")
+        assert ("insight", "1") in VectorIndex.open(tmp_path / "idx", dim=16)
+
+    def test_dimension_mismatch(self, tmp_path):
+        """Test that opening with a different dimension fails instead of mixing vectors."""
+        index = VectorIndex(dim=2)
+        index.upsert(_keys(1), [[1.0, 0.0]])
+        index.save(tmp_path / "idx")
+
+        with pytest.raises(ValueError, match="dim 2"):
+            VectorIndex.open(tmp_path / "idx", dim=3)
+
+    def test_update_local_index_rebuilds_on_new_dim(self, tmp_path, monkeypatch):
+        """Test that the run hook adds vectors and rebuilds a stale-dimension index."""
+        monkeypatch.setattr(vector_index.settings, "vector_index_path", str(tmp_path / "idx"))
+        monkeypatch.setattr(vector_index.settings, "embeddings_dim", 2)
+        update_local_index(_keys(2), np.eye(2, dtype=np.float32))
+        monkeypatch.setattr(vector_index.settings, "embeddings_dim", 3)
+
+        update_local_index([("post", "x")], np.ones((1, 3), dtype=np.float32))
+
+        reopened = VectorIndex.open(tmp_path / "idx", dim=3)
+        assert len(reopened) == 1
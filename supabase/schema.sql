@@ -46,6 +46,37 @@ create index if not exists idx_posts_created on posts (created_utc desc);
 create index if not exists idx_posts_rank on posts (rank_score desc);
 create index if not exists idx_posts_trgm on posts using gin (title gin_trgm_ops);
 
+-- Re-apply the freshness decay to rank_score in bulk. Mirrors
+-- backend/reddit_pipeline/ranking.py: (score + 0.5*comments + 2*upvote_ratio)
+-- * 0.5 ^ (age_hours / half_life). Posts older than max_age have decayed to
+-- ~0 and are zeroed once rather than recomputed on every refresh. Rows
+-- flagged is_duplicate are pinned to 0 so they never outrank the post kept.
+create or replace function refresh_rank_scores(
+  half_life_hours numeric default 48,
+  max_age interval default interval '30 days'
+) returns integer
+language plpgsql
+as $$
+declare
+  refreshed integer;
+begin
+  update posts
+     set rank_score = (score + 0.5 * comments_count + 2.0 * coalesce(upvote_ratio, 0))
+       * power(0.5, greatest(0, extract(epoch from (now() - created_utc)) / 3600.0) / half_life_hours)
+   where created_utc >= now() - max_age and not coalesce(is_duplicate, false);
+  get diagnostics refreshed = row_count;
+
+  update posts set rank_score = 0
+   where (created_utc < now() - max_age or coalesce(is_duplicate, false))
+     and rank_score <> 0;
+
+  return refreshed;
+end;
+$$;
+
+-- Schedule hourly with pg_cron where available:
+-- select cron.schedule('refresh-rank-scores', '0 * * * *', 'select refresh_rank_scores()');
+
 -- Comments
 create table if not exists comments (
   id text primary key,
@@ -63,7 +94,7 @@ create table if not exists embeddings (
   id bigserial primary key,
   entity_type text check (entity_type in ('post','comment','insight')) not null,
   entity_id text not null,
-  embedding vector(3072),           -- adjust to your model dimension
+  embedding vector(1024),           -- must match EMBEDDINGS_DIM
   created_at timestamptz not null default now()
 );
 create index if not exists idx_embeddings_vec on embeddings using ivfflat (embedding vector_cosine_ops);